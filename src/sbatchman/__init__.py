@@ -3,8 +3,8 @@ import importlib.metadata
 from .config.global_config import get_cluster_name, get_max_queued_jobs, set_max_queued_jobs
 from .config.project_config import init_project, reset_cached_sbatchman_home
 from .core.config_manager import create_configs_from_file, create_local_config, create_slurm_config, create_pbs_config
-from .core.launcher import launch_job, launch_jobs_from_file, job_submit
-from .core.jobs_manager import jobs_list, jobs_to_dataframe, archive_jobs, delete_jobs, update_jobs_status, count_active_jobs, archive_job, unarchive_job
+from .core.launcher import launch_job, launch_jobs_from_file, iter_jobs_from_file, count_jobs_from_file, job_submit
+from .core.jobs_manager import jobs_list, jobs_to_dataframe, archive_jobs, delete_jobs, update_jobs_status, count_active_jobs, archive_job, unarchive_job, reindex_jobs, job_by_id, jobs_by_ids
 from .schedulers.slurm import SlurmConfig
 from .schedulers.pbs import PbsConfig
 from .schedulers.local import LocalConfig
@@ -43,12 +43,16 @@ __all__ = [
   "create_pbs_config",
   "create_configs_from_file",
   "launch_jobs_from_file",
+  "iter_jobs_from_file",
+  "count_jobs_from_file",
 
   "launch_job",
   "job_submit",
 
   "jobs_list",
   "jobs_to_dataframe",
+  "job_by_id",
+  "jobs_by_ids",
   "count_active_jobs",
 
   "archive_jobs",
@@ -56,4 +60,5 @@ __all__ = [
   "archive_job",
   "unarchive_job",
   "update_jobs_status",
+  "reindex_jobs",
 ]
\ No newline at end of file
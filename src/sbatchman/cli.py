@@ -10,6 +10,7 @@ import sbatchman as sbm
 from sbatchman.core.status import Status
 from sbatchman.schedulers.base import BaseConfig
 from sbatchman.config import global_config
+from sbatchman.core import daemon as daemon_module
 from sbatchman.exceptions import ProjectNotInitializedError, SbatchManError
 from sbatchman.tui.tui_status import run_tui
 from sbatchman.core.campaign import run_campaign
@@ -215,12 +216,13 @@ def configure_local(
   cluster_name: Optional[str] = typer.Option(None, "--cluster-name", help="The name of the machine where this configuration will be used."),
   env: Optional[List[str]] = typer.Option(None, "--env", help="Environment variables to set (e.g., VAR=value). Can be used multiple times (e.g., --env VAR1=value1 --env VAR2=value2)."),
   time: Optional[str] = typer.Option(None, help="Walltime (e.g., 01-00:00:00)."),
+  slots: Optional[int] = typer.Option(None, "--slots", min=1, help="Maximum number of jobs of this configuration running at the same time (default: 1)."),
   overwrite: bool = typer.Option(False, "--overwrite", help="Overwrite current configuration."),
 ):
   """Creates a configuration for local execution."""
   while True:
     try:
-      config = sbm.create_local_config(name=name, env=env, time=time, cluster_name=cluster_name, overwrite=overwrite)
+      config = sbm.create_local_config(name=name, env=env, time=time, slots=slots, cluster_name=cluster_name, overwrite=overwrite)
       _save_config_print(config)
       break
     except ProjectNotInitializedError:
@@ -273,6 +275,14 @@ def launch(
   ignore_archived: bool = typer.Option(False, "--ignore-archived", "-ia", help="If True, do not check for duplicates in jobs archives."),
   ignore_conf_in_dup_check: bool = typer.Option(False, "--ignore-conf-in-dup-check", "-ic", help="If True, jobs with the same tag are considered duplicates even if they use different configs."),
   ignore_commands_in_dup_check: bool = typer.Option(False, "--ignore-commands-in-dup-check", "-icomm", help="If True, the duplicate check does not compare command, preprocess, or postprocess. Duplicates are determined solely based on cluster/tag (and config unless --ignore-conf-in-dup-check is also set)."),
+  workers: int = typer.Option(1, "--workers", "-w", min=1, help="Number of jobs submitted concurrently. Only applicable with --file, ignored for sequential jobs and dry runs."),
+  array: bool = typer.Option(False, "--array", help="Submit jobs sharing a SLURM configuration as job arrays. Only applicable with --file, ignored for sequential jobs and dry runs."),
+  count: bool = typer.Option(False, "--count", help="Only print the number of jobs defined by the file (after filters), without checking for duplicates. Only applicable with --file."),
+  start: int = typer.Option(0, "--start", min=0, help="Number of the first job of the file to launch (jobs are numbered from 0, after filters). Only applicable with --file."),
+  stop: Optional[int] = typer.Option(None, "--stop", min=0, help="Stop before the job with this number. Only applicable with --file."),
+  shard: Optional[str] = typer.Option(None, "--shard", help="Only launch one shard of the jobs, as k/n: the jobs whose number modulo n is k. Only applicable with --file."),
+  pack: Optional[int] = typer.Option(None, "--pack", min=1, help="Pack jobs sharing a configuration into allocations of this many jobs, each running its jobs with a pool of workers. Only applicable with --file, ignored for sequential jobs and dry runs."),
+  pack_workers: Optional[int] = typer.Option(None, "--pack-workers", min=1, help="Number of jobs run at the same time by each allocation of --pack (default: one per CPU of the allocation)."),
 ):
   """
   Launches an experiment (or a batch of experiments) using a predefined configuration.
@@ -290,8 +300,25 @@ def launch(
         key, value = var.split("=", 1)
         filter_variables_dict[key] = value
 
+    shard_tuple = None
+    if shard:
+      try:
+        k, n = shard.split("/", 1)
+        shard_tuple = (int(k), int(n))
+      except ValueError:
+        console.print(f"[bold red]Invalid shard format: {shard}. Must be k/n[/bold red]")
+        raise typer.Exit(1)
+
     # Call the API/launcher
-    if file:
+    if file and count:
+      jobs_count = sbm.count_jobs_from_file(
+        file,
+        filter_tags=tag,
+        filter_variables=filter_variables_dict if filter_variables_dict else None,
+      )
+      console.print(f"The file defines {jobs_count} jobs.")
+      return
+    elif file:
       jobs = sbm.launch_jobs_from_file(
         file,
         force=force,
@@ -301,6 +328,13 @@ def launch(
         ignore_archived=ignore_archived,
         ignore_conf_in_dup_check=ignore_conf_in_dup_check,
         ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+        max_workers=workers,
+        array=array,
+        start=start,
+        stop=stop,
+        shard=shard_tuple,
+        pack=pack,
+        pack_workers=pack_workers,
       )
       failed_sub_jobs_count = len([1 for j in jobs if j.status == Status.FAILED_SUBMISSION.value])
       ok_jobs_count = len(jobs) - failed_sub_jobs_count
@@ -445,7 +479,50 @@ def update_jobs_status(
   except SbatchManError as e:
     console.print(f"[bold red]Error:[/bold red] {e}")
     raise typer.Exit(1)
-  
+
+@app.command("reindex")
+def reindex():
+  """
+  Rebuilds the jobs index from the metadata of all active and archived jobs.
+  Run this after job directories are modified outside of SbatchMan (e.g. deleted or copied by hand).
+  """
+  try:
+    indexed_count = sbm.reindex_jobs()
+    console.print(f"✅ Successfully indexed {indexed_count} jobs.")
+  except ProjectNotInitializedError:
+    _handle_not_initialized()
+  except SbatchManError as e:
+    console.print(f"[bold red]Error:[/bold red] {e}")
+    raise typer.Exit(1)
+
+@app.command("daemon")
+def daemon(
+  interval: float = typer.Option(daemon_module.DEFAULT_REFRESH_INTERVAL, "--interval", "-i", help="Seconds between two queries of the scheduler."),
+  stop: bool = typer.Option(False, "--stop", help="Stop the daemon running for this project."),
+):
+  """
+  Runs a daemon that keeps the status of the jobs up to date, so that `status`, the TUIs, campaigns and
+  `jobs_list` read it from memory instead of each querying the scheduler. Stop it with Ctrl+C or `--stop`.
+  """
+  try:
+    if stop:
+      if daemon_module.stop():
+        console.print("✅ Daemon stopped.")
+      else:
+        console.print("[bold yellow]Warning:[/bold yellow] No daemon is running for this project.")
+      return
+    console.print(f"Serving jobs status on [bold cyan]{daemon_module.get_socket_path()}[/bold cyan], refreshing every {interval:g} seconds (Ctrl+C to stop).")
+    daemon_module.serve(
+      interval=interval,
+      on_refresh=lambda updated_count: console.print(f"Updated status for {updated_count} jobs.") if updated_count else None,
+    )
+  except KeyboardInterrupt:
+    console.print("Daemon stopped.")
+  except ProjectNotInitializedError:
+    _handle_not_initialized()
+  except SbatchManError as e:
+    console.print(f"[bold red]Error:[/bold red] {e}")
+    raise typer.Exit(1)
 
 @app.command("campaign-tui")
 def show_campaign_tui():
@@ -573,6 +650,11 @@ def config_cmd():
   run_remotes_config_tui()
 
 
+class ResultsBackend(str, Enum):
+  sqlite = "sqlite"
+  parquet = "parquet"
+
+
 @app.command("visualize")
 def visualize(
   parser: Path = typer.Option(
@@ -617,6 +699,17 @@ Example
     help="A path or name of a SQLite database to describe. This will NOT start the web UI."
   ),
   verbose: bool = typer.Option(False, "--verbose", "-v", help="Enable verbose database description."),
+  backend: ResultsBackend = typer.Option(
+    "sqlite",
+    "--backend", "-b",
+    help="Results store queried by the web UI: sqlite (default), or parquet (partitioned Parquet files queried with DuckDB, requires pyarrow and duckdb).",
+  ),
+  parse_workers: int = typer.Option(
+    1,
+    "--parse-workers",
+    min=1,
+    help="Number of processes parsing the jobs before the web UI starts. `parse` must not rely on state shared between calls if greater than 1.",
+  ),
 ):
   if describe:
     if not describe.exists():
@@ -626,7 +719,7 @@ Example
     print_sqlite_db(db_path=describe, verbose=verbose)
   else:
     # TODO implement preset loading
-    launch_visualize_web_server(parser, presets)
+    launch_visualize_web_server(parser, presets, backend=backend.value, parse_workers=parse_workers)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,14 @@
+import os
 from pathlib import Path
-from typing import Optional
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
 import yaml
+try:
+  from yaml import CSafeLoader as SafeLoader
+except ImportError:
+  from yaml import SafeLoader
 
-from sbatchman.exceptions import ConfigurationError, ProjectExistsError, ProjectNotInitializedError
+from sbatchman.exceptions import ConfigurationError, ConfigurationNotFoundError, ProjectExistsError, ProjectNotInitializedError
 
 # The name of the root directory to search for.
 PROJECT_ROOT_DIR_NAME = "SbatchMan"
@@ -105,22 +111,85 @@ def get_archive_dir() -> Path:
   archive_dir.mkdir(exist_ok=True)
   return archive_dir
 
+def get_jobs_index_path() -> Path:
+  """Returns the path to the SQLite index of the jobs metadata."""
+  return get_project_root() / "jobs_index.sqlite"
+
+def get_extract_cache_path() -> Path:
+  """Returns the path to the SQLite cache of the results of the `jobs_to_dataframe` extractors."""
+  return get_project_root() / "extract_cache.sqlite"
+
+def get_local_jobs_dir() -> Path:
+  """Returns the directory where the queues of the jobs run on the local machine are kept."""
+  return get_project_root() / "local_jobs"
+
+def get_packs_dir() -> Path:
+  """Returns the directory where the scripts and logs of the allocations running packed jobs are kept."""
+  return get_project_root() / "packs"
+
+# Parsed project files: path -> (mtime_ns, size, parsed content)
+_files_cache: Dict[str, Tuple[int, int, Any]] = {}
+_files_cache_lock = threading.Lock()
+
+def _read_cached(path: Path, parse: Callable[[str], Any]) -> Any:
+  """
+  Returns `parse(<content of path>)`, reusing the result of the previous call until the mtime or
+  the size of the file change. Raises OSError if the file cannot be read.
+  """
+  key = str(path)
+  stat = os.stat(key)
+  entry = _files_cache.get(key)
+  if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+    with _files_cache_lock:
+      # Another thread may have parsed it in the meantime
+      entry = _files_cache.get(key)
+      if entry is None or entry[:2] != (stat.st_mtime_ns, stat.st_size):
+        with open(key, 'r') as f:
+          entry = (stat.st_mtime_ns, stat.st_size, parse(f.read()))
+        _files_cache[key] = entry
+  return entry[2]
+
+def clear_configs_cache():
+  """Forgets the cached configurations and templates, so that they are read again on the next access."""
+  with _files_cache_lock:
+    _files_cache.clear()
+
+def load_project_configs() -> Dict[str, Any]:
+  """
+  Returns the parsed configurations.yaml file of the project.
+  The result is cached until the file changes and shared by all callers, so it must not be modified.
+  """
+  config_path = get_project_configs_file_path()
+  try:
+    return _read_cached(config_path, lambda text: yaml.load(text, Loader=SafeLoader) or {})
+  except FileNotFoundError:
+    raise ConfigurationNotFoundError(f"Project configuration file not found at '{config_path}'.")
+
+def get_config_template_path(cluster_name: str, config_name: str) -> Path:
+  """Returns the path to the script template of a configuration."""
+  return get_project_config_dir() / cluster_name / f"{config_name}.sh"
+
+def load_config_template(cluster_name: str, config_name: str) -> str:
+  """Returns the script template of a configuration, cached until the file changes."""
+  template_path = get_config_template_path(cluster_name, config_name)
+  try:
+    return _read_cached(template_path, str)
+  except FileNotFoundError:
+    raise ConfigurationNotFoundError(f"Configuration '{config_name}' for cluster '{cluster_name}' not found at '{template_path}'.")
+
 def get_scheduler_from_cluster_and_config_name(cluster_name: str, config_name: str) -> str:
   """
   Detects the scheduler type based on the cluster name, as stored in the project configuration.
   Returns the scheduler name as a string.
   """
-  config_path = get_project_configs_file_path()
-  
-  if not config_path.exists():
+  try:
+    all_configs = load_project_configs()
+  except ConfigurationNotFoundError:
     raise ConfigurationError(f"Project configuration file not found.")
   
-  with open(config_path, 'r') as f:
-    all_configs = yaml.safe_load(f) or {}
-  
   if cluster_name not in all_configs:
     raise ConfigurationError(f"No configurations found for cluster '{cluster_name}'.")
   
   default_scheduler = all_configs[cluster_name].get('scheduler', '')
-  config_scheduler = all_configs[cluster_name].get('configs', {}).get(config_name, {}).get('scheduler')
+  config_scheduler = (all_configs[cluster_name].get('configs') or {}).get(config_name, {}).get('scheduler')
   return config_scheduler or default_scheduler
@@ -44,7 +44,7 @@ from rich.console import Console
 import yaml
 import sbatchman as sbm
 from sbatchman.config import global_config
-from sbatchman.core.jobs_manager import job_by_id
+from sbatchman.core.jobs_manager import jobs_by_ids
 
 # ============================================================================
 # Configuration
@@ -801,16 +801,20 @@ def poll_jobs_until_completion(
             if control.is_cancelled:
                 raise CampaignCancelledError("Job polling cancelled by user")
 
-        # Refresh job statuses
+        # Refresh job statuses, re-fetching all jobs from sbatchman at once
         job_statuses = {}
+        try:
+            updated_jobs = jobs_by_ids(job.job_id for job in jobs)
+        except Exception as e:
+            logger.warning(f"Failed to fetch status for jobs: {e}")
+            updated_jobs = {}
         for job in jobs:
-            # Re-fetch job from sbatchman
-            try:
-                updated = job_by_id(job.job_id)
-                job_statuses[job.job_id] = updated.status
-            except Exception as e:
-                logger.warning(f"Failed to fetch status for job {job.job_id}: {e}")
+            updated = updated_jobs.get(str(job.job_id))
+            if updated is None:
+                logger.warning(f"Failed to fetch status for job {job.job_id}: job not found")
                 job_statuses[job.job_id] = "UNKNOWN"
+            else:
+                job_statuses[job.job_id] = updated.status
 
         # Check if all terminal
         all_terminal = all(
@@ -839,17 +843,22 @@ def poll_jobs_until_completion(
     failed = 0
     errors = []
 
+    try:
+        updated_jobs = jobs_by_ids(job.job_id for job in jobs)
+    except Exception as e:
+        updated_jobs = {}
+        logger.warning(f"Failed to fetch status for jobs: {e}")
+
     for job in jobs:
-        try:
-            updated = job_by_id(job.job_id)
-            if updated.status == "COMPLETED":
-                passed += 1
-            else:
-                failed += 1
-                errors.append(f"Job {job.job_id}: {updated.status}")
-        except Exception as e:
+        updated = updated_jobs.get(str(job.job_id))
+        if updated is None:
+            failed += 1
+            errors.append(f"Job {job.job_id}: job not found")
+        elif updated.status == "COMPLETED":
+            passed += 1
+        else:
             failed += 1
-            errors.append(f"Job {job.job_id}: {str(e)}")
+            errors.append(f"Job {job.job_id}: {updated.status}")
 
     logger.info(f"[blue]├────[/blue] Job polling completed: {passed} completed, {failed} NOT completed")
     return failed == 0, passed, failed, errors
@@ -1,4 +1,5 @@
 from copy import deepcopy
+from dataclasses import fields
 import os
 from pathlib import Path
 import re
@@ -7,9 +8,9 @@ import itertools
 
 from sbatchman.core.variables import extract_used_vars, substitute, load_variable_values, map_info_to_vars, resolve_map_variable
 from sbatchman.config.global_config import get_cluster_name
-from sbatchman.config.project_config import get_project_configs_file_path
+from sbatchman.config.project_config import get_project_configs_file_path, load_project_configs
 from sbatchman.exceptions import ConfigurationError, SyntaxError
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, List, Optional, Tuple, Union
 from sbatchman.schedulers.base import BaseConfig
 from sbatchman.schedulers.local import LocalConfig
 from sbatchman.schedulers.pbs import PbsConfig
@@ -47,6 +48,9 @@ def create_configs_from_file(file_path: Path, overwrite: bool = False) -> List[B
       configurations with the same name can be overwritten.
       Defaults to False.
  
+  All the configurations are saved at once (see `BaseConfig.save_configs`):
+  if any of them cannot be saved, none is.
+ 
   Returns:
     List[BaseConfig]: A list of fully resolved configuration objects
       (e.g., SlurmConfig) created from the file.
@@ -213,6 +217,7 @@ def create_configs_from_file(file_path: Path, overwrite: bool = False) -> List[B
               created_configs
             )
   
+  BaseConfig.save_configs(created_configs, overwrite)
   return created_configs
  
  
@@ -262,11 +267,11 @@ def _create_config_from_params(scheduler: str, params: dict[str, Any]) -> BaseCo
     
   try:
     if scheduler == "slurm":
-      return create_slurm_config(**params)
+      return create_slurm_config(**params, save=False)
     elif scheduler == "pbs":
-      return create_pbs_config(**params)
+      return create_pbs_config(**params, save=False)
     elif scheduler == "local":
-      return create_local_config(**params)
+      return create_local_config(**params, save=False)
     else:
       raise ConfigurationError(f"Unsupported scheduler '{scheduler}'. Supported schedulers are: slurm, pbs, local.")
   except Exception as e:
@@ -279,7 +284,9 @@ def create_local_config(
   env: Optional[List[str]] = None,
   modules: Optional[List[str]] = None,
   time: Optional[str] = None,
+  slots: Optional[int] = None,
   overwrite: bool = False,
+  save: bool = True,
 ) -> LocalConfig:
   """Creates and saves a configuration file for local execution.
 
@@ -290,13 +297,16 @@ def create_local_config(
     env: A list of environment variables to set.
     modules: A list of modules to load in sbatch scripts before running commands.
     time: Walltime (e.g., 01-00:00:00).
+    slots: Maximum number of jobs of this configuration running at the same time (default: 1).
     overwrite: If True, overwrite an existing configuration with the same name.
+    save: If False, the configuration is only built, and not saved (see `BaseConfig.save_configs`).
 
   Returns:
     The path to the newly created configuration file.
   """
-  config = LocalConfig(name=name, cluster_name=cluster_name if cluster_name else get_cluster_name(), env=env, time=time, modules=modules)
-  config.save_config(overwrite)
+  config = LocalConfig(name=name, cluster_name=cluster_name if cluster_name else get_cluster_name(), env=env, time=time, slots=slots, modules=modules)
+  if save:
+    config.save_config(overwrite)
   return config
 
 def create_pbs_config(
@@ -309,6 +319,7 @@ def create_pbs_config(
   env: Optional[List[str]] = None,
   custom_headers: Optional[List[str]] = None,
   overwrite: bool = False,
+  save: bool = True,
 ) -> PbsConfig:
   """Creates and saves a PBS configuration file.
 
@@ -322,6 +333,7 @@ def create_pbs_config(
     walltime: The maximum wall time for the job (e.g., "24:00:00").
     env: A list of environment variables to set.
     overwrite: If True, overwrite an existing configuration with the same name.
+    save: If False, the configuration is only built, and not saved (see `BaseConfig.save_configs`).
     custom_headers: Custom scheduler headers (e.g., ['#SBATCH --my_header=my_value'])
 
   Returns:
@@ -330,7 +342,8 @@ def create_pbs_config(
   config = PbsConfig(
     name=name, cluster_name=cluster_name if cluster_name else get_cluster_name(), queue=queue, cpus=cpus, mem=mem, walltime=walltime, env=env, custom_headers=custom_headers,
   )
-  config.save_config(overwrite)
+  if save:
+    config.save_config(overwrite)
   return config
 
 def create_slurm_config(
@@ -355,6 +368,7 @@ def create_slurm_config(
   env: Optional[List[str]] = None,
   custom_headers: Optional[List[str]] = None,
   overwrite: bool = False,
+  save: bool = True,
 ) -> SlurmConfig:
   """Creates and saves a SLURM configuration file.
 
@@ -380,6 +394,7 @@ def create_slurm_config(
     modules: Modules to load with `module load`.
     env: A list of environment variables to set.
     overwrite: If True, overwrite an existing configuration with the same name.
+    save: If False, the configuration is only built, and not saved (see `BaseConfig.save_configs`).
     custom_headers: Custom scheduler headers (e.g., ['#SBATCH --my_header=my_value'])
 
   Returns:
@@ -391,15 +406,57 @@ def create_slurm_config(
     time=time, gpus=str(gpus), constraint=constraint, nodelist=nodelist, exclude=exclude, qos=qos, reservation=reservation, exclusive=exclusive,
     modules=modules, env=env, custom_headers=custom_headers,
   )
-  config.save_config(overwrite)
+  if save:
+    config.save_config(overwrite)
+  return config
+
+# Config objects built by `get_config`: (cluster_name, config_name) -> (parsed configurations.yaml, config)
+_configs_cache: Dict[Tuple[str, str], Tuple[Dict[str, Any], BaseConfig]] = {}
+
+_config_classes = {
+  'slurm': SlurmConfig,
+  'pbs': PbsConfig,
+  'local': LocalConfig,
+}
+
+def get_config(cluster_name: str, config_name: str) -> BaseConfig:
+  """
+  Returns the configuration `config_name` of cluster `cluster_name`, as stored in configurations.yaml.
+  It will specialize the class to either SlurmConfig, LocalConfig or PbsConfig.
+  Config objects are cached until the file changes and shared by all callers, so they are read-only.
+  """
+  configs = load_project_configs()
+  cached = _configs_cache.get((cluster_name, config_name))
+  # A new dict is parsed whenever the file changes
+  if cached is not None and cached[0] is configs:
+    return cached[1]
+
+  configs_file_path = get_project_configs_file_path()
+  if cluster_name not in configs:
+    raise ConfigurationError(f"Could not find cluster '{cluster_name}' in configurations.yaml file ({configs_file_path})")
+  cluster_configs = configs[cluster_name].get('configs') or {}
+  if config_name not in cluster_configs:
+    raise ConfigurationError(f"Could not find configuration '{config_name}' in configurations.yaml file ({configs_file_path})")
+
+  config_dict = cluster_configs[config_name] or {}
+  scheduler = config_dict.get('scheduler') or configs[cluster_name].get('scheduler')
+  config_class = _config_classes.get(scheduler)
+  if config_class is None:
+    raise ConfigurationError(f"No class found for scheduler '{scheduler}'. Supported schedulers are: {', '.join(_config_classes)}.")
+
+  allowed_keys = {f.name for f in fields(config_class)} - {'name', 'cluster_name', 'scheduler'}
+  config = config_class(
+    name=config_name,
+    cluster_name=cluster_name,
+    **{k: v for k, v in config_dict.items() if k in allowed_keys},
+  ).freeze()
+  _configs_cache[(cluster_name, config_name)] = (configs, config)
   return config
 
 def load_local_config(name: str) -> Optional[LocalConfig]:
-  file = get_project_configs_file_path()
   cluster_name = get_cluster_name()
   try:
-    with open(file, "r") as f:
-      data = yaml.safe_load(f)
+    data = load_project_configs()
   except Exception as e:
     raise ConfigurationError(f"Could not read config file: {e}")
 
@@ -407,12 +464,7 @@ def load_local_config(name: str) -> Optional[LocalConfig]:
   if not cluster_data or cluster_data.get("scheduler") != "local":
     return None
 
-  for conf_name, conf in cluster_data.get("configs", []).items():
-    if conf_name == name:
-      conf["name"] = conf_name
-      conf["cluster_name"] = cluster_name
-      allowed_keys = {"name", "cluster_name", "env", "time"}
-      filtered_conf = {k: v for k, v in conf.items() if k in allowed_keys}
-      return LocalConfig(**filtered_conf)
-    
-  return None
+  if name not in (cluster_data.get("configs") or {}):
+    return None
+  config = get_config(cluster_name, name)
+  return config if isinstance(config, LocalConfig) else None
@@ -0,0 +1,330 @@
+"""
+Optional long-running status daemon (`sbatchman daemon`).
+
+Without it, every `jobs_list(update_jobs=True)`, TUI refresh or campaign poll of every user of a
+project queries the scheduler and re-validates the jobs index on its own. The daemon does it once
+for all of them: it keeps the metadata of all jobs in memory, refreshes the status of the active
+jobs with batched scheduler queries every `interval` seconds (see `jobs_manager.update_jobs_status`),
+and serves reads over a Unix socket in the project root.
+
+Clients (`jobs_list`, `jobs_by_ids` and `update_jobs_status` of `jobs_manager`) use it transparently
+whenever it is running, and fall back to reading the index themselves otherwise. Jobs launched,
+archived or deleted by the clients are written to the jobs index as usual: the daemon reloads its
+copy whenever the index file changes.
+
+The protocol is one JSON object per line: requests are `{"method": ..., "params": {...}}`, answers
+are `{"ok": true, "result": ...}` or `{"ok": false, "error": ...}`.
+"""
+import fnmatch
+import hashlib
+import json
+import os
+import socket
+import socketserver
+import stat
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sbatchman.config.project_config import get_archive_dir, get_jobs_index_path, get_project_root
+from sbatchman.exceptions import SbatchManError
+
+DEFAULT_REFRESH_INTERVAL = 30.0 # seconds between two scheduler queries
+CONNECT_TIMEOUT = 1.0 # seconds, after which the daemon is considered not running
+REQUEST_TIMEOUT = 120.0 # seconds to wait for an answer
+
+# Unix socket paths are limited to ~108 bytes
+MAX_SOCKET_PATH_LENGTH = 100
+
+
+class DaemonError(SbatchManError):
+  """Raised when the daemon cannot be started or answers a request with an error."""
+  pass
+
+
+def get_socket_path() -> Path:
+  """Returns the path of the socket of the daemon of the current project."""
+  project_root = get_project_root()
+  path = project_root / "daemon.sock"
+  if len(os.fsencode(path)) > MAX_SOCKET_PATH_LENGTH:
+    digest = hashlib.sha1(os.fsencode(project_root)).hexdigest()[:16]
+    path = Path(tempfile.gettempdir()) / f"sbatchman-{digest}.sock"
+  return path
+
+
+# ============================================================================
+# Client
+# ============================================================================
+
+def request(method: str, **params: Any) -> Tuple[bool, Any]:
+  """
+  Sends a request to the daemon of the current project.
+  Returns (True, result), or (False, None) if no daemon is running.
+  Raises DaemonError if the daemon fails to answer the request.
+  """
+  try:
+    path = get_socket_path()
+  except SbatchManError:
+    return False, None
+  if not path.exists():
+    return False, None
+
+  try:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+  except (AttributeError, OSError): # No Unix sockets on this platform
+    return False, None
+  try:
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+      sock.connect(str(path))
+    except OSError: # Stale socket of a daemon that is not running anymore
+      return False, None
+    sock.settimeout(REQUEST_TIMEOUT)
+    with sock.makefile('rwb') as f:
+      f.write(json.dumps({'method': method, 'params': params}).encode() + b'\n')
+      f.flush()
+      line = f.readline()
+  except OSError as e:
+    raise DaemonError(f"The SbatchMan daemon did not answer: {e}")
+  finally:
+    sock.close()
+
+  if not line:
+    raise DaemonError("The SbatchMan daemon closed the connection without answering.")
+  try:
+    answer = json.loads(line)
+  except ValueError:
+    answer = None
+  if not isinstance(answer, dict):
+    raise DaemonError(f"The SbatchMan daemon sent an invalid answer: {line[:200]!r}")
+  if not answer.get('ok'):
+    raise DaemonError(f"The SbatchMan daemon failed to answer: {answer.get('error')}")
+  return True, answer.get('result')
+
+
+def is_running() -> bool:
+  """Returns True if a daemon is serving the current project."""
+  try:
+    running, _ = request('ping')
+  except DaemonError:
+    return True
+  return running
+
+
+# ============================================================================
+# Server
+# ============================================================================
+
+def _matches(value: Optional[str], pattern: Optional[str]) -> bool:
+  """Name filters are exact names or shell-style wildcards, as in `jobs_index.query_jobs`."""
+  if not pattern:
+    return True
+  if set('*?[').intersection(pattern):
+    return fnmatch.fnmatchcase(value or '', pattern)
+  return value == pattern
+
+
+def _index_signature() -> Optional[Tuple[int, int]]:
+  try:
+    index_stat = os.stat(get_jobs_index_path())
+  except OSError:
+    return None
+  return index_stat.st_mtime_ns, index_stat.st_size
+
+
+class JobsState:
+  """The metadata of all the jobs of the project, kept in memory by the daemon."""
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self._reload_lock = threading.Lock()
+    self._refresh_lock = threading.Lock()
+    # (archive_name or '', job_dict)
+    self._jobs: List[Tuple[str, Dict[str, Any]]] = []
+    self._index_signature: Optional[Tuple[int, int]] = None
+    self.refreshed_at = 0.0
+
+  def reload(self, only_if_changed: bool = False):
+    """
+    Reloads the jobs from the jobs index, re-validating the unfinished ones against their metadata files.
+    If `only_if_changed` is True, they are only reloaded if the jobs index changed since the last reload.
+    """
+    # Imported here, jobs_manager is itself a client of the daemon
+    from sbatchman.core import jobs_manager
+
+    with self._reload_lock:
+      if only_if_changed and self._index_signature == _index_signature():
+        return
+      jobs = []
+      active = jobs_manager._query_index(from_active=True, from_archived=False)
+      if active is None:
+        return
+      jobs.extend(('', job_dict) for job_dict in active)
+      try:
+        archive_names = sorted(entry.name for entry in os.scandir(get_archive_dir()) if entry.is_dir())
+      except OSError:
+        archive_names = []
+      for archive_name in archive_names:
+        archived = jobs_manager._query_index(archive_name=archive_name, from_active=False, from_archived=True)
+        jobs.extend((archive_name, job_dict) for job_dict in archived or [])
+      # Taken after reading, since re-validating the jobs may update the index
+      signature = _index_signature()
+      with self._lock:
+        self._jobs = jobs
+        self._index_signature = signature
+
+  def refresh(self) -> int:
+    """Queries the scheduler for the status of the active jobs, then reloads them. Returns the number of updated jobs."""
+    from sbatchman.core import jobs_manager
+
+    with self._refresh_lock:
+      updated = jobs_manager.update_jobs_status(use_daemon=False)
+      self.reload()
+      self.refreshed_at = time.time()
+      return updated
+
+  def jobs(self) -> List[Tuple[str, Dict[str, Any]]]:
+    """Returns the jobs, reloading them first if the jobs index changed (e.g. jobs were launched or archived)."""
+    self.reload(only_if_changed=True)
+    with self._lock:
+      return self._jobs
+
+  def query(
+    self,
+    cluster_name: Optional[str] = None,
+    config_name: Optional[str] = None,
+    tag: Optional[str] = None,
+    archive_name: Optional[str] = None,
+    from_active: bool = True,
+    from_archived: bool = False,
+    job_ids: Optional[Sequence[Any]] = None,
+    status: Optional[Sequence[str]] = None,
+    variables: Optional[Dict[str, Any]] = None,
+  ) -> List[Dict[str, Any]]:
+    """Returns the metadata dicts of the jobs matching the given filters, see `jobs_manager.jobs_list`."""
+    from sbatchman.core import jobs_manager
+
+    if job_ids is not None:
+      job_ids = {str(job_id) for job_id in job_ids}
+    if status is not None:
+      status = set(status)
+    result = []
+    for job_archive_name, job_dict in self.jobs():
+      if job_archive_name:
+        if not from_archived or not _matches(job_archive_name, archive_name):
+          continue
+      elif not from_active:
+        continue
+      if not (
+        _matches(job_dict.get('cluster_name'), cluster_name) and
+        _matches(job_dict.get('config_name'), config_name) and
+        _matches(job_dict.get('tag'), tag)
+      ):
+        continue
+      if job_ids is not None and str(job_dict.get('job_id')) not in job_ids:
+        continue
+      if status is not None and str(job_dict.get('status')) not in status:
+        continue
+      if not jobs_manager._match_variables(job_dict, variables):
+        continue
+      result.append(job_dict)
+    return result
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+  def handle(self):
+    for line in self.rfile:
+      message = {}
+      try:
+        message = json.loads(line)
+        result = self.server.dispatch(message['method'], message.get('params') or {})
+        answer = {'ok': True, 'result': result}
+      except Exception as e:
+        answer = {'ok': False, 'error': f"{type(e).__name__}: {e}"}
+      self.wfile.write(json.dumps(answer, default=str).encode() + b'\n')
+      self.wfile.flush()
+      if isinstance(message, dict) and message.get('method') == 'stop':
+        # Only once answered, `serve` exits as soon as the event is set
+        self.server.stopping.set()
+        return
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+  daemon_threads = True
+
+  def __init__(self, path: Path, state: JobsState, interval: float):
+    super().__init__(str(path), _RequestHandler)
+    self.state = state
+    self.interval = interval
+    self.stopping = threading.Event()
+
+  def dispatch(self, method: str, params: Dict[str, Any]) -> Any:
+    if method == 'ping':
+      return {'pid': os.getpid(), 'interval': self.interval, 'refreshed_at': self.state.refreshed_at}
+    if method == 'jobs':
+      return self.state.query(**params)
+    if method == 'refresh':
+      return self.state.refresh()
+    if method == 'stop':
+      return None
+    raise ValueError(f"Unknown method '{method}'")
+
+
+def _socket_mode() -> int:
+  """Lets the users that can write to the project directory connect to the daemon."""
+  project_mode = os.stat(get_project_root()).st_mode
+  mode = 0
+  for write_bit, socket_bits in ((stat.S_IWUSR, 0o600), (stat.S_IWGRP, 0o060), (stat.S_IWOTH, 0o006)):
+    if project_mode & write_bit:
+      mode |= socket_bits
+  return mode
+
+
+def serve(interval: float = DEFAULT_REFRESH_INTERVAL, on_refresh=None):
+  """
+  Runs the daemon of the current project until it is stopped (see `stop`) or interrupted.
+  Args:
+    interval: Seconds between two refreshes of the status of the active jobs.
+    on_refresh: Called after every refresh with the number of updated jobs.
+  Raises:
+    DaemonError: If a daemon is already running for the project.
+  """
+  path = get_socket_path()
+  if is_running():
+    raise DaemonError(f"A SbatchMan daemon is already running for this project ({path}).")
+  try:
+    path.unlink()
+  except FileNotFoundError:
+    pass
+
+  state = JobsState()
+  state.reload()
+  server = _Server(path, state, interval)
+  try:
+    os.chmod(path, _socket_mode())
+    serving = threading.Thread(target=server.serve_forever, daemon=True)
+    serving.start()
+    while not server.stopping.is_set():
+      try:
+        updated = state.refresh()
+        if on_refresh is not None:
+          on_refresh(updated)
+      except Exception:
+        pass # e.g. the scheduler is temporarily unavailable, try again at the next refresh
+      server.stopping.wait(interval)
+  finally:
+    server.shutdown()
+    server.server_close()
+    try:
+      path.unlink()
+    except FileNotFoundError:
+      pass
+
+
+def stop() -> bool:
+  """Stops the daemon of the current project. Returns False if it was not running."""
+  running, _ = request('stop')
+  return running
@@ -0,0 +1,164 @@
+"""
+Persistent cache of the results of the `jobs_to_dataframe` extractors.
+
+Extractors usually parse the logs of a job, which do not change anymore once the job is finished,
+so re-running them over all jobs every time a dataframe is built is mostly wasted work. Their
+results are stored in a SQLite database in the project root, keyed by job, extractor (name and
+code, see `extractor_key`) and a signature of the job files (see `job_signature`): a cached result
+is only used if none of them changed.
+
+The cache does not track the globals or the files an extractor may read besides the job logs.
+Delete `extract_cache.sqlite` from the project root to clear it.
+"""
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from types import CodeType
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from sbatchman.config.project_config import get_extract_cache_path
+from sbatchman.core import job_state
+from sbatchman.core.job import Job
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+  archive_name TEXT NOT NULL,
+  exp_dir TEXT NOT NULL,
+  extractor TEXT NOT NULL,
+  signature TEXT NOT NULL,
+  result BLOB NOT NULL,
+  PRIMARY KEY (archive_name, exp_dir, extractor)
+);
+"""
+
+# Maximum number of extractor keys bound to a single `IN (...)` query
+MAX_KEYS_PER_QUERY = 500
+
+# (archive_name, exp_dir, extractor key)
+ResultKey = Tuple[str, str, str]
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+  """Returns a (per-thread) connection to the cache of the current project."""
+  path = str(get_extract_cache_path())
+  connections = getattr(_local, 'connections', None)
+  if connections is None:
+    connections = _local.connections = {}
+  conn = connections.get(path)
+  if conn is None:
+    conn = sqlite3.connect(path, timeout=60)
+    # The cache can always be rebuilt by running the extractors again
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(_SCHEMA)
+    connections[path] = conn
+  return conn
+
+
+def _hash_code(h: 'hashlib._Hash', code: CodeType):
+  h.update(code.co_code)
+  h.update(repr(code.co_names).encode())
+  for const in code.co_consts:
+    if isinstance(const, CodeType): # Nested functions, lambdas and comprehensions
+      _hash_code(h, const)
+    else:
+      h.update(repr(const).encode())
+
+
+def extractor_key(extractor: Callable) -> Optional[str]:
+  """
+  Identifies an extractor by its name, code, default arguments and closure, so that editing it
+  invalidates its cached results. Returns None for callables whose code cannot be inspected
+  (e.g. builtins or `functools.partial` objects), whose results are never cached.
+  """
+  code = getattr(extractor, '__code__', None)
+  if not isinstance(code, CodeType):
+    return None
+  h = hashlib.sha1()
+  h.update(f"{getattr(extractor, '__module__', '')}.{getattr(extractor, '__qualname__', '')}".encode())
+  _hash_code(h, code)
+  h.update(repr(getattr(extractor, '__defaults__', None)).encode())
+  h.update(repr(getattr(extractor, '__kwdefaults__', None)).encode())
+  # Values that include memory addresses in their repr simply never hit the cache
+  for cell in getattr(extractor, '__closure__', None) or ():
+    try:
+      h.update(repr(cell.cell_contents).encode())
+    except ValueError: # Empty cell
+      pass
+  return h.hexdigest()
+
+
+def _file_signature(path: os.PathLike) -> str:
+  try:
+    stat = os.stat(path)
+    return f"{stat.st_mtime_ns}:{stat.st_size}"
+  except OSError:
+    return "-"
+
+
+def job_signature(job: Job) -> str:
+  """Returns a string that changes whenever the metadata or the logs of a job change."""
+  metadata_path = job.get_metadata_path()
+  try:
+    metadata = "{}:{}".format(*job_state.metadata_signature(metadata_path))
+  except OSError:
+    metadata = "-"
+  return "|".join([metadata, _file_signature(job.get_stdout_path()), _file_signature(job.get_stderr_path())])
+
+
+def result_key(job: Job, extractor: str) -> ResultKey:
+  return (job.archive_name or '', str(job.exp_dir), extractor)
+
+
+def load(extractor_keys: Sequence[str]) -> Dict[ResultKey, Tuple[str, bytes]]:
+  """Returns the cached (signature, pickled result) of the given extractors, for all jobs."""
+  extractor_keys = list(dict.fromkeys(extractor_keys))
+  cached = {}
+  try:
+    conn = _connect()
+    for i in range(0, len(extractor_keys), MAX_KEYS_PER_QUERY):
+      batch = extractor_keys[i:i + MAX_KEYS_PER_QUERY]
+      rows = conn.execute(
+        f"SELECT archive_name, exp_dir, extractor, signature, result FROM results WHERE extractor IN ({', '.join('?' * len(batch))})",
+        batch,
+      )
+      for archive_name, exp_dir, extractor, signature, result in rows:
+        cached[(archive_name, exp_dir, extractor)] = (signature, result)
+  except sqlite3.Error:
+    return {}
+  return cached
+
+
+def get(cached: Dict[ResultKey, Tuple[str, bytes]], key: ResultKey, signature: str) -> Tuple[bool, Any]:
+  """Looks up a result loaded by `load`. Returns (found, result)."""
+  entry = cached.get(key)
+  if entry is None or entry[0] != signature:
+    return False, None
+  try:
+    return True, pickle.loads(entry[1])
+  except Exception:
+    return False, None
+
+
+def pack(key: ResultKey, signature: str, result: Any) -> Optional[tuple]:
+  """Prepares a result to be stored by `store`. Returns None if it cannot be pickled."""
+  try:
+    return (*key, signature, pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL))
+  except Exception:
+    return None
+
+
+def store(rows: Iterable[tuple]):
+  """Stores the results prepared by `pack`, in a single transaction."""
+  rows = [row for row in rows if row is not None]
+  if not rows:
+    return
+  try:
+    conn = _connect()
+    with conn:
+      conn.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)", rows)
+  except sqlite3.Error:
+    pass
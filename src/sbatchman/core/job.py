@@ -1,17 +1,13 @@
-import yaml
 from pathlib import Path
 from typing import Any, List, Optional, Union
 from dataclasses import dataclass, asdict
 import shlex
 
-from sbatchman.config.project_config import get_archive_dir, get_experiments_dir, get_project_configs_file_path
+from sbatchman.config.project_config import get_archive_dir, get_experiments_dir
+from sbatchman.core.config_manager import get_config
+from sbatchman.core import job_state, jobs_index
 from sbatchman.core.status import Status
-from sbatchman.exceptions import ConfigurationError, ConfigurationNotFoundError
-from sbatchman.schedulers.pbs import PbsConfig
-from sbatchman.schedulers.slurm import SlurmConfig
-from sbatchman.schedulers.local import LocalConfig
 from sbatchman.schedulers.base import BaseConfig
-import subprocess
 from datetime import datetime
 
 @dataclass
@@ -23,7 +19,7 @@ class Job:
   status: str
   scheduler: str
   tag: str
-  job_id: int
+  job_id: Union[int, str]
   queued_timestamp: str
   exitcode: Optional[int] = None
   preprocess: Optional[str] = None
@@ -36,37 +32,10 @@ class Job:
 
   def get_job_config(self) -> BaseConfig:
     """
-    Returns the configuration of the job. It will specialize the class to either SlurmConfig, LocalConfig or PbsConfig
+    Returns the configuration of the job. It will specialize the class to either SlurmConfig, LocalConfig or PbsConfig.
+    The configuration is shared with the other jobs using it, and is read-only.
     """
-  
-    configs_file_path = get_project_configs_file_path()
-
-    if not configs_file_path.exists():
-      raise ConfigurationNotFoundError(f"Configuration '{configs_file_path}' for cluster '{self.cluster_name}' not found at '{configs_file_path}'.")
-    
-    configs = yaml.safe_load(open(configs_file_path, 'r'))
-    if self.cluster_name not in configs:
-      raise ConfigurationError(f"Could not find cluster '{self.cluster_name}' in configurations.yaml file ({configs_file_path})")
-    
-    scheduler = configs[self.cluster_name]['scheduler']
-    configs = configs[self.cluster_name]['configs']
-    if self.config_name not in configs:
-      raise ConfigurationError(f"Could not find configuration '{self.config_name}' in configurations.yaml file ({configs_file_path})")
-    
-    config_dict = configs[self.config_name]
-    config_dict['name'] = self.config_name
-    config_dict['cluster_name'] = self.cluster_name
-    if 'scheduler' in config_dict:
-      del config_dict['scheduler']
-
-    if scheduler == 'slurm':
-      return SlurmConfig(**config_dict)
-    elif scheduler == 'pbs':
-      return PbsConfig(**config_dict)
-    elif scheduler == 'local':
-      return LocalConfig(**config_dict)
-    else:
-      raise ConfigurationError(f"No class found for scheduler '{scheduler}'. Supported schedulers are: slurm, pbs, local.")
+    return get_config(self.cluster_name, self.config_name)
 
   def parse_command_args(self) -> Union[tuple[None, None, None], tuple[str, List[Any], dict[Any, Any]]]:
     """
@@ -159,9 +128,10 @@ class Job:
     VARS_TO_KEEP = ["start_timestamp", "end_timestamp"]
     if not override_status:
       VARS_TO_KEEP += ['status']
+    existing_data = None
     if path.exists():
-      with open(path, "r") as f:
-        existing_data = yaml.safe_load(f) or {}
+      existing_data, _ = job_state.read_metadata(path)
+      existing_data = existing_data or {}
       for var in VARS_TO_KEEP:
         if var in existing_data and existing_data[var] is not None:
           job_dict[var] = existing_data[var]
@@ -171,8 +141,12 @@ class Job:
       if isinstance(value, Path) or isinstance(value, Status):
         job_dict[key] = str(value)
     
-    with open(path, "w") as f:
-      yaml.dump(job_dict, f, default_flow_style=False)
+    job_state.write_metadata(path, job_dict)
+    # The status recorded by the job script takes precedence over the one in metadata.yaml
+    if existing_data and existing_data.get('status') != job_dict['status'] and job_state.get_state_path(path).exists():
+      job_state.record(path, status=job_dict['status'])
+
+    jobs_index.index_job(path, job_dict)
 
   def write_job_id(self):
     """
@@ -182,7 +156,8 @@ class Job:
     path = self.get_metadata_path()
 
     if path.exists():
-      subprocess.run(["perl", "-i", "-pe", f"s/^job_id: [0-9]*/job_id: {int(self.job_id)}/", str(path)], check=True)
+      job_state.update(path, job_id=self.job_id)
+      jobs_index.index_job(path)
       
   def write_job_status(self):
     """
@@ -191,7 +166,8 @@ class Job:
     path = self.get_metadata_path()
 
     if path.exists():
-      subprocess.run(["sed", "-i", f"/^status:/c\\status: {str(self.status)}", str(path)], check=True)
+      job_state.update(path, status=str(self.status))
+      jobs_index.index_job(path)
 
   def get_time_in_queue(self) -> Optional[float]:
     """
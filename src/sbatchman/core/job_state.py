@@ -0,0 +1,133 @@
+"""
+Atomic updates of the jobs metadata.
+
+`metadata.yaml` is written by SbatchMan when a job is submitted, and is only ever replaced as a
+whole (see `write_metadata`). The fields that change afterwards (job id, status, exit code, start
+and end timestamps) are appended, one `key: value` line each, to the `state.log` file next to it:
+by the job script, with a single `printf >>` per event, and by SbatchMan itself (see `update`).
+Appending does not fork any helper process nor rewrite the metadata file, so it cannot race with
+SbatchMan rewriting it, or leave duplicated keys behind.
+
+Readers merge the two files (see `read_metadata`): the last value of each field in the state log
+wins. Jobs submitted by older versions of SbatchMan edit `metadata.yaml` in place and never create
+a state log, so their metadata is read and updated as before.
+"""
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+import yaml
+try:
+  from yaml import CSafeLoader as SafeLoader
+except ImportError:
+  from yaml import SafeLoader
+
+STATE_FILE_NAME = "state.log"
+
+# Fields of the state log that are read back as integers when possible
+_INT_FIELDS = ('job_id', 'exitcode')
+
+
+def get_state_path(metadata_path: Path) -> Path:
+  """Returns the path of the state log of the job whose metadata is stored at `metadata_path`."""
+  return Path(metadata_path).with_name(STATE_FILE_NAME)
+
+
+def _format_value(value: Any) -> str:
+  if value is None:
+    return 'null'
+  if isinstance(value, int):
+    return str(value)
+  return "'" + str(value).replace("'", "''") + "'"
+
+
+def _parse_value(key: str, value: str) -> Any:
+  value = value.strip()
+  if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+    return value[1:-1].replace("''", "'") if value[0] == "'" else value[1:-1]
+  if value in ('null', '~', ''):
+    return None
+  if key in _INT_FIELDS:
+    try:
+      return int(value)
+    except ValueError:
+      pass
+  return value
+
+
+def parse_state(text: str) -> Dict[str, Any]:
+  """Parses the content of a state log. Later values of a field override earlier ones."""
+  state = {}
+  for line in text.splitlines():
+    key, sep, value = line.partition(':')
+    if sep and key.strip():
+      state[key.strip()] = _parse_value(key.strip(), value)
+  return state
+
+
+def read_state(metadata_path: Path) -> Dict[str, Any]:
+  """Returns the fields recorded in the state log of a job, or an empty dict if there is none."""
+  try:
+    with open(get_state_path(metadata_path), 'r') as f:
+      return parse_state(f.read())
+  except OSError:
+    return {}
+
+
+def metadata_signature(metadata_path: Path) -> Tuple[int, int]:
+  """
+  Returns a (mtime_ns, size) pair that changes whenever the metadata or the state log of a job
+  change. Raises OSError if the metadata file does not exist.
+  """
+  stat = os.stat(metadata_path)
+  try:
+    state_stat = os.stat(get_state_path(metadata_path))
+  except OSError:
+    return stat.st_mtime_ns, stat.st_size
+  return max(stat.st_mtime_ns, state_stat.st_mtime_ns), stat.st_size + state_stat.st_size
+
+
+def read_metadata(metadata_path: Path) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[int, int]]]:
+  """
+  Reads the metadata of a job merged with its state log.
+  Returns (job_dict, signature), or (None, None) if the metadata file is missing or invalid.
+  """
+  try:
+    signature = metadata_signature(metadata_path)
+    with open(metadata_path, 'r') as f:
+      job_dict = yaml.load(f, Loader=SafeLoader)
+    if isinstance(job_dict, dict):
+      job_dict.update(read_state(metadata_path))
+      return job_dict, signature
+  except Exception:
+    pass
+  return None, None
+
+
+def write_metadata(metadata_path: Path, job_dict: Dict[str, Any]):
+  """Writes the metadata file of a job, replacing it atomically."""
+  metadata_path = Path(metadata_path)
+  tmp_path = metadata_path.with_name(f".{metadata_path.name}.{os.getpid()}.tmp")
+  with open(tmp_path, 'w') as f:
+    yaml.dump(job_dict, f, default_flow_style=False)
+  os.replace(tmp_path, metadata_path)
+
+
+def record(metadata_path: Path, **fields: Any):
+  """Appends the given fields to the state log of a job, with a single write."""
+  lines = "".join(f"{key}: {_format_value(value)}\n" for key, value in fields.items())
+  with open(get_state_path(metadata_path), 'a') as f:
+    f.write(lines)
+
+
+def update(metadata_path: Path, **fields: Any):
+  """
+  Updates some fields of the metadata of a job: they are recorded in its state log if the job
+  has one, otherwise they are written to its metadata file.
+  """
+  if get_state_path(metadata_path).exists():
+    record(metadata_path, **fields)
+    return
+  with open(metadata_path, 'r') as f:
+    job_dict = yaml.load(f, Loader=SafeLoader) or {}
+  job_dict.update(fields)
+  write_metadata(metadata_path, job_dict)
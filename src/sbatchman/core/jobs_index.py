@@ -0,0 +1,423 @@
+"""
+Persistent SQLite index of the jobs metadata.
+
+Every job lives in `experiments/<cluster>/<config>/<tag>/<timestamp>/metadata.yaml` (or in
+`archive/<archive_name>/...`), and listing jobs used to mean walking all these directories and
+YAML-parsing every file. This module keeps a copy of each metadata file in a SQLite database
+stored in the project root, so that jobs can be looked up by cluster/config/tag/job_id with an
+indexed query.
+
+The YAML files remain the source of truth: the index is only a cache that can always be rebuilt
+from them (see `jobs_manager.reindex_jobs` / `sbatchman reindex`). Since the generated `run.sh`
+scripts update the metadata outside of Python (see `job_state`), rows of jobs that are not finished
+yet are re-validated against the files mtime/size whenever they are queried.
+
+Each row also stores a hash of the fields compared by the duplicate check of the launcher (see
+`duplicate_key`), so that checking whether a job was already submitted is a single indexed lookup.
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import concurrent.futures
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sbatchman.config.project_config import get_archive_dir, get_experiments_dir, get_jobs_index_path, get_project_root
+from sbatchman.core import job_state
+from sbatchman.core.status import TERMINAL_STATES
+
+# Bump this whenever the schema changes, existing indexes will be rebuilt automatically
+INDEX_SCHEMA_VERSION = 2
+
+# Archive name used for active (not archived) jobs. SQLite does not enforce uniqueness of NULL
+# values in a primary key, so an empty string is used instead.
+ACTIVE = ''
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+  key TEXT PRIMARY KEY,
+  value TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+  archive_name TEXT NOT NULL,
+  exp_dir TEXT NOT NULL,
+  cluster_name TEXT,
+  config_name TEXT,
+  tag TEXT,
+  status TEXT,
+  job_id TEXT,
+  metadata TEXT NOT NULL,
+  mtime_ns INTEGER,
+  size INTEGER,
+  final INTEGER NOT NULL DEFAULT 0,
+  dup_key TEXT,
+  dup_key_any_config TEXT,
+  PRIMARY KEY (archive_name, exp_dir)
+);
+CREATE INDEX IF NOT EXISTS jobs_cluster_config_tag ON jobs (cluster_name, config_name, tag);
+CREATE INDEX IF NOT EXISTS jobs_job_id ON jobs (job_id);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status);
+CREATE INDEX IF NOT EXISTS jobs_dup_key ON jobs (dup_key);
+CREATE INDEX IF NOT EXISTS jobs_dup_key_any_config ON jobs (dup_key_any_config);
+"""
+
+# Maximum number of job ids bound to a single `IN (...)` query
+MAX_IDS_PER_QUERY = 500
+
+_local = threading.local()
+
+
+def _connect() -> sqlite3.Connection:
+  """Returns a (per-thread) connection to the index of the current project."""
+  path = str(get_jobs_index_path())
+  connections = getattr(_local, 'connections', None)
+  if connections is None:
+    connections = _local.connections = {}
+  conn = connections.get(path)
+  if conn is None:
+    conn = sqlite3.connect(path, timeout=60)
+    # The index can always be rebuilt from the metadata files, durability is not a concern
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    version = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    if version is not None and version[0] != str(INDEX_SCHEMA_VERSION):
+      # Built with an older schema: `is_built` returns False until the index is rebuilt
+      conn.execute("DROP TABLE IF EXISTS jobs")
+    conn.executescript(_SCHEMA)
+    connections[path] = conn
+  return conn
+
+
+def _stale_marker_path() -> Path:
+  index_path = get_jobs_index_path()
+  return index_path.with_name(index_path.name + '.stale')
+
+
+def mark_stale():
+  """
+  Flags the index as out of sync with the metadata files, so that it is rebuilt on next use.
+  This is used when an update of the index fails, since it would otherwise silently miss jobs.
+  """
+  try:
+    _stale_marker_path().touch()
+  except OSError:
+    pass
+
+
+def is_built() -> bool:
+  """Returns True if the index has been fully built for the current project and is up to date."""
+  if not get_jobs_index_path().exists() or _stale_marker_path().exists():
+    return False
+  rows = dict(_connect().execute("SELECT key, value FROM meta").fetchall())
+  return (
+    rows.get('schema_version') == str(INDEX_SCHEMA_VERSION) and
+    # The project may have been moved or copied from another machine
+    rows.get('project_root') == str(get_project_root())
+  )
+
+
+def metadata_path_for(archive_name: Optional[str], exp_dir: str) -> Path:
+  """Returns the path of the metadata.yaml file of the job identified by (archive_name, exp_dir)."""
+  if archive_name:
+    return get_archive_dir() / archive_name / exp_dir / "metadata.yaml"
+  return get_experiments_dir() / exp_dir / "metadata.yaml"
+
+
+def _key_from_metadata_path(metadata_path: Path) -> Optional[Tuple[str, str]]:
+  """Derives the (archive_name, exp_dir) key of a job from the location of its metadata file."""
+  job_dir = Path(metadata_path).parent
+  try:
+    return ACTIVE, job_dir.relative_to(get_experiments_dir()).as_posix()
+  except ValueError:
+    pass
+  try:
+    archive_name, *exp_dir_parts = job_dir.relative_to(get_archive_dir()).parts
+    return archive_name, Path(*exp_dir_parts).as_posix()
+  except (ValueError, TypeError):
+    return None
+
+
+def _is_final(job_dict: Dict[str, Any]) -> bool:
+  """
+  Jobs in a terminal state whose script already wrote the end timestamp will not be modified
+  anymore outside of SbatchMan, so their rows do not need to be re-validated.
+  """
+  return str(job_dict.get('status')) in TERMINAL_STATES and job_dict.get('end_timestamp') is not None
+
+
+def duplicate_key(
+  cluster_name: Any,
+  config_name: Any,
+  tag: Any,
+  command: Any,
+  preprocess: Any,
+  postprocess: Any,
+) -> str:
+  """
+  Returns a hash of the fields that identify identical jobs. `config_name` is None when jobs with
+  different configurations are considered identical.
+  """
+  fields = json.dumps([cluster_name, config_name, tag, command, preprocess, postprocess], default=str)
+  return hashlib.sha1(fields.encode()).hexdigest()
+
+
+def _job_duplicate_keys(job_dict: Dict[str, Any]) -> Tuple[str, str]:
+  fields = [job_dict.get(k) for k in ('cluster_name', 'config_name', 'tag', 'command', 'preprocess', 'postprocess')]
+  any_config_fields = list(fields)
+  any_config_fields[1] = None
+  return duplicate_key(*fields), duplicate_key(*any_config_fields)
+
+
+def _make_row(key: Tuple[str, str], job_dict: Dict[str, Any], signature: Optional[Tuple[int, int]]) -> tuple:
+  archive_name, exp_dir = key
+  job_id = job_dict.get('job_id')
+  dup_key, dup_key_any_config = _job_duplicate_keys(job_dict)
+  return (
+    archive_name,
+    exp_dir,
+    job_dict.get('cluster_name'),
+    job_dict.get('config_name'),
+    job_dict.get('tag'),
+    str(job_dict.get('status')),
+    str(job_id) if job_id is not None else None,
+    json.dumps(job_dict, default=str),
+    signature[0] if signature else None,
+    signature[1] if signature else None,
+    int(_is_final(job_dict)),
+    dup_key,
+    dup_key_any_config,
+  )
+
+
+_UPSERT = "INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def index_job(metadata_path: Path, job_dict: Optional[Dict[str, Any]] = None):
+  """
+  Adds or updates the job stored at `metadata_path` in the index.
+  If `job_dict` is None, the metadata file is read from disk.
+  """
+  key = _key_from_metadata_path(metadata_path)
+  if key is None:
+    return
+  try:
+    if job_dict is None:
+      job_dict, signature = job_state.read_metadata(metadata_path)
+      if job_dict is None:
+        remove_job(key[0], key[1])
+        return
+    else:
+      signature = job_state.metadata_signature(metadata_path)
+      job_dict = {**job_dict, **job_state.read_state(metadata_path)}
+    conn = _connect()
+    with conn:
+      conn.execute(_UPSERT, _make_row(key, job_dict, signature))
+  except (sqlite3.Error, OSError):
+    mark_stale()
+
+
+def remove_job(archive_name: Optional[str], exp_dir: str):
+  """Removes the job identified by (archive_name, exp_dir) from the index."""
+  try:
+    conn = _connect()
+    with conn:
+      conn.execute("DELETE FROM jobs WHERE archive_name = ? AND exp_dir = ?", (archive_name or ACTIVE, str(exp_dir)))
+  except sqlite3.Error:
+    mark_stale()
+
+
+def remove_archive(archive_name: str):
+  """Removes all the jobs of an archive from the index."""
+  try:
+    conn = _connect()
+    with conn:
+      conn.execute("DELETE FROM jobs WHERE archive_name = ?", (archive_name,))
+  except sqlite3.Error:
+    mark_stale()
+
+
+def rebuild(metadata_paths: Iterable[Path]) -> int:
+  """
+  Replaces the whole content of the index with the given metadata files.
+
+  Returns:
+    The number of indexed jobs.
+  """
+  metadata_paths = list(metadata_paths)
+  max_workers = min(100, len(metadata_paths) + 1)
+  rows = []
+  with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    for path, (job_dict, signature) in zip(metadata_paths, executor.map(job_state.read_metadata, metadata_paths)):
+      key = _key_from_metadata_path(path)
+      if job_dict is not None and key is not None:
+        rows.append(_make_row(key, job_dict, signature))
+
+  conn = _connect()
+  with conn:
+    conn.execute("DELETE FROM jobs")
+    conn.executemany(_UPSERT, rows)
+    conn.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+      ('schema_version', str(INDEX_SCHEMA_VERSION)),
+      ('project_root', str(get_project_root())),
+      ('built_at', datetime.now().strftime("%Y%m%d_%H%M%S")),
+    ])
+  try:
+    _stale_marker_path().unlink()
+  except FileNotFoundError:
+    pass
+  return len(rows)
+
+
+def _pattern_clause(column: str, pattern: Optional[str], params: list) -> Optional[str]:
+  """
+  Translates a name filter into SQL. Like directory scanning, filters may be exact names or
+  shell-style wildcards, which map directly onto SQLite's (case sensitive) GLOB operator.
+  """
+  if not pattern:
+    return None
+  if set('*?[').intersection(pattern):
+    params.append(pattern.replace('[!', '[^'))
+    return f"{column} GLOB ?"
+  params.append(pattern)
+  return f"{column} = ?"
+
+
+def _revalidate(rows: List[tuple]) -> List[Dict[str, Any]]:
+  """
+  Checks the metadata files (and state logs) of non-final rows against the stored mtime/size,
+  re-reading (and re-indexing) only the ones that changed and dropping the ones that no longer exist.
+  Returns the up-to-date job dicts.
+  """
+  def check(row):
+    archive_name, exp_dir, metadata, mtime_ns, size, final = row
+    if final:
+      return row, json.loads(metadata), None
+    path = metadata_path_for(archive_name, exp_dir)
+    try:
+      signature = job_state.metadata_signature(path)
+    except OSError:
+      return row, None, None
+    if signature == (mtime_ns, size):
+      return row, json.loads(metadata), None
+    job_dict, signature = job_state.read_metadata(path)
+    return row, job_dict, signature
+
+  job_dicts = []
+  upserts = []
+  deletes = []
+  max_workers = min(100, len(rows) + 1)
+  with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    for row, job_dict, signature in executor.map(check, rows):
+      if job_dict is None:
+        deletes.append((row[0], row[1]))
+        continue
+      if signature is not None:
+        upserts.append(_make_row((row[0], row[1]), job_dict, signature))
+      job_dicts.append(job_dict)
+
+  if upserts or deletes:
+    try:
+      conn = _connect()
+      with conn:
+        conn.executemany(_UPSERT, upserts)
+        conn.executemany("DELETE FROM jobs WHERE archive_name = ? AND exp_dir = ?", deletes)
+    except sqlite3.Error:
+      mark_stale()
+  return job_dicts
+
+
+def query_jobs(
+  cluster_name: Optional[str] = None,
+  config_name: Optional[str] = None,
+  tag: Optional[str] = None,
+  archive_name: Optional[str] = None,
+  from_active: bool = True,
+  from_archived: bool = False,
+  job_ids: Optional[Sequence[Any]] = None,
+  validate: bool = True,
+) -> List[Dict[str, Any]]:
+  """
+  Returns the metadata dicts of the indexed jobs matching the given filters.
+  `cluster_name`, `config_name`, `tag` and `archive_name` accept shell-style wildcards.
+
+  Args:
+    job_ids: If not None, only return jobs whose scheduler id is in this list.
+    validate: If True, re-check non-final jobs against their metadata files (see `_revalidate`).
+      Set it to False when only immutable fields (e.g. the command) are needed.
+  """
+  if not from_active and not from_archived:
+    return []
+
+  params: list = []
+  clauses = []
+  for column, pattern in (('cluster_name', cluster_name), ('config_name', config_name), ('tag', tag)):
+    clause = _pattern_clause(column, pattern, params)
+    if clause:
+      clauses.append(clause)
+
+  scopes = []
+  if from_active:
+    scopes.append("archive_name = ''")
+  if from_archived:
+    archive_clause = _pattern_clause('archive_name', archive_name, params)
+    scopes.append(f"(archive_name != '' AND {archive_clause})" if archive_clause else "archive_name != ''")
+  clauses.append(f"({' OR '.join(scopes)})")
+
+  sql = f"SELECT archive_name, exp_dir, metadata, mtime_ns, size, final FROM jobs WHERE {' AND '.join(clauses)}"
+  conn = _connect()
+  if job_ids is None:
+    rows = conn.execute(sql, params).fetchall()
+  else:
+    rows = []
+    job_ids = list(dict.fromkeys(str(j) for j in job_ids))
+    # Stay below SQLite's limit on the number of bound parameters
+    for i in range(0, len(job_ids), MAX_IDS_PER_QUERY):
+      batch = job_ids[i:i + MAX_IDS_PER_QUERY]
+      rows.extend(conn.execute(f"{sql} AND job_id IN ({', '.join('?' * len(batch))})", params + batch).fetchall())
+
+  if not validate:
+    return [json.loads(row[2]) for row in rows]
+  return _revalidate(rows)
+
+
+def find_duplicate(
+  cluster_name: str,
+  config_name: Optional[str],
+  tag: str,
+  command: Optional[str] = None,
+  preprocess: Optional[str] = None,
+  postprocess: Optional[str] = None,
+  compare_commands: bool = True,
+  from_archived: bool = True,
+) -> Optional[str]:
+  """
+  Looks for an indexed job identical to the given one, preferring active jobs over archived ones.
+
+  Args:
+    config_name: If None, jobs with any configuration match.
+    compare_commands: If False, any job with the same cluster, configuration and tag matches.
+    from_archived: If False, archived jobs are ignored.
+  Returns:
+    The archive name of the matching job ('' for active jobs), or None if there is none.
+  """
+  params: list = []
+  if compare_commands:
+    column = 'dup_key' if config_name is not None else 'dup_key_any_config'
+    clauses = [f"{column} = ?"]
+    params.append(duplicate_key(cluster_name, config_name, tag, command, preprocess, postprocess))
+  else:
+    clauses = ["cluster_name = ?", "tag = ?"]
+    params.extend([cluster_name, tag])
+    if config_name is not None:
+      clauses.append("config_name = ?")
+      params.append(config_name)
+  if not from_archived:
+    clauses.append("archive_name = ''")
+
+  row = _connect().execute(
+    f"SELECT archive_name FROM jobs WHERE {' AND '.join(clauses)} ORDER BY archive_name != '' LIMIT 1",
+    params,
+  ).fetchone()
+  return row[0] if row is not None else None
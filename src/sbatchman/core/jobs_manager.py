@@ -2,22 +2,24 @@ from ast import Tuple
 import shutil
 import fnmatch
 import os
-from typing import Callable, List, Optional, Dict, Any, Tuple
+from typing import Callable, Iterable, List, Optional, Dict, Any, Tuple, Type, Union
 import concurrent.futures
+import sqlite3
 from pathlib import Path
 import pandas as pd
 from dataclasses import asdict
 import yaml
-try:
-  from yaml import CSafeLoader as SafeLoader
-except ImportError:
-  from yaml import SafeLoader
 
 from sbatchman.config.global_config import get_cluster_name
 from sbatchman.config.project_config import get_archive_dir, get_experiments_dir
+from sbatchman.core import daemon, extract_cache, job_state, jobs_index, packing
 from sbatchman.core.job import Job
 from sbatchman.core.status import TERMINAL_STATES, Status
 from sbatchman.exceptions import ArchiveExistsError
+from sbatchman.schedulers.base import BaseConfig
+from sbatchman.schedulers.local import LocalConfig
+from sbatchman.schedulers.pbs import PbsConfig
+from sbatchman.schedulers.slurm import SlurmConfig
 
 JOBS_CACHE = {}
 
@@ -43,9 +45,32 @@ def job_exists(
     - ignore_archived
     - ignore_conf_in_dup_check
     - ignore_commands_in_dup_check
+
+  The check is a single lookup in the jobs index (see `jobs_index.find_duplicate`), which persists
+  across runs. If the index cannot be used, the metadata files are scanned and cached in memory.
   """
   global JOBS_CACHE
-  from_archive = False
+
+  try:
+    if not jobs_index.is_built():
+      reindex_jobs()
+    # Only immutable fields are compared, so there is no need to re-validate index entries
+    where = jobs_index.find_duplicate(
+      cluster_name,
+      None if ignore_conf_in_dup_check else config_name,
+      tag,
+      command,
+      preprocess,
+      postprocess,
+      compare_commands=not ignore_commands_in_dup_check,
+      from_archived=not ignore_archived,
+    )
+  except sqlite3.Error:
+    pass
+  else:
+    if where is None:
+      return False, ''
+    return True, 'archive' if where else 'active'
 
   # Cache key depends on whether config is part of the duplicate logic
   if ignore_conf_in_dup_check:
@@ -54,51 +79,14 @@ def job_exists(
     cache_key = (cluster_name, config_name, tag)
 
   if cache_key not in JOBS_CACHE:
-    JOBS_CACHE[cache_key] = []
-    exp_dir = get_experiments_dir()
-
-    if ignore_conf_in_dup_check:
-      # Ignore config level: cluster/*/tag/*/metadata.yaml
-      glob_pattern = f"{cluster_name}/*/{tag}/*/metadata.yaml"
-    else:
-      glob_pattern = f"{cluster_name}/{config_name}/{tag}/*/metadata.yaml"
-
-    # Scan active experiments
-    for metadata_path in exp_dir.glob(glob_pattern):
-      try:
-        with open(metadata_path, 'r') as f:
-          job_dict = yaml.safe_load(f)
-        if job_dict:
-          JOBS_CACHE[cache_key].append(job_dict)
-      except Exception:
-        continue
-
-    if not ignore_archived:
-      archive_root = get_archive_dir()
-
-      if ignore_conf_in_dup_check:
-        archive_glob_pattern = f"*/{cluster_name}/*/{tag}/*/metadata.yaml"
-      else:
-        archive_glob_pattern = (
-          f"*/{cluster_name}/{config_name}/{tag}/*/metadata.yaml"
-        )
-
-      for metadata_path in archive_root.glob(archive_glob_pattern):
-        try:
-          with open(metadata_path, 'r') as f:
-            job_dict = yaml.safe_load(f)
-          if job_dict:
-            from_archive = True
-            JOBS_CACHE[cache_key].append(job_dict)
-        except Exception:
-          continue
+    JOBS_CACHE[cache_key] = _scan_job_dicts_for_dup_check(cluster_name, config_name, tag, ignore_archived, ignore_conf_in_dup_check)
 
   # Duplicate check
   for job_dict in JOBS_CACHE[cache_key]:
 
     # If we ignore command-level comparison, tag (+ optional config rule) is enough
     if ignore_commands_in_dup_check:
-      return True, 'archive' if from_archive else 'active'
+      return True, 'archive' if job_dict.get('archive_name') else 'active'
 
     # Otherwise perform full comparison
     if (
@@ -106,39 +94,133 @@ def job_exists(
       job_dict.get('preprocess') == preprocess and
       job_dict.get('postprocess') == postprocess
     ):
-      return True, 'archive' if from_archive else 'active'
+      return True, 'archive' if job_dict.get('archive_name') else 'active'
 
   return False, ''
 
 
+def _scan_job_dicts_for_dup_check(
+  cluster_name: str,
+  config_name: str,
+  tag: str,
+  ignore_archived: bool,
+  ignore_conf_in_dup_check: bool,
+) -> List[Dict[str, Any]]:
+  """
+  Loads the metadata of the jobs relevant for `job_exists` by globbing the experiments
+  (and archive) directories. Used when the jobs index is not available.
+  """
+  job_dicts = []
+  exp_dir = get_experiments_dir()
+
+  if ignore_conf_in_dup_check:
+    # Ignore config level: cluster/*/tag/*/metadata.yaml
+    glob_pattern = f"{cluster_name}/*/{tag}/*/metadata.yaml"
+  else:
+    glob_pattern = f"{cluster_name}/{config_name}/{tag}/*/metadata.yaml"
+
+  # Scan active experiments
+  for metadata_path in exp_dir.glob(glob_pattern):
+    try:
+      with open(metadata_path, 'r') as f:
+        job_dict = yaml.safe_load(f)
+      if job_dict:
+        job_dicts.append(job_dict)
+    except Exception:
+      continue
+
+  if not ignore_archived:
+    archive_root = get_archive_dir()
+
+    if ignore_conf_in_dup_check:
+      archive_glob_pattern = f"*/{cluster_name}/*/{tag}/*/metadata.yaml"
+    else:
+      archive_glob_pattern = (
+        f"*/{cluster_name}/{config_name}/{tag}/*/metadata.yaml"
+      )
+
+    for metadata_path in archive_root.glob(archive_glob_pattern):
+      try:
+        with open(metadata_path, 'r') as f:
+          job_dict = yaml.safe_load(f)
+        if job_dict:
+          job_dicts.append(job_dict)
+      except Exception:
+        continue
+
+  return job_dicts
+
+
 def register_job(job: Job):
   """
-  Registers a new job in the cache to avoid disk reads on subsequent checks.
+  Registers a new job for the duplicate checks of `job_exists`.
+  Jobs are added to the jobs index when their metadata is written, this also adds them to the
+  in-memory cache used when the index is not available.
   """
   global JOBS_CACHE
-  cache_key = (job.cluster_name, job.config_name, job.tag)
-  if cache_key in JOBS_CACHE:
-    JOBS_CACHE[cache_key].append(asdict(job))
+  job_dict = asdict(job)
+  for cache_key in ((job.cluster_name, job.config_name, job.tag), (job.cluster_name, job.tag)):
+    if cache_key in JOBS_CACHE:
+      JOBS_CACHE[cache_key].append(job_dict)
+
+def _match_variables(job_dict: Dict[str, Any], variables: Optional[Dict[str, Any]]) -> bool:
+  """Returns True if the job variables match all the given key=value pairs (compared as strings)."""
+  if not variables:
+    return True
+  job_vars = job_dict.get('variables') or {}
+  for k, v in variables.items():
+    if str(job_vars.get(k)) != str(v):
+      return False
+  return True
 
-def _load_job_metadata(metadata_path: Path, variables: Optional[Dict[str, Any]] = None) -> Optional[Job]:
+def _job_from_dict(job_dict: Dict[str, Any], variables: Optional[Dict[str, Any]] = None) -> Optional[Job]:
   try:
-    with open(metadata_path, 'r') as f:
-      job_dict = yaml.load(f, Loader=SafeLoader)
-      if job_dict:
-        if variables:
-          job_vars = job_dict.get('variables') or {}
-          match = True
-          for k, v in variables.items():
-            if str(job_vars.get(k)) != str(v):
-              match = False
-              break
-          if not match:
-            return None
-        return Job(**job_dict)
+    if job_dict and _match_variables(job_dict, variables):
+      return Job(**job_dict)
   except Exception:
     return None
   return None
 
+def _load_job_metadata(metadata_path: Path, variables: Optional[Dict[str, Any]] = None) -> Optional[Job]:
+  job_dict, _ = job_state.read_metadata(metadata_path)
+  return _job_from_dict(job_dict, variables)
+
+def _query_index(**filters) -> Optional[List[Dict[str, Any]]]:
+  """
+  Queries the jobs index (see `jobs_index.query_jobs`), building it first if needed.
+  Returns None if the index cannot be used, in which case callers fall back to scanning
+  the experiments directories.
+  """
+  try:
+    if not jobs_index.is_built():
+      reindex_jobs()
+    return jobs_index.query_jobs(**filters)
+  except sqlite3.Error:
+    return None
+
+def _query_daemon(**filters) -> Optional[List[Dict[str, Any]]]:
+  """
+  Queries the status daemon (see `daemon.JobsState.query`), which keeps the status of the jobs
+  up to date by itself. Returns None if no daemon is running (or it fails to answer), in which
+  case callers query the jobs index themselves.
+  """
+  try:
+    running, jobs_dicts = daemon.request('jobs', **filters)
+  except daemon.DaemonError:
+    return None
+  return jobs_dicts if running else None
+
+def reindex_jobs() -> int:
+  """
+  Rebuilds the jobs index from the metadata.yaml files of all active and archived jobs.
+  This is done automatically the first time the index is needed, but should be run manually
+  after jobs directories are modified outside of SbatchMan (e.g. deleted or copied by hand).
+
+  Returns:
+    The number of indexed jobs.
+  """
+  return jobs_index.rebuild(_scan_metadata_paths(from_active=True, from_archived=True))
+
 def _get_matching_subdirs(parent: Path, pattern: Optional[str]) -> List[Path]:
     """
     Helper to get subdirectories matching a pattern (exact or wildcard).
@@ -172,40 +254,18 @@ def _get_matching_subdirs(parent: Path, pattern: Optional[str]) -> List[Path]:
         
     return results
 
-def jobs_list(
+def _scan_metadata_paths(
   cluster_name: Optional[str] = None,
   config_name: Optional[str] = None,
   tag: Optional[str] = None,
-  status: Optional[List[Status]] = None,
   archive_name: Optional[str] = None,
   from_active: bool = True,
   from_archived: bool = False,
-  update_jobs: bool = True,
-  variables: Optional[Dict[str, Any]] = None
-) -> List[Job]:
+) -> List[Path]:
   """
-  Lists active and/or archived jobs, with optional filtering. Updates the status of active jobs by default.
-  Args:
-    cluster_name: Filter by cluster name.
-    config_name: Filter by configuration name.
-    tag: Filter by tag.
-    status: Filter by a set of Status.
-    archive_name: If provided, only include jobs from this archive.
-    from_active: If True, include active jobs.
-    from_archived: If True, include archived jobs.
-    update_jobs: If True, update the status of active jobs before listing.
-    variables: Filter by variable values.
-  Returns:
-    A list of Job objects matching the filter criteria.
-  Raises:
-    ArchiveExistsError: If an archive with the specified name already exists and overwrite is False.
+  Walks the experiments (and/or archive) directories and returns the paths of the
+  metadata.yaml files matching the filters. Filters may contain shell-style wildcards.
   """
-  jobs = []
-  exp_dir = get_experiments_dir()
-
-  if update_jobs:
-    update_jobs_status()
-  
   paths_to_process = []
 
   # Scan active jobs
@@ -313,131 +373,188 @@ def jobs_list(
                     except OSError:
                         continue
 
-  # Use a higher number of workers for I/O bound tasks
-  max_workers = min(100, len(paths_to_process) + 1)
-  with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-      future_to_path = {executor.submit(_load_job_metadata, p, variables): p for p in paths_to_process}
-      for future in concurrent.futures.as_completed(future_to_path):
-          job = future.result()
-          if job:
-              jobs.append(job)
-  
+  return paths_to_process
+
+def jobs_list(
+  cluster_name: Optional[str] = None,
+  config_name: Optional[str] = None,
+  tag: Optional[str] = None,
+  status: Optional[List[Status]] = None,
+  archive_name: Optional[str] = None,
+  from_active: bool = True,
+  from_archived: bool = False,
+  update_jobs: bool = True,
+  variables: Optional[Dict[str, Any]] = None,
+  use_daemon: bool = True,
+) -> List[Job]:
+  """
+  Lists active and/or archived jobs, with optional filtering. Updates the status of active jobs by default.
+  If the status daemon is running (`sbatchman daemon`), the jobs are read from it instead, with the status it last refreshed.
+  Args:
+    cluster_name: Filter by cluster name.
+    config_name: Filter by configuration name.
+    tag: Filter by tag.
+    status: Filter by a set of Status.
+    archive_name: If provided, only include jobs from this archive.
+    from_active: If True, include active jobs.
+    from_archived: If True, include archived jobs.
+    update_jobs: If True, update the status of active jobs before listing.
+    variables: Filter by variable values.
+    use_daemon: If False, never read the jobs from the status daemon.
+  Returns:
+    A list of Job objects matching the filter criteria.
+  Raises:
+    ArchiveExistsError: If an archive with the specified name already exists and overwrite is False.
+  """
+  jobs = []
+  exp_dir = get_experiments_dir()
   if status:
     status = [s.value if isinstance(s, Status) else str(s) for s in status]
+
+  if use_daemon:
+    jobs_dicts = _query_daemon(
+      cluster_name=cluster_name,
+      config_name=config_name,
+      tag=tag,
+      archive_name=archive_name,
+      from_active=from_active,
+      from_archived=from_archived,
+      status=status or None,
+      variables=variables,
+    )
+    if jobs_dicts is not None:
+      return [job for job in map(_job_from_dict, jobs_dicts) if job]
+
+  if update_jobs:
+    update_jobs_status(use_daemon=False)
+  
+  jobs_dicts = _query_index(
+    cluster_name=cluster_name,
+    config_name=config_name,
+    tag=tag,
+    archive_name=archive_name,
+    from_active=from_active,
+    from_archived=from_archived,
+  )
+
+  if jobs_dicts is not None:
+    for job_dict in jobs_dicts:
+      job = _job_from_dict(job_dict, variables)
+      if job:
+        jobs.append(job)
+  else:
+    # The index is not available, scan the experiments directories instead
+    paths_to_process = _scan_metadata_paths(cluster_name, config_name, tag, archive_name, from_active, from_archived)
+
+    # Use a higher number of workers for I/O bound tasks
+    max_workers = min(100, len(paths_to_process) + 1)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        future_to_path = {executor.submit(_load_job_metadata, p, variables): p for p in paths_to_process}
+        for future in concurrent.futures.as_completed(future_to_path):
+            job = future.result()
+            if job:
+                jobs.append(job)
+  
+  if status:
     jobs = [j for j in jobs if str(j.status) in status]
     
   return jobs
 
-def job_by_id(
-  id: int,
+def jobs_by_ids(
+  ids: Iterable[Any],
   from_active: bool = True,
   from_archived: bool = True,
   archive_name: Optional[str] = None,
-) -> Optional[Job]:
+) -> Dict[str, Job]:
   """
-  Find a job by scheduler/job id.
+  Find several jobs by scheduler/job id at once.
 
-  Searches active and/or archived jobs and returns the first match.
+  All ids are looked up with a single query of the jobs index (or a single scan of the
+  experiments directories if the index is not available), so this should be preferred
+  over calling `job_by_id` in a loop.
 
   Args:
-      id: Job id to search for.
+      ids: Job ids to search for.
       from_active: Search active experiments.
       from_archived: Search archived experiments.
       archive_name: Restrict archived search to a specific archive.
 
   Returns:
-      Matching Job or None if not found.
+      A dictionary mapping each job id (as a string) to the first matching Job.
+      Ids that do not match any job are missing from the dictionary.
   """
 
-  target_id = str(id)
-
-  def _match_metadata(metadata_path: Path) -> Optional[Job]:
-    try:
-      with open(metadata_path, "r") as f:
-        job_dict = yaml.load(f, Loader=SafeLoader)
-
-      if not job_dict:
-        return None
+  target_ids = {str(id) for id in ids}
+  found: Dict[str, Job] = {}
+  if not target_ids:
+    return found
 
-      if str(job_dict.get("job_id")) != target_id:
-        return None
-
-      return Job(**job_dict)
+  filters = dict(
+    job_ids=list(target_ids),
+    archive_name=archive_name,
+    from_active=from_active,
+    from_archived=from_archived,
+  )
+  jobs_dicts = _query_daemon(**filters)
+  if jobs_dicts is None:
+    jobs_dicts = _query_index(**filters)
+  if jobs_dicts is not None:
+    for job_dict in jobs_dicts:
+      job_id = str(job_dict.get("job_id"))
+      if job_id in found:
+        continue
+      job = _job_from_dict(job_dict)
+      if job is not None:
+        found[job_id] = job
+    return found
 
-    except Exception:
+  # The index is not available, scan the experiments directories instead
+  def _match_metadata(metadata_path: Path) -> Optional[Job]:
+    job_dict, _ = job_state.read_metadata(metadata_path)
+    if not job_dict or str(job_dict.get("job_id")) not in target_ids:
       return None
+    return _job_from_dict(job_dict)
 
-  def _iter_metadata_paths(root: Path, archived: bool):
-    """
-    Yield metadata.yaml paths without recursive globbing.
-    """
-
-    try:
-      if archived:
-        archives = _get_matching_subdirs(root, archive_name)
-      else:
-        archives = [root]
-
-      for base in archives:
-        # cluster
-        with os.scandir(base) as clusters:
-          for cluster_entry in clusters:
-              if not cluster_entry.is_dir():
-                continue
-
-              cluster_dir = Path(cluster_entry.path)
-
-              # config
-              with os.scandir(cluster_dir) as configs:
-                for config_entry in configs:
-                  if not config_entry.is_dir():
-                    continue
-
-                  config_dir = Path(config_entry.path)
-
-                  # tag
-                  with os.scandir(config_dir) as tags:
-                    for tag_entry in tags:
-                      if not tag_entry.is_dir():
-                        continue
-
-                      tag_dir = Path(tag_entry.path)
-
-                      # timestamp
-                      with os.scandir(tag_dir) as timestamps:
-                        for ts_entry in timestamps:
-                          if ts_entry.is_dir():
-                            yield Path(ts_entry.path) / "metadata.yaml"
-    except OSError:
-        return
-
-  search_roots = []
-
-  if from_active:
-    search_roots.append((get_experiments_dir(), False))
-
-  if from_archived:
-    search_roots.append((get_archive_dir(), True))
+  paths_to_process = _scan_metadata_paths(None, None, None, archive_name, from_active, from_archived)
 
   # Parallel metadata parsing
   with concurrent.futures.ThreadPoolExecutor(max_workers=32) as executor:
+    futures = [executor.submit(_match_metadata, p) for p in paths_to_process]
 
-    future_to_path = {}
-
-    for root, archived in search_roots:
-      for metadata_path in _iter_metadata_paths(root, archived):
-        future = executor.submit(_match_metadata, metadata_path)
-        future_to_path[future] = metadata_path
-
-    for future in concurrent.futures.as_completed(future_to_path):
+    for future in concurrent.futures.as_completed(futures):
       job = future.result()
 
       if job is not None:
-        # Cancel remaining tasks early
-        executor.shutdown(wait=False, cancel_futures=True)
-        return job
+        found.setdefault(str(job.job_id), job)
+        if len(found) == len(target_ids):
+          # Cancel remaining tasks early
+          executor.shutdown(wait=False, cancel_futures=True)
+          break
 
-  return None
+  return found
+
+def job_by_id(
+  id: int,
+  from_active: bool = True,
+  from_archived: bool = True,
+  archive_name: Optional[str] = None,
+) -> Optional[Job]:
+  """
+  Find a job by scheduler/job id.
+
+  Searches active and/or archived jobs and returns the first match.
+  To look up several jobs, use `jobs_by_ids` instead.
+
+  Args:
+      id: Job id to search for.
+      from_active: Search active experiments.
+      from_archived: Search archived experiments.
+      archive_name: Restrict archived search to a specific archive.
+
+  Returns:
+      Matching Job or None if not found.
+  """
+  return jobs_by_ids([id], from_active, from_archived, archive_name).get(str(id))
 
 # def jobs_metadata_dataframe(
 #   cluster_name: Optional[str] = None,
@@ -485,6 +602,11 @@ def jobs_to_dataframe(
     # include base metadata automatically
     include_job_variables: bool = True,
     include_job_fields: bool = False,
+
+    # performance
+    cache: bool = False,
+    max_workers: Optional[int] = None,
+    parquet_path: Optional[Union[str, Path]] = None,
 ) -> pd.DataFrame:
   """
   Convert jobs into a pandas DataFrame.
@@ -510,6 +632,19 @@ def jobs_to_dataframe(
       include_job_fields:
           If True, includes Job dataclass fields ['config_name', 'cluster_name', 'status', 'tag', 'job_id', 'exitcode', 'archive_name', 'sbm_queue_time_s', 'sbm_run_time_s'].
 
+      cache:
+          If True, the results of the extractors are cached in the project (see `extract_cache`),
+          and extractors are only run again on jobs whose metadata or logs changed since the last call,
+          or when the extractor itself is modified.
+
+      max_workers:
+          Number of threads running the extractors. Set it to 1 if the extractors are not thread safe.
+          By default, extractors run on a thread pool when `cache` is True, and one job at a time otherwise.
+
+      parquet_path:
+          If provided, the dataframe is also saved to this Parquet file (requires `pyarrow` or
+          `fastparquet`), which can be loaded back with `pandas.read_parquet`.
+
   Returns:
       pandas.DataFrame
   """
@@ -526,37 +661,70 @@ def jobs_to_dataframe(
     variables=variables,
   )
 
-  rows = []
+  # optional custom filter
+  if job_filter is not None:
+    jobs = [job for job in jobs if job_filter(job)]
 
-  for job in jobs:
+  extractors = extractors or []
+  extractor_keys = [extract_cache.extractor_key(e) if cache else None for e in extractors]
+  cached = extract_cache.load([k for k in extractor_keys if k is not None]) if cache else {}
 
-    # optional custom filter
-    if job_filter is not None and not job_filter(job):
-      continue
+  def _extract(job: Job) -> Tuple[List[Dict[str, Any]], List[tuple]]:
+    """Returns the data of each extractor for the job, and the new results to cache."""
+    signature = extract_cache.job_signature(job) if cache else None
+    results = []
+    to_cache = []
+    for extractor, key in zip(extractors, extractor_keys):
+      if key is not None:
+        found, data = extract_cache.get(cached, extract_cache.result_key(job, key), signature)
+        if found:
+          results.append(data)
+          continue
+      try:
+        data = extractor(job)
+        # Checked here, so that results that are not dicts are reported as errors too
+        data = dict(data) if data else data
+      except Exception as e:
+        # Errors are not cached, the extractor will be run again next time
+        results.append({f"{extractor.__name__}_error": str(e)})
+        continue
+      results.append(data)
+      if key is not None:
+        to_cache.append(extract_cache.pack(extract_cache.result_key(job, key), signature, data))
+    return results, to_cache
 
-    row: dict[str, Any] = {}
+  if max_workers is None and not cache:
+    max_workers = 1
 
-    # include dataclass fields
-    if include_job_fields:
-      row.update(job.get_fields())
-        
-    if include_job_variables and job.variables:
-      row.update(job.variables)
+  rows = []
+  new_results = []
+  with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    extracted = executor.map(_extract, jobs) if max_workers != 1 else map(_extract, jobs)
+    for job, (results, to_cache) in zip(jobs, extracted):
+      row: dict[str, Any] = {}
+
+      # include dataclass fields
+      if include_job_fields:
+        row.update(job.get_fields())
+          
+      if include_job_variables and job.variables:
+        row.update(job.variables)
 
+      # custom extractors
+      for data in results:
+        if data:
+          row.update(data)
 
-    # custom extractors
-    if extractors:
-      for extractor in extractors:
-        try:
-          data = extractor(job)
-          if data:
-            row.update(data)
-        except Exception as e:
-            row[f"{extractor.__name__}_error"] = str(e)
+      rows.append(row)
+      new_results.extend(to_cache)
 
-    rows.append(row)
+  if cache:
+    extract_cache.store(new_results)
 
-  return pd.DataFrame(rows)
+  df = pd.DataFrame(rows)
+  if parquet_path is not None:
+    df.to_parquet(parquet_path)
+  return df
   
 def archive_jobs(archive_name: str, overwrite: bool = False, cluster_name: Optional[str] = None, config_name: Optional[str] = None, tag: Optional[str] = None, status: Optional[List[Status]] = None) -> List[Job]:
   """
@@ -566,12 +734,13 @@ def archive_jobs(archive_name: str, overwrite: bool = False, cluster_name: Optio
   if archive_path.exists():
     if overwrite:
       shutil.rmtree(archive_path)
+      jobs_index.remove_archive(archive_name)
     else:
       raise ArchiveExistsError(
         f"Archive '{archive_name}' already exists. Use --overwrite to replace it."
       )
   
-  jobs_to_archive = jobs_list(from_archived=False, cluster_name=cluster_name, config_name=config_name, tag=tag, status=status)
+  jobs_to_archive = jobs_list(from_archived=False, cluster_name=cluster_name, config_name=config_name, tag=tag, status=status, use_daemon=False)
 
   exp_dir_root = get_experiments_dir()
   
@@ -587,6 +756,7 @@ def archive_jobs(archive_name: str, overwrite: bool = False, cluster_name: Optio
     dest_job_dir = archive_path / job.exp_dir
     dest_job_dir.parent.mkdir(parents=True, exist_ok=True)
     shutil.move(str(source_job_dir), str(dest_job_dir))
+    jobs_index.remove_job(None, job.exp_dir)
 
     # Rewrite metadata in new location
     job.write_metadata()
@@ -624,6 +794,7 @@ def archive_job(job: Job, archive_name: str) -> None:
   # Update metadata to record the archive name before moving.
   job.archive_name = archive_name
   shutil.move(str(source_job_dir), str(dest_job_dir))
+  jobs_index.remove_job(None, job.exp_dir)
 
   # Rewrite metadata in the new location so it stays consistent.
   job.write_metadata()
@@ -656,8 +827,10 @@ def unarchive_job(job: Job) -> None:
   dest_job_dir.parent.mkdir(parents=True, exist_ok=True)
 
   # Clear the archive tag before moving so active metadata is clean.
+  archive_name = job.archive_name
   job.archive_name = None
   shutil.move(str(source_job_dir), str(dest_job_dir))
+  jobs_index.remove_job(archive_name, job.exp_dir)
 
   job.write_metadata()
 
@@ -665,7 +838,7 @@ def delete_jobs(
   cluster_name: Optional[str] = None,
   config_name: Optional[str] = None,
   tag: Optional[str] = None,
-  id: Optional[int] = None,
+  id: Optional[Union[int, str]] = None,
   archive_name: Optional[str] = None,
   archived: bool = False,
   not_archived: bool = False,
@@ -698,12 +871,13 @@ def delete_jobs(
     from_archived=archived,
     status=status,
     update_jobs=False,
-    variables=variables
+    variables=variables,
+    use_daemon=False,
   )
 
   # Delete at most one by id
   if id:
-    jobs_to_delete = [j for j in jobs_to_delete if int(j.job_id) == int(id)]
+    jobs_to_delete = [j for j in jobs_to_delete if str(j.job_id) == str(id)]
 
   if not jobs_to_delete:
     return 0
@@ -720,6 +894,7 @@ def delete_jobs(
 
     if job_dir.exists():
       shutil.rmtree(job_dir)
+    jobs_index.remove_job(job.archive_name, job.exp_dir)
     
     # Recursively delete empty parent directories
     parent_dir = job_dir.parent
@@ -737,51 +912,87 @@ def delete_jobs(
       # This can happen in concurrent scenarios, it's safe to ignore.
       pass
 
+  # Deleted jobs must not be reported as duplicates anymore
+  clean_jobs_cache()
   return len(jobs_to_delete)
 
-def _update_single_job_status(job: Job) -> bool:
-    """
-    Helper function to update a single job's status.
-    Returns True if the status was updated, False otherwise.
-    """
-    if job.status in TERMINAL_STATES:
-      return False
+SCHEDULER_CLASSES: Dict[str, Type[BaseConfig]] = {
+  SlurmConfig.get_scheduler_name(): SlurmConfig,
+  PbsConfig.get_scheduler_name(): PbsConfig,
+  LocalConfig.get_scheduler_name(): LocalConfig,
+}
 
-    try:
-      config = job.get_job_config()
-      new_status = config.get_job_status(job.job_id).value
-      
-      if new_status == Status.UNKNOWN.value:
-        return False
-
-      if new_status != job.status:
-        job.status = new_status
-        job.write_metadata()
-        return True
-    except Exception:
-      # Ignore errors (e.g., config not found) and continue
-      return False
-    return False
+def _get_scheduler_class(job: Job) -> Type[BaseConfig]:
+  """
+  Returns the scheduler class that tracks `job`, using the scheduler stored in its metadata.
+  Falls back to reading the job configuration for old metadata files without a scheduler.
+  """
+  scheduler_class = SCHEDULER_CLASSES.get(job.scheduler)
+  if scheduler_class is None:
+    scheduler_class = type(job.get_job_config())
+  return scheduler_class
 
-def update_jobs_status() -> int:
+def update_jobs_status(use_daemon: bool = True) -> int:
   """
   Updates the status of active jobs on the current cluster by querying the scheduler.
-  
+  Jobs are grouped by scheduler, so that each scheduler is queried with a constant number
+  of batched commands (see `BaseConfig.get_jobs_status`) instead of once per job.
+  Packed jobs are queried through their allocation (see `packing.packed_job_status`).
+  If the status daemon is running, it is asked to refresh the status of its jobs instead.
+
+  Args:
+    use_daemon: If False, always query the scheduler from this process.
   Returns:
     The number of jobs whose status was updated.
   """
+  if use_daemon:
+    try:
+      running, updated_count = daemon.request('refresh')
+      if running:
+        return updated_count
+    except daemon.DaemonError:
+      pass
+
   current_cluster = get_cluster_name()
-  active_jobs = jobs_list(cluster_name=current_cluster, from_active=True, from_archived=False, update_jobs=False)
-  
-  updated_count = 0
+  active_jobs = jobs_list(cluster_name=current_cluster, from_active=True, from_archived=False, update_jobs=False, use_daemon=False)
+
+  jobs_by_scheduler: Dict[Type[BaseConfig], List[Job]] = {}
+  for job in active_jobs:
+    # Jobs still being submitted have no scheduler id yet
+    if job.status in TERMINAL_STATES or not job.job_id:
+      continue
+    try:
+      scheduler_class = _get_scheduler_class(job)
+    except Exception:
+      # Ignore errors (e.g., config not found) and continue
+      continue
+    jobs_by_scheduler.setdefault(scheduler_class, []).append(job)
+
+  updated_jobs: List[Job] = []
+  for scheduler_class, jobs in jobs_by_scheduler.items():
+    try:
+      statuses = scheduler_class.get_jobs_status(list(dict.fromkeys(packing.get_allocation_id(job.job_id) or job.job_id for job in jobs)))
+    except Exception:
+      continue
+
+    for job in jobs:
+      allocation_id = packing.get_allocation_id(job.job_id)
+      if allocation_id is not None:
+        packed_status = packing.packed_job_status(job.status, statuses.get(allocation_id, Status.UNKNOWN))
+        new_status = packed_status.value if packed_status else Status.UNKNOWN.value
+      else:
+        new_status = statuses.get(str(job.job_id), Status.UNKNOWN).value
+      if new_status == Status.UNKNOWN.value:
+        continue
+      if new_status != job.status:
+        job.status = new_status
+        updated_jobs.append(job)
 
+  # Metadata writes are I/O bound, so they still benefit from a thread pool
   with concurrent.futures.ThreadPoolExecutor() as executor:
-      futures = [executor.submit(_update_single_job_status, job) for job in active_jobs]
-      for future in concurrent.futures.as_completed(futures):
-          if future.result():
-              updated_count += 1
+    list(executor.map(lambda j: j.write_metadata(), updated_jobs))
           
-  return updated_count
+  return len(updated_jobs)
 
 
 def count_active_jobs() -> int:
@@ -795,7 +1006,7 @@ def count_active_jobs() -> int:
   
   try:
     result = subprocess.run(
-      ["squeue", "--me", "-h", "-t", "PENDING,RUNNING"],
+      ["squeue", "--me", "-h", "-r", "-t", "PENDING,RUNNING"],
       capture_output=True,
       text=True,
       timeout=30
@@ -3,57 +3,64 @@ import shutil
 import subprocess
 import datetime
 import itertools
-import time
+import math
+import sys
+import collections
+import concurrent.futures
 import yaml
 import fnmatch
 import typer
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
 from rich.console import Console
 
 from sbatchman.core.variables import extract_used_vars, substitute, load_variable_values, resolve_map_variable, map_info_to_vars
 from sbatchman.core.config_manager import load_local_config, create_configs_from_file
 from sbatchman.core.job import Job, Status
-from sbatchman.core.jobs_manager import job_exists, register_job, count_active_jobs
-from sbatchman.exceptions import ConfigurationError, ClusterNameNotSetError, ConfigurationNotFoundError, JobExistsError, JobSubmitError, SbatchManError
+from sbatchman.core.jobs_manager import job_exists, register_job
+from sbatchman.core.packing import pack_script, pack_task_script, packed_job_id
+from sbatchman.core.queue_throttle import MAX_REFRESH_INTERVAL, get_queue_throttle
+from sbatchman.exceptions import ConfigurationError, ClusterNameNotSetError, JobExistsError, JobSubmitError, SbatchManError
 from sbatchman.config.global_config import get_cluster_name, get_max_queued_jobs
-from sbatchman.config.project_config import get_project_config_dir, get_scheduler_from_cluster_and_config_name
+from sbatchman.config.project_config import get_scheduler_from_cluster_and_config_name, load_config_template
 
-from sbatchman.config.project_config import get_experiments_dir
+from sbatchman.config.project_config import get_experiments_dir, get_packs_dir
 from sbatchman.schedulers.pbs import pbs_submit
-from sbatchman.schedulers.slurm import slurm_submit
+from sbatchman.schedulers.slurm import SLURM_MAX_ARRAY_SIZE, slurm_array_task_script, slurm_submit, slurm_submit_array
 
 console = Console(width=shutil.get_terminal_size().columns)
 
-DEFAULT_QUEUE_WAIT_INTERVAL = 30  # seconds to wait between queue checks
+DEFAULT_QUEUE_WAIT_INTERVAL = MAX_REFRESH_INTERVAL  # maximum seconds to wait between queue checks
 
 def wait_for_queue_slot(
   max_jobs: Optional[int] = None,
-  wait_interval: int = DEFAULT_QUEUE_WAIT_INTERVAL
+  wait_interval: float = DEFAULT_QUEUE_WAIT_INTERVAL,
+  n: int = 1,
 ) -> None:
   """
-  Waits until there is a slot available in the job queue.
+  Waits until there is a slot available in the job queue, and takes it.
+  The queue is only checked when the jobs submitted since the last check may have filled it
+  (see `QueueThrottle`), then with an increasing interval while it is full.
   
   Args:
     max_jobs: Maximum number of allowed queued/running jobs. If None, uses the global setting.
-    wait_interval: Seconds to wait between checks.
+    wait_interval: Maximum seconds to wait between checks.
+    n: Number of slots to take (e.g. the number of tasks of a job array).
   """
   if max_jobs is None:
     max_jobs = get_max_queued_jobs()
   
   if max_jobs is None:
     return  # No limit configured
-  
-  while True:
-    current_count = count_active_jobs()
-    if current_count < max_jobs:
-      return
-    
+
+  def _on_wait(current_count: int, max_jobs: int, interval: float):
     console.print(
       f"[yellow]Queue limit reached ({current_count}/{max_jobs} jobs). "
-      f"Waiting {wait_interval}s for a slot...[/yellow]"
+      f"Waiting {interval:g}s for a slot...[/yellow]"
     )
-    time.sleep(wait_interval)
+
+  get_queue_throttle().acquire(max_jobs, n=n, max_interval=wait_interval, on_wait=_on_wait)
 
 
 def job_submit(
@@ -82,10 +89,7 @@ def job_submit(
   
   scheduler = get_scheduler_from_cluster_and_config_name(job.cluster_name, job.config_name)
 
-  config_path = get_project_config_dir() / job.cluster_name / f"{job.config_name}.sh"
-  if not config_path.exists():
-    raise ConfigurationNotFoundError(f"Configuration '{job.config_name}' for cluster '{job.cluster_name}' not found at '{config_path}'.")
-  template_script = open(config_path, "r").read()
+  template_script = load_config_template(job.cluster_name, job.config_name)
 
   j_exists, where = job_exists(
     job.command,
@@ -178,11 +182,7 @@ def job_submit(
       config = load_local_config(job.config_name)
       if config is None:
         raise ConfigurationError(f'Couldn\'t find configuration `{job.config_name}`')
-      job.job_id, timed_out = config.local_submit(run_script_path, exp_dir)
-      if timed_out:
-        job.status = Status.TIMEOUT.value
-        job.end_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S.%f")
-        job.write_job_status()
+      job.job_id = config.local_submit(run_script_path, exp_dir, previous_job_id)
     else:
       raise JobSubmitError(f"No submission class found for scheduler '{scheduler}'. Supported schedulers are: slurm, pbs, local.")
     
@@ -206,7 +206,78 @@ def job_submit(
     raise JobSubmitError(err_str) from e
 
 
-def launch_job(
+def _duplicate_check_key(
+  command: str,
+  config_name: str,
+  cluster_name: str,
+  tag: str,
+  preprocess: Optional[str],
+  postprocess: Optional[str],
+  ignore_conf_in_dup_check: bool = False,
+  ignore_commands_in_dup_check: bool = False,
+) -> tuple:
+  """Returns a key equal for the jobs that `job_exists` considers identical."""
+  config_key = None if ignore_conf_in_dup_check else config_name
+  if ignore_commands_in_dup_check:
+    return (cluster_name, config_key, tag)
+  return (cluster_name, config_key, tag, command, preprocess, postprocess)
+
+
+def _check_duplicate_job(
+  command: str,
+  config_name: str,
+  cluster_name: str,
+  tag: str,
+  preprocess: Optional[str],
+  postprocess: Optional[str],
+  ignore_archived: bool = False,
+  ignore_conf_in_dup_check: bool = False,
+  ignore_commands_in_dup_check: bool = False,
+  pending_keys: Optional[Set[tuple]] = None,
+) -> None:
+  """
+  Raises JobExistsError if a job identical to the given one already exists (see `job_exists`).
+  Args:
+    pending_keys: Keys (see `_duplicate_check_key`) of the jobs being launched whose metadata may not
+      be written yet. The job is checked against them too, and its key is added if it is not a duplicate.
+  """
+  if pending_keys is not None:
+    key = _duplicate_check_key(
+      command,
+      config_name,
+      cluster_name,
+      tag,
+      preprocess,
+      postprocess,
+      ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+      ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+    )
+    if key in pending_keys:
+      raise JobExistsError(
+        f"An identical job is already being launched for config '{config_name}'{'(ignored)'if ignore_conf_in_dup_check else ''} with tag '{tag}'. " +
+        "\nUse '--force' to submit it anyway."
+      )
+  j_exists, where = job_exists(
+    command,
+    config_name,
+    cluster_name,
+    tag,
+    preprocess,
+    postprocess,
+    ignore_archived=ignore_archived,
+    ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+    ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+  )
+  if j_exists:
+    raise JobExistsError(
+      f"An identical job already exists{'' if where == 'active' else '(in some archive)'} for config '{config_name}'{'(ignored)'if ignore_conf_in_dup_check else ''} with tag '{tag}'. " +
+      ("\nUse '--force' to submit it anyway." if where == 'active' else "\nUse '--ignore-archived or -ia' to ignore archived jobs.")
+    )
+  if pending_keys is not None:
+    pending_keys.add(key)
+
+
+def _prepare_job(
   config_name: str,
   command: str,
   cluster_name: Optional[str] = None,
@@ -215,35 +286,28 @@ def launch_job(
   postprocess: Optional[str] = None,
   check: Optional[str] = None,
   force: bool = False,
-  previous_job_id: Optional[int] = None,
   variables: Optional[Dict[str, Any]] = None,
   dry_run: bool = False,
   max_queued_jobs: Optional[int] = None,
   ignore_archived: bool = False,
   ignore_conf_in_dup_check: bool = False,
   ignore_commands_in_dup_check: bool = False,
+  wait_for_queue: bool = True,
+  array_task: bool = False,
+  pack_task: bool = False,
+  pending_keys: Optional[Set[tuple]] = None,
 ) -> Job:
   """
-  Launches an experiment based on a configuration name.
+  Performs all the steps of `launch_job` that precede the submission: checks for duplicates,
+  creates the experiment directory and writes its run script (unless `dry_run` is set).
   Args:
-    config_name: The name of the configuration to use.
-    command: The command to run for this job.
-    cluster_name: Optional; if not provided, will use the global cluster name.
-    tag: A tag for this experiment run, used in directory structure.
-    preprocess: Optional; a command to run before the main command.
-    postprocess: Optional; a command to run after the main command.
-    check: Optional; a command to run after postprocess whose exit code determines job status.
-    previous_job_id: Optional; if this is set, the job will be only launched after the previous is done.
-    max_queued_jobs: Optional; if set, will wait before submitting if the queue has this many jobs.
+    wait_for_queue: If True, waits for a slot in the queue (see `wait_for_queue_slot`).
+    array_task: If True and the configuration uses SLURM, the run script is adapted to be run as a task of a job array.
+    pack_task: If True, the run script is adapted to be run by the allocation of a pack of jobs (see `packing.py`).
+    pending_keys: Duplicate keys of the jobs prepared but not written yet, see `_check_duplicate_job`.
   Returns:
-    A Job object representing the launched job.
-  Raises:
-    ConfigurationError: If there is a mismatch in cluster names or if the cluster name is not set.
-    ClusterNameNotSetError: If the cluster name is not set globally and not provided.
-    ConfigurationNotFoundError: If the configuration file does not exist.
-    JobSubmitError: If there is an error during job submission.
+    The Job object to submit, in SUBMITTING status. Its metadata is not written yet.
   """
-
   try:
     config_cluster_name = get_cluster_name()
     if cluster_name is None: # Use global cluster name if not provided
@@ -262,32 +326,25 @@ def launch_job(
   
   scheduler = get_scheduler_from_cluster_and_config_name(cluster_name, config_name)
 
-  config_path = get_project_config_dir() / cluster_name / f"{config_name}.sh"
-  if not config_path.exists():
-    raise ConfigurationNotFoundError(f"Configuration '{config_name}' for cluster '{cluster_name}' not found at '{config_path}'.")
-  template_script = open(config_path, "r").read()
+  template_script = load_config_template(cluster_name, config_name)
 
-  # Wait for queue slot if limit is configured (skip for dry runs)
-  if not dry_run:
-    wait_for_queue_slot(max_queued_jobs)
-    
   if not force:
-    j_exists, where = job_exists(
+    _check_duplicate_job(
       command,
       config_name,
       cluster_name,
       tag,
       preprocess,
-      postprocess, 
+      postprocess,
       ignore_archived=ignore_archived,
       ignore_conf_in_dup_check=ignore_conf_in_dup_check,
       ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+      pending_keys=pending_keys,
     )
-    if j_exists:
-      raise JobExistsError(
-        f"An identical job already exists{'' if where == 'active' else '(in some archive)'} for config '{config_name}'{'(ignored)'if ignore_conf_in_dup_check else ''} with tag '{tag}'. " +
-        ("\nUse '--force' to submit it anyway." if where == 'active' else "\nUse '--ignore-archived or -ia' to ignore archived jobs.")
-      )
+
+  # Wait for queue slot if limit is configured (skip for dry runs and duplicates)
+  if not dry_run and wait_for_queue:
+    wait_for_queue_slot(max_queued_jobs)
 
   # Capture the Current Working Directory at the time of launch
   submission_cwd = Path.cwd()
@@ -300,12 +357,19 @@ def launch_job(
   exp_dir_local = base_exp_dir_local
   exp_dir = get_experiments_dir() / exp_dir_local
   counter = 1
-  while exp_dir.exists():
+  while True:
+    if not exp_dir.exists():
+      if dry_run:
+        break
+      try:
+        # Jobs may be launched concurrently, mkdir is the only race-free existence check
+        exp_dir.mkdir(parents=True, exist_ok=False)
+        break
+      except FileExistsError:
+        pass
     exp_dir_local = base_exp_dir_local.with_name(f"{base_exp_dir_local.name}_{counter}")
     exp_dir = get_experiments_dir() / exp_dir_local
     counter += 1
-  if not dry_run:
-    exp_dir.mkdir(parents=True, exist_ok=False)
 
   # 3. Prepare the final runnable script
   # Replace placeholders for log and CWD
@@ -324,6 +388,10 @@ def launch_job(
   ).replace(
     "{CHECK}", str(check) if check is not None else ''
   )
+  if array_task and scheduler == 'slurm':
+    final_script_content = slurm_array_task_script(final_script_content)
+  if pack_task:
+    final_script_content = pack_task_script(final_script_content)
   
   if not dry_run:
     run_script_path = exp_dir / "run.sh"
@@ -356,11 +424,21 @@ def launch_job(
     variables=job_vars,
     queued_timestamp=queued_ts,
   )
+  return job
 
-  if dry_run:
-    return job
+
+def _submit_prepared_job(job: Job, previous_job_id: Optional[int] = None) -> Job:
+  """
+  Writes the metadata of a job returned by `_prepare_job` and submits it.
+  Submission errors are recorded in the job status and stderr log.
+  """
+  run_script_path = job.get_job_script_path()
+  exp_dir = job.get_job_base_path()
+  scheduler = job.scheduler
+  config_name = job.config_name
 
   job.write_metadata()
+  register_job(job)
 
   try:
     # 5. Submit the job using the scheduler's own logic
@@ -373,17 +451,14 @@ def launch_job(
       config = load_local_config(config_name)
       if config is None:
         raise ConfigurationError(f'Couldn\'t find configuration `{config_name}`')
-      job.job_id, timed_out = config.local_submit(run_script_path, exp_dir)
-      if timed_out:
-        job.status = Status.TIMEOUT.value
-        job.end_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S.%f")
-        job.write_job_status()
+      job.job_id = config.local_submit(run_script_path, exp_dir, previous_job_id)
     else:
       raise JobSubmitError(f"No submission class found for scheduler '{scheduler}'. Supported schedulers are: slurm, pbs, local.")
     
     job.write_metadata(override_status=False)
   
   except (ValueError, FileNotFoundError) as e:
+    get_queue_throttle().release()
     job.status = Status.FAILED_SUBMISSION.value
     job.end_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S.%f")
     job.write_metadata()
@@ -392,6 +467,7 @@ def launch_job(
       err_file.write(err_str)
     raise JobSubmitError(err_str) from e
   except subprocess.CalledProcessError as e:
+    get_queue_throttle().release()
     job.status = Status.FAILED_SUBMISSION.value
     job.end_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S.%f")
     job.write_metadata()
@@ -403,6 +479,67 @@ def launch_job(
     return job
 
 
+def launch_job(
+  config_name: str,
+  command: str,
+  cluster_name: Optional[str] = None,
+  tag: str = "notag",
+  preprocess: Optional[str] = None,
+  postprocess: Optional[str] = None,
+  check: Optional[str] = None,
+  force: bool = False,
+  previous_job_id: Optional[int] = None,
+  variables: Optional[Dict[str, Any]] = None,
+  dry_run: bool = False,
+  max_queued_jobs: Optional[int] = None,
+  ignore_archived: bool = False,
+  ignore_conf_in_dup_check: bool = False,
+  ignore_commands_in_dup_check: bool = False,
+) -> Job:
+  """
+  Launches an experiment based on a configuration name.
+  Args:
+    config_name: The name of the configuration to use.
+    command: The command to run for this job.
+    cluster_name: Optional; if not provided, will use the global cluster name.
+    tag: A tag for this experiment run, used in directory structure.
+    preprocess: Optional; a command to run before the main command.
+    postprocess: Optional; a command to run after the main command.
+    check: Optional; a command to run after postprocess whose exit code determines job status.
+    previous_job_id: Optional; if this is set, the job will be only launched after the previous is done.
+    max_queued_jobs: Optional; if set, will wait before submitting if the queue has this many jobs.
+  Returns:
+    A Job object representing the launched job.
+  Raises:
+    ConfigurationError: If there is a mismatch in cluster names or if the cluster name is not set.
+    ClusterNameNotSetError: If the cluster name is not set globally and not provided.
+    ConfigurationNotFoundError: If the configuration file does not exist.
+    JobSubmitError: If there is an error during job submission.
+  """
+
+  job = _prepare_job(
+    config_name,
+    command,
+    cluster_name=cluster_name,
+    tag=tag,
+    preprocess=preprocess,
+    postprocess=postprocess,
+    check=check,
+    force=force,
+    variables=variables,
+    dry_run=dry_run,
+    max_queued_jobs=max_queued_jobs,
+    ignore_archived=ignore_archived,
+    ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+    ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+  )
+
+  if dry_run:
+    return job
+
+  return _submit_prepared_job(job, previous_job_id)
+
+
 def _merge_dicts(base, override):
   # Recursively merge two dictionaries
   result = dict(base)
@@ -451,43 +588,16 @@ def _should_skip_job(
   return False
 
 
-def launch_jobs_from_file(
-  jobs_file_path: Path,
-  force: bool = False,
-  dry_run: bool = False,
-  filter_tags: Optional[List[str]] = None,
-  filter_variables: Optional[Dict[str, Any]] = None,
-  ignore_archived: bool = False,
-  ignore_conf_in_dup_check: bool = False,
-  ignore_commands_in_dup_check: bool = False,
-  skip_configs_load: bool = False
-) -> List[Job]:
-  """  Launches jobs based on a YAML configuration file.
-  Args:
-    jobs_file_path: Path to the YAML file containing job definitions.
-    force: If True, will overwrite existing jobs with the same configuration.
-    dry_run: If True, will return the list of jobs but will not launch them (warning: won't work for sequential jobs)
-    filter_tags: If provided, only launch jobs whose tag matches one of these values.
-    filter_variables: If provided, only launch jobs where variables match all key=value pairs.
-  Returns:
-    A list of Job objects representing the launched jobs.
-  Raises:
-    ConfigurationError: If the jobs file is not found or has invalid syntax.
+def _load_jobs_file(jobs_file_path: Path) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+  """
+  Reads a jobs file. Returns its content and its global variables, including the ones of the
+  `include_variables` files (not expanded yet, see `_VariableValues`).
   """
-
-  jobs_file_path = Path(jobs_file_path)
   with open(jobs_file_path, "r") as f:
     config = yaml.safe_load(f)
 
-  global_is_sequential = bool(config.get("sequential"))
-  global_configs_file = config.get("configs")
   global_vars = config.get("variables", {})
   global_vars_file = config.get("include_variables")
-  global_command = config.get("command", None)
-  global_preprocess = config.get("preprocess", None)
-  global_postprocess = config.get("postprocess", None)
-  global_check = config.get("check", None)
-  global_cluster_name = config.get("cluster_name", None)
 
   if global_vars_file:
     global_vars_file_list = []
@@ -516,6 +626,56 @@ def launch_jobs_from_file(
     #   if rem_k in global_vars:
     #     del global_vars[rem_k]
 
+  return config, global_vars
+
+
+def launch_jobs_from_file(
+  jobs_file_path: Path,
+  force: bool = False,
+  dry_run: bool = False,
+  filter_tags: Optional[List[str]] = None,
+  filter_variables: Optional[Dict[str, Any]] = None,
+  ignore_archived: bool = False,
+  ignore_conf_in_dup_check: bool = False,
+  ignore_commands_in_dup_check: bool = False,
+  skip_configs_load: bool = False,
+  max_workers: int = 1,
+  array: bool = False,
+  start: int = 0,
+  stop: Optional[int] = None,
+  shard: Optional[Tuple[int, int]] = None,
+  pack: Optional[int] = None,
+  pack_workers: Optional[int] = None,
+) -> List[Job]:
+  """  Launches jobs based on a YAML configuration file.
+  Args:
+    jobs_file_path: Path to the YAML file containing job definitions.
+    force: If True, will overwrite existing jobs with the same configuration.
+    dry_run: If True, will return the list of jobs but will not launch them (warning: won't work for sequential jobs)
+    filter_tags: If provided, only launch jobs whose tag matches one of these values.
+    filter_variables: If provided, only launch jobs where variables match all key=value pairs.
+    max_workers: Number of jobs submitted concurrently (ignored for sequential jobs and dry runs). Jobs are still reported and returned in order.
+    array: If True, jobs sharing a SLURM configuration are submitted as a single job array (`sbatch --array`) instead of one job each. Their ids are stored as `<array_id>_<index>`. Ignored for sequential jobs and dry runs.
+    start, stop, shard: Only launch a slice of the jobs of the file, see `iter_jobs_from_file`.
+    pack: If set, jobs sharing a configuration are packed into allocations of at most `pack` jobs each: only the allocations are submitted to the scheduler, and each runs its jobs with a pool of workers (see `packing.py`). Their ids are stored as `<allocation_id>+<index>`. Ignored for sequential jobs and dry runs.
+    pack_workers: Number of jobs run at the same time by each allocation. Defaults to the number of CPUs of the allocation (on the node running it).
+  Returns:
+    A list of Job objects representing the launched jobs.
+  Raises:
+    ConfigurationError: If the jobs file is not found or has invalid syntax, or both `array` and `pack` are set.
+  """
+
+  if pack is not None and pack < 1:
+    raise ConfigurationError(f"The number of jobs per pack must be positive, got {pack}.")
+  if pack and array:
+    raise ConfigurationError("Jobs can either be submitted as job arrays or packed, not both.")
+
+  jobs_file_path = Path(jobs_file_path)
+  config, _ = _load_jobs_file(jobs_file_path)
+  selection = _job_selection(start, stop, shard)
+
+  global_is_sequential = bool(config.get("sequential"))
+  global_configs_file = config.get("configs")
   
   if not skip_configs_load:
     global_configs = []
@@ -541,22 +701,157 @@ def launch_jobs_from_file(
       except SbatchManError as e:
         console.print(f"[bold red]Error:[/bold red] {e}")
         raise typer.Exit(1)
+
+  if global_is_sequential:
+    console.print('[yellow]Jobs will be scheduled sequentially.[/yellow]')
   
+  launched_jobs = []
+  previous_job_id = None
+  # Jobs to submit as SLURM job arrays or packs, grouped by (cluster_name, config_name)
+  job_groups: Optional[Dict[Tuple[str, str], List[Job]]] = {} if array or pack else None
+  # Duplicate keys of the jobs in job_groups, which are not written until submitted
+  pending_keys: Set[tuple] = set()
+
+  for group, jobs_args in _iter_selected_job_args(jobs_file_path, filter_tags, filter_variables, selection):
+    previous_job_id = _launch_job_combinations(
+      jobs_args,
+      group.cluster_name,
+      launched_jobs,
+      force,
+      global_is_sequential,
+      previous_job_id,
+      dry_run=dry_run,
+      ignore_archived=ignore_archived,
+      ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+      ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+      max_workers=max_workers,
+      job_groups=job_groups,
+      pack=bool(pack),
+      pending_keys=pending_keys,
+    )
+
+  if job_groups and pack:
+    _submit_job_packs(job_groups, launched_jobs, pack, pack_workers)
+  elif job_groups:
+    _submit_job_arrays(job_groups, launched_jobs)
+
+  return launched_jobs
+
+
+def iter_jobs_from_file(
+  jobs_file_path: Path,
+  filter_tags: Optional[List[str]] = None,
+  filter_variables: Optional[Dict[str, Any]] = None,
+  start: int = 0,
+  stop: Optional[int] = None,
+  shard: Optional[Tuple[int, int]] = None,
+) -> Iterator[Dict[str, Any]]:
+  """
+  Lazily yields the jobs defined by a jobs file, in launch order, as dicts of `launch_job` arguments
+  (`config_name`, `command`, `tag`, `preprocess`, `postprocess`, `check`, `cluster_name` and `variables`).
+  Nothing is launched, no duplicate check is performed and the configurations of the file are not loaded.
+
+  Jobs are numbered from 0, after filtering. Only a slice of them can be selected, e.g. to resume a launch or to split
+  it between several processes; combinations outside of the slice are skipped without being generated, whenever possible.
+  Args:
+    filter_tags: If provided, only yield jobs whose tag matches one of these values.
+    filter_variables: If provided, only yield jobs where variables match all key=value pairs.
+    start: Number of the first job to yield.
+    stop: If provided, stop before the job with this number.
+    shard: A (k, n) pair: only yield the jobs whose number modulo n is k.
+  """
+  jobs_file_path = Path(jobs_file_path)
+  selection = _job_selection(start, stop, shard)
+  for group, jobs_args in _iter_selected_job_args(jobs_file_path, filter_tags, filter_variables, selection):
+    for job_args in jobs_args:
+      yield {**job_args, 'cluster_name': group.cluster_name}
+
+
+def count_jobs_from_file(
+  jobs_file_path: Path,
+  filter_tags: Optional[List[str]] = None,
+  filter_variables: Optional[Dict[str, Any]] = None,
+) -> int:
+  """
+  Returns the number of jobs defined by a jobs file (that is, yielded by `iter_jobs_from_file`), without launching them.
+  The combinations of variables are counted arithmetically, they are only enumerated for job definitions whose
+  tag depends on the variables (when filtering by tag) or that mix map variables and variable filters.
+  """
+  jobs_file_path = Path(jobs_file_path)
+  config, global_vars = _load_jobs_file(jobs_file_path)
+  values = _VariableValues()
+  count = 0
+  for group in _iter_job_groups(config, global_vars, filter_tags):
+    combinations = _JobCombinations(group, values, filter_tags, filter_variables)
+    if combinations.count is not None:
+      count += combinations.count
+    else:
+      count += sum(1 for _ in combinations.iter_job_args())
+  return count
+
+
+def _job_selection(start: int = 0, stop: Optional[int] = None, shard: Optional[Tuple[int, int]] = None) -> range:
+  """Returns the numbers of the jobs selected by `start`, `stop` and `shard` (see `iter_jobs_from_file`)."""
+  if start < 0 or (stop is not None and stop < 0):
+    raise ConfigurationError("The numbers of the first and last jobs to launch cannot be negative.")
+  step = 1
+  if shard is not None:
+    k, step = shard
+    if step < 1 or not 0 <= k < step:
+      raise ConfigurationError(f"Invalid shard {k}/{step}: it must be k/n with 0 <= k < n.")
+    start += (k - start) % step
+  return range(start, sys.maxsize if stop is None else stop, step)
+
+
+@dataclass
+class _JobGroup:
+  """A job definition of a jobs file (or one of its `config_jobs` entries), launched for every combination of its variables."""
+  config_template: str
+  command_template: str
+  tag: str
+  preprocess_template: Optional[str]
+  postprocess_template: Optional[str]
+  check_template: Optional[str]
+  cluster_name: Optional[str]
+  variables: Dict[str, Any] # Not expanded yet, see `_VariableValues`
+
+
+class _VariableValues:
+  """
+  Expands the values of the variables of a jobs file (see `load_variable_values`) the first time they are used,
+  so that files and directories are only read if a job actually uses them, and only once.
+  """
+
+  def __init__(self):
+    # (name, id(value)) -> (value, expanded value). The value is kept to pin its id.
+    self._cache: Dict[Tuple[str, int], Tuple[Any, Any]] = {}
+
+  def get(self, name: str, value: Any) -> Any:
+    entry = self._cache.get((name, id(value)))
+    if entry is None:
+      entry = self._cache[(name, id(value))] = (value, load_variable_values(value, name))
+    return entry[1]
+
+
+def _iter_job_groups(
+  config: Dict[str, Any],
+  global_vars: Dict[str, Any],
+  filter_tags: Optional[List[str]] = None,
+) -> Iterator[_JobGroup]:
+  """Yields the job definitions of a jobs file that may run on this machine, and whose tag may match `filter_tags`."""
+  global_command = config.get("command", None)
+  global_preprocess = config.get("preprocess", None)
+  global_postprocess = config.get("postprocess", None)
+  global_check = config.get("check", None)
+  global_cluster_name = config.get("cluster_name", None)
+
   machine_cluster_name = None
   try:
     machine_cluster_name = get_cluster_name()
   except ClusterNameNotSetError:
     pass
 
-  if global_is_sequential:
-    console.print('[yellow]Jobs will be scheduled sequentially.[/yellow]')
-  
-  # Prepare global variable values (expand files if needed)
-  expanded_global_vars = {k: load_variable_values(v, k) for k, v in global_vars.items()}
-  
-  launched_jobs = []
   job_definitions = config.get("jobs", [])
-  previous_job_id = None
 
   for job_def in job_definitions:
     job_config_template = job_def.get("config")
@@ -570,10 +865,8 @@ def launch_jobs_from_file(
     job_cluster_name = job_def.get("cluster_name", global_cluster_name)
     job_vars = job_def.get("variables", {})
 
-    expanded_job_vars = {k: load_variable_values(v, k) for k, v in job_vars.items()}
-
     # Merge global and job-specific variables
-    merged_job_vars = {**expanded_global_vars, **expanded_job_vars}
+    merged_job_vars = {**global_vars, **job_vars}
 
     config_jobs = job_def.get("config_jobs", [])
     if not config_jobs:
@@ -588,8 +881,11 @@ def launch_jobs_from_file(
       if job_cluster_name is not None and machine_cluster_name is not None and job_cluster_name != machine_cluster_name:
         continue # Skip job if job's cluster name doesn't match the machine's cluster name
 
+      if not job_command_template:
+        continue
+
       # If no config_jobs, run with the job's own context
-      previous_job_id = _launch_job_combinations(
+      yield _JobGroup(
         job_config_template,
         job_command_template,
         job_tag,
@@ -598,16 +894,6 @@ def launch_jobs_from_file(
         job_check_template,
         job_cluster_name,
         merged_job_vars,
-        launched_jobs,
-        force,
-        global_is_sequential,
-        previous_job_id,
-        dry_run=dry_run,
-        filter_tags=filter_tags,
-        filter_variables=filter_variables,
-        ignore_archived=ignore_archived,
-        ignore_conf_in_dup_check=ignore_conf_in_dup_check,
-        ignore_commands_in_dup_check=ignore_commands_in_dup_check,
       )
     else:
       for entry in config_jobs:
@@ -623,90 +909,104 @@ def launch_jobs_from_file(
             continue
 
         entry_command_template = entry.get("command", job_command_template)
-        entry_preprocess_template = entry.get("preprocess", job_preprocess_template)
-        entry_postprocess_template = entry.get("postprocess", job_postprocess_template)
-        entry_check_template = entry.get("check", job_check_template)
         entry_cluster_name = entry.get("cluster_name", job_cluster_name)
-        entry_vars = entry.get("variables", {})
-        expanded_entry_vars = {k: load_variable_values(v, k) for k, v in entry_vars.items()}
-        
-        # Merge all variables: global -> job -> entry
-        final_vars = {**merged_job_vars, **expanded_entry_vars}
 
         if entry_cluster_name is not None and machine_cluster_name is not None and entry_cluster_name != machine_cluster_name:
           continue # Skip job if entry's cluster name doesn't match the machine's cluster name
 
-        previous_job_id = _launch_job_combinations(
+        if not entry_command_template:
+          continue
+
+        yield _JobGroup(
           job_config_template,
           entry_command_template,
           tag_name,
-          entry_preprocess_template,
-          entry_postprocess_template,
-          entry_check_template,
+          entry.get("preprocess", job_preprocess_template),
+          entry.get("postprocess", job_postprocess_template),
+          entry.get("check", job_check_template),
           entry_cluster_name,
-          final_vars,
-          launched_jobs,
-          force,
-          global_is_sequential,
-          previous_job_id,
-          dry_run=dry_run,
-          filter_tags=filter_tags,
-          filter_variables=filter_variables,
-          ignore_archived=ignore_archived,
-          ignore_conf_in_dup_check=ignore_conf_in_dup_check,
-          ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+          # Merge all variables: global -> job -> entry
+          {**merged_job_vars, **entry.get("variables", {})},
         )
 
-  return launched_jobs
 
+def _iter_selected_job_args(
+  jobs_file_path: Path,
+  filter_tags: Optional[List[str]],
+  filter_variables: Optional[Dict[str, Any]],
+  selection: range,
+) -> Iterator[Tuple[_JobGroup, Iterator[Dict[str, Any]]]]:
+  """
+  Yields the job definitions of a jobs file with the `launch_job` arguments of their jobs whose number is in `selection`.
+  Each iterator must be consumed before moving to the next job definition.
+  """
+  config, global_vars = _load_jobs_file(jobs_file_path)
+  values = _VariableValues()
+  # Number of the first job of the current job definition
+  offset = 0
 
-def _launch_job_combinations(
-  config_template: str,
-  command_template: str,
-  tag: str,
-  preprocess_template: Optional[str],
-  postprocess_template: Optional[str],
-  check_template: Optional[str],
-  cluster_name: Optional[str],
-  variables: Dict[str, Any],
-  launched_jobs: List[Job],
-  force: bool = False,
-  sequential: bool = False,
-  previous_job_id: Optional[int] = None,
-  dry_run: bool = False,
-  filter_tags: Optional[List[str]] = None,
-  filter_variables: Optional[Dict[str, Any]] = None,
-  ignore_archived: bool = False,
-  ignore_conf_in_dup_check: bool = False,
-  ignore_commands_in_dup_check: bool = False,
-) -> Optional[int]:
-    """
-    Generates and launches jobs for all combinations of variables.
-    
-    Map variables are resolved dynamically based on their key variable's value.
- 
-    Args:
-      filter_tags: If provided, only launch jobs whose substituted tag matches one of these values.
-      filter_variables: If provided, only launch jobs where variables match all key=value pairs.
- 
-    Returns: the id of the last submitted job
-    """
-    if not command_template:
+  def _enumerate_selected(combinations: '_JobCombinations') -> Iterator[Dict[str, Any]]:
+    nonlocal offset
+    for job_args in combinations.iter_job_args():
+      if offset in selection:
+        yield job_args
+      offset += 1
+      if offset >= selection.stop:
+        return
+
+  for group in _iter_job_groups(config, global_vars, filter_tags):
+    if offset >= selection.stop:
       return
-    
+    combinations = _JobCombinations(group, values, filter_tags, filter_variables)
+    if combinations.count is None:
+      # The numbers of the following jobs are only known once these are enumerated
+      yield group, _enumerate_selected(combinations)
+      continue
+
+    # First selected job of this definition, if any
+    first = max(selection.start, offset)
+    first += (selection.start - first) % selection.step
+    indices = range(first - offset, min(selection.stop, offset + combinations.count) - offset, selection.step)
+    offset += combinations.count
+    if indices:
+      yield group, combinations.iter_job_args(indices)
+
+
+class _JobCombinations:
+  """
+  The combinations of variables of a job definition that pass the filters.
+  Map variables are resolved dynamically based on their key variable's value.
+  """
+
+  def __init__(
+    self,
+    group: _JobGroup,
+    values: _VariableValues,
+    filter_tags: Optional[List[str]] = None,
+    filter_variables: Optional[Dict[str, Any]] = None,
+  ):
+    self.group = group
+    self.filter_tags = filter_tags
+    self.filter_variables = filter_variables
+
+    templates = [group.config_template, group.command_template, group.tag, group.preprocess_template, group.postprocess_template, group.check_template]
     # Determine which variables are actually used in the templates
-    used_vars = extract_used_vars(config_template, command_template, tag, preprocess_template, postprocess_template, check_template)
+    used_vars = extract_used_vars(*templates)
     
     # Find map variables and their key variables
-    map_info = {}  # map_name -> (map_dict, key_var_name)
+    self.map_info = {}  # map_name -> (map_dict, key_var_name)
     filtered_vars = {}
     
-    for k, v in variables.items():
+    for k, raw_value in group.variables.items():
+      if k not in used_vars and f'{k}_filename' not in used_vars:
+        continue # Unused variables are never expanded
+      v = values.get(k, raw_value)
+
       if isinstance(v, dict) and '__map__' in v:
         if k in used_vars:
           # Find the key variable for this map by searching templates
           key_var = None
-          for template in [config_template, command_template, tag, preprocess_template, postprocess_template, check_template]:
+          for template in templates:
             if isinstance(template, str):
               pattern = re.compile(rf"\{{{k}\[(\w+)\]\}}")
               match = pattern.search(template)
@@ -714,7 +1014,7 @@ def _launch_job_combinations(
                 key_var = match.group(1)
                 break
           if key_var:
-            map_info[k] = (v, key_var)
+            self.map_info[k] = (v, key_var)
         continue
       
       # In case of [(abs_path, file_stem)] tuples
@@ -724,57 +1024,125 @@ def _launch_job_combinations(
       else:
         if k in used_vars:
           filtered_vars[k] = v
-    
-    if not filtered_vars and not map_info:
+
+    self.keys = tuple(filtered_vars)
+    self.values = [filtered_vars[k] for k in self.keys]
+    # Values of the variables restricted by `filter_variables` (for definitions without map variables)
+    self._selected_values = self.values
+    self.count = self._count()
+
+  def _count(self) -> Optional[int]:
+    """Returns the number of combinations that pass the filters, or None if they must be enumerated to know it."""
+    if self.filter_tags is not None:
+      if extract_used_vars(self.group.tag):
+        return None
+      if not any(fnmatch.fnmatch(self.group.tag, pattern) for pattern in self.filter_tags):
+        return 0
+
+    if not self.keys and not self.map_info:
+      # A single job, without variables
+      return 0 if self.filter_variables else 1
+
+    if self.filter_variables is not None:
+      if self.map_info:
+        return None
+      selected_values = list(self.values)
+      for key, value in self.filter_variables.items():
+        if key not in self.keys:
+          return 0
+        i = self.keys.index(key)
+        # Convert both to string for comparison (variables from CLI are strings)
+        selected_values[i] = [v for v in selected_values[i] if str(v) == str(value)]
+      self._selected_values = selected_values
+      return math.prod(len(v) for v in selected_values)
+
+    # Every map variable multiplies the jobs of a combination by the number of values it resolves to
+    maps_by_key = {}
+    for map_var_dict, key_var_name in self.map_info.values():
+      maps_by_key.setdefault(key_var_name, []).append(map_var_dict)
+    count = 1
+    for key, key_values in zip(self.keys, self.values):
+      maps = maps_by_key.get(key)
+      if not maps:
+        count *= len(key_values)
+      else:
+        count *= sum(math.prod(self._count_map_values(m, value) for m in maps) for value in key_values)
+    return count
+
+  @staticmethod
+  def _count_map_values(map_var_dict: Dict[str, Any], key_value: Any) -> int:
+    try:
+      return len(resolve_map_variable(map_var_dict, key_value))
+    except KeyError:
+      return 1 # The map variable is left unresolved (see `iter_job_args`)
+
+  def _make_job_args(self, job_vars: Dict[str, Any], filter_vars: Dict[str, Any], launch_vars: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    group = self.group
+    job_tag = substitute(group.tag, job_vars)
+    # Check if this job should be skipped based on filters
+    if _should_skip_job(job_tag, filter_vars, self.filter_tags, self.filter_variables):
+      return None
+    job_args = dict(
+      config_name=substitute(group.config_template, job_vars),
+      command=substitute(group.command_template, job_vars),
+      tag=job_tag,
+      preprocess=substitute(group.preprocess_template, job_vars),
+      postprocess=substitute(group.postprocess_template, job_vars),
+      check=substitute(group.check_template, job_vars),
+    )
+    if launch_vars is not None:
+      job_args['variables'] = launch_vars
+    return job_args
+
+  def iter_job_args(self, indices: Optional[range] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yields the `launch_job` arguments of the combinations, or only of the ones at the given `indices`
+    (positions among the combinations that pass the filters, see `count`).
+    """
+    if indices is None:
+      yield from self._enumerate()
+    elif self.keys and not self.map_info and self.count is not None:
+      yield from self._unrank(indices)
+    else:
+      for i, job_args in enumerate(self._enumerate()):
+        if i >= indices.stop:
+          return
+        if i in indices:
+          yield job_args
+
+  def _unrank(self, indices: range) -> Iterator[Dict[str, Any]]:
+    """Yields the combinations at the given indices directly, without generating the others."""
+    sizes = [len(v) for v in self._selected_values]
+    for index in indices:
+      # The same order as itertools.product: the last variable changes fastest
+      combination = []
+      for key_values, size in zip(reversed(self._selected_values), reversed(sizes)):
+        index, i = divmod(index, size)
+        combination.append(key_values[i])
+      var_dict = dict(zip(self.keys, reversed(combination)))
+      job_args = self._make_job_args(var_dict, var_dict, var_dict)
+      if job_args is not None:
+        yield job_args
+
+  def _enumerate(self) -> Iterator[Dict[str, Any]]:
+    if not self.keys and not self.map_info:
       # If no variables are used, launch a single job
-      config_name = substitute(config_template, {})
-      command = substitute(command_template, {})
-      job_tag = substitute(tag, {})
-      preprocess = substitute(preprocess_template, {})
-      postprocess = substitute(postprocess_template, {})
-      check = substitute(check_template, {})
-      
-      # Check if this job should be skipped based on filters
-      if _should_skip_job(job_tag, {}, filter_tags, filter_variables):
-        return previous_job_id
-      
-      try:
-        job = launch_job(
-          config_name,
-          command,
-          tag=job_tag,
-          preprocess=preprocess,
-          postprocess=postprocess,
-          check=check,
-          force=force,
-          previous_job_id=(previous_job_id if sequential else None),
-          cluster_name=cluster_name,
-          dry_run=dry_run,
-          ignore_archived=ignore_archived,
-          ignore_conf_in_dup_check=ignore_conf_in_dup_check,
-          ignore_commands_in_dup_check=ignore_commands_in_dup_check,
-        )
-        console.print(f"✅ Submitted job '{job.config_name}' with tag '{job.tag}'")
-        launched_jobs.append(job)
-        previous_job_id = job.job_id
-      except JobExistsError as e:
-        console.print(f"Skipping job: {e.message}")
-      except JobSubmitError as e:
-        console.print(f"Failed to submit job: {e.message}")
-      return previous_job_id
+      job_args = self._make_job_args({}, {}, None)
+      if job_args is not None:
+        yield job_args
+      return
  
-    keys, values = zip(*filtered_vars.items())
-    for combination in itertools.product(*values):
-      var_dict = dict(zip(keys, combination))
+    for combination in itertools.product(*self.values):
+      var_dict = dict(zip(self.keys, combination))
       
       # Merge with map variables for substitution
       # Map variables stay as map dicts so substitute() can resolve them with their key
-      substitution_vars = {**map_info_to_vars(map_info), **var_dict}
+      substitution_vars = {**map_info_to_vars(self.map_info), **var_dict}
       
       # For the cartesian product of map-dependent values, we need to iterate through
       # all possible combinations of resolved values from each map variable
       map_resolved = {}  # map_name -> list of resolved values
-      for map_name, (map_var_dict, key_var_name) in map_info.items():
+      for map_name, (map_var_dict, key_var_name) in self.map_info.items():
         if key_var_name in var_dict:
           try:
             resolved_list = resolve_map_variable(map_var_dict, var_dict[key_var_name])
@@ -790,78 +1158,369 @@ def _launch_job_combinations(
           map_dict = dict(zip(map_keys, map_combination))
           # Use the combined vars for substitution
           final_vars = {**substitution_vars, **map_dict}
-          
-          config_name = substitute(config_template, final_vars)
-          command = substitute(command_template, final_vars)
-          job_tag = substitute(tag, final_vars)
-          preprocess = substitute(preprocess_template, final_vars)
-          postprocess = substitute(postprocess_template, final_vars)
-          check = substitute(check_template, final_vars)
-          
-          # Check if this job should be skipped based on filters
-          if _should_skip_job(job_tag, final_vars, filter_tags, filter_variables):
-            continue
-          
-          try:
-            job = launch_job(
-              config_name,
-              command,
-              tag=job_tag,
-              preprocess=preprocess,
-              postprocess=postprocess,
-              check=check,
-              force=force,
-              previous_job_id=(previous_job_id if sequential else None),
-              variables=final_vars,
-              cluster_name=cluster_name,
-              dry_run=dry_run,
-              ignore_archived=ignore_archived,
-              ignore_conf_in_dup_check=ignore_conf_in_dup_check,
-              ignore_commands_in_dup_check=ignore_commands_in_dup_check,
-            )
-            console.print(f"✅ Submitted job '{job.config_name}' with tag '{job.tag}'")
-            launched_jobs.append(job)
-            previous_job_id = job.job_id
-          except JobExistsError as e:
-            console.print(f"Skipping job: {e.message}")
-          except JobSubmitError as e:
-            console.print(f"Failed to submit job: {e.message}")
+          job_args = self._make_job_args(final_vars, final_vars, final_vars)
+          if job_args is not None:
+            yield job_args
       else:
         # No map variables to resolve, process normally
-        config_name = substitute(config_template, substitution_vars)
-        command = substitute(command_template, substitution_vars)
-        job_tag = substitute(tag, substitution_vars)
-        preprocess = substitute(preprocess_template, substitution_vars)
-        postprocess = substitute(postprocess_template, substitution_vars)
-        check = substitute(check_template, substitution_vars)
-        
-        # Check if this job should be skipped based on filters
-        if _should_skip_job(job_tag, var_dict, filter_tags, filter_variables):
-          continue
-        
+        job_args = self._make_job_args(substitution_vars, var_dict, var_dict)
+        if job_args is not None:
+          yield job_args
+
+
+def _collect_launched_job(launch: Callable[[], Job], launched_jobs: List[Job]) -> Optional[Job]:
+  """
+  Runs `launch`, reports its outcome and appends the launched job to `launched_jobs`.
+  Returns the launched job, or None if it was skipped or its submission failed.
+  """
+  try:
+    job = launch()
+  except JobExistsError as e:
+    console.print(f"Skipping job: {e.message}")
+    return None
+  except JobSubmitError as e:
+    console.print(f"Failed to submit job: {e.message}")
+    return None
+  console.print(f"✅ Submitted job '{job.config_name}' with tag '{job.tag}'")
+  launched_jobs.append(job)
+  return job
+
+
+def _launch_jobs_concurrently(
+  jobs_args: Iterable[Dict[str, Any]],
+  launched_jobs: List[Job],
+  max_workers: int,
+  cluster_name: Optional[str] = None,
+  force: bool = False,
+  ignore_archived: bool = False,
+  ignore_conf_in_dup_check: bool = False,
+  ignore_commands_in_dup_check: bool = False,
+) -> Optional[int]:
+  """
+  Launches the given jobs with a pool of `max_workers` threads.
+
+  Duplicate checks are performed by the calling thread in submission order, exactly as
+  `launch_job` would do, so that only the actual submissions (directory creation, script
+  writing and the scheduler call) run concurrently. Jobs still in flight are not indexed yet,
+  so they are also checked against the jobs dispatched before them. Results are reported in
+  submission order, and at most a few jobs per worker are in flight at any time.
+
+  Returns: the id of the last launched job
+  """
+  dup_check_cluster_name = cluster_name
+  if dup_check_cluster_name is None:
+    try:
+      dup_check_cluster_name = get_cluster_name()
+    except ClusterNameNotSetError:
+      pass # launch_job will raise a meaningful error
+
+  last_job_id = None
+  pending: Deque[concurrent.futures.Future] = collections.deque()
+  pending_keys: Set[tuple] = set()
+
+  def _collect_oldest():
+    nonlocal last_job_id
+    job = _collect_launched_job(pending.popleft().result, launched_jobs)
+    if job is not None:
+      last_job_id = job.job_id
+
+  with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+    for job_args in jobs_args:
+      if not force and dup_check_cluster_name is not None:
         try:
-          job = launch_job(
-            config_name,
-            command,
-            tag=job_tag,
-            preprocess=preprocess,
-            postprocess=postprocess,
-            check=check,
-            force=force,
-            previous_job_id=(previous_job_id if sequential else None),
-            variables=var_dict,
-            cluster_name=cluster_name,
-            dry_run=dry_run,
+          _check_duplicate_job(
+            job_args['command'],
+            job_args['config_name'],
+            dup_check_cluster_name,
+            job_args['tag'],
+            job_args['preprocess'],
+            job_args['postprocess'],
             ignore_archived=ignore_archived,
             ignore_conf_in_dup_check=ignore_conf_in_dup_check,
             ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+            pending_keys=pending_keys,
           )
-          console.print(f"✅ Submitted job '{job.config_name}' with tag '{job.tag}'")
-          launched_jobs.append(job)
-          previous_job_id = job.job_id
         except JobExistsError as e:
-          console.print(f"Skipping job: {e.message}")
-        except JobSubmitError as e:
-          console.print(f"Failed to submit job: {e.message}")
+          skipped = concurrent.futures.Future()
+          skipped.set_exception(e)
+          pending.append(skipped)
+          continue
+
+      # The duplicate check has already been done above
+      pending.append(executor.submit(
+        launch_job,
+        **job_args,
+        cluster_name=cluster_name,
+        force=True,
+      ))
+
+      # Bound the number of jobs in flight, reporting results in order
+      while len(pending) > 2 * max_workers:
+        _collect_oldest()
+
+    while pending:
+      _collect_oldest()
+
+  return last_job_id
+
+
+def _mark_failed_submission(job: Job, err_str: str):
+  """Records a submission error in the job metadata and stderr log."""
+  job.status = Status.FAILED_SUBMISSION.value
+  job.end_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S.%f")
+  job.write_metadata()
+  with open(job.get_stderr_path(), 'w+') as err_file:
+    err_file.write(err_str)
+
+
+def _prepare_grouped_jobs(
+  jobs_args: Iterable[Dict[str, Any]],
+  job_groups: Dict[Tuple[str, str], List[Job]],
+  launched_jobs: List[Job],
+  cluster_name: Optional[str] = None,
+  force: bool = False,
+  ignore_archived: bool = False,
+  ignore_conf_in_dup_check: bool = False,
+  ignore_commands_in_dup_check: bool = False,
+  pack: bool = False,
+  pending_keys: Optional[Set[tuple]] = None,
+) -> Optional[int]:
+  """
+  Prepares the given jobs to be submitted as SLURM job arrays, adding them to `job_groups`
+  (grouped by cluster and configuration) to be submitted later by `_submit_job_arrays`.
+  Jobs whose configuration does not use SLURM are launched right away, one by one.
+  If `pack` is True, the jobs of all schedulers are prepared to be packed into allocations
+  by `_submit_job_packs` instead.
+
+  The metadata of grouped jobs is only written when they are submitted, so they are checked for
+  duplicates against `pending_keys` too (see `_check_duplicate_job`), which must be shared by all
+  the jobs added to `job_groups`.
+
+  Returns: the id of the last launched job
+  """
+  last_job_id = None
+  for job_args in jobs_args:
+    try:
+      job = _prepare_job(
+        **job_args,
+        cluster_name=cluster_name,
+        force=force,
+        ignore_archived=ignore_archived,
+        ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+        ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+        wait_for_queue=False,
+        array_task=not pack,
+        pack_task=pack,
+        pending_keys=pending_keys,
+      )
+    except JobExistsError as e:
+      console.print(f"Skipping job: {e.message}")
+      continue
+
+    if pack or job.scheduler == 'slurm':
+      job_groups.setdefault((job.cluster_name, job.config_name), []).append(job)
+      continue
+
+    wait_for_queue_slot()
+    job = _collect_launched_job(lambda: _submit_prepared_job(job), launched_jobs)
+    if job is not None:
+      last_job_id = job.job_id
+
+  return last_job_id
+
+
+def _submit_job_arrays(job_arrays: Dict[Tuple[str, str], List[Job]], launched_jobs: List[Job]):
+  """
+  Submits the jobs prepared by `_prepare_grouped_jobs` as one SLURM job array per configuration
+  (split into arrays of at most SLURM_MAX_ARRAY_SIZE jobs). Every job keeps its own experiment
+  directory, run script and metadata, and its id is stored as `<array_id>_<index>`.
+  Every task counts as a queued job, so arrays are also split to fit within `max_queued_jobs`.
+  """
+  max_jobs = get_max_queued_jobs()
+  array_size = SLURM_MAX_ARRAY_SIZE if max_jobs is None else max(1, min(SLURM_MAX_ARRAY_SIZE, max_jobs))
+  for (_, config_name), config_jobs in job_arrays.items():
+    for i in range(0, len(config_jobs), array_size):
+      array_jobs = config_jobs[i:i + array_size]
+      wait_for_queue_slot(n=len(array_jobs))
+
+      # Tasks may start as soon as the array is submitted, so all metadata must be written before
+      for job in array_jobs:
+        job.write_metadata()
+        register_job(job)
+
+      try:
+        array_id = slurm_submit_array([job.get_job_script_path() for job in array_jobs], array_jobs[0].get_job_base_path())
+      except (ValueError, FileNotFoundError) as e:
+        err_str = "Failed to submit job array. Error: " + str(e)
+      except subprocess.CalledProcessError as e:
+        err_str = f"Job array submission failed with error code {e.returncode}.\nOutput stream:\n" + e.output + "\nError stream:\n" + (e.stderr or "")
+      else:
+        for index, job in enumerate(array_jobs):
+          job.job_id = f"{array_id}_{index}"
+          job.write_metadata(override_status=False)
+        launched_jobs.extend(array_jobs)
+        console.print(f"✅ Submitted job array {array_id} with {len(array_jobs)} jobs for config '{config_name}'")
+        continue
+
+      get_queue_throttle().release(len(array_jobs))
+      for job in array_jobs:
+        _mark_failed_submission(job, err_str)
+      launched_jobs.extend(array_jobs)
+      console.print(f"Failed to submit job array: {err_str}")
+
+
+def _make_pack_dir(cluster_name: str, config_name: str) -> Path:
+  """Creates a new directory for the script and the logs of an allocation running packed jobs."""
+  base_pack_dir = get_packs_dir() / cluster_name / config_name / datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+  pack_dir = base_pack_dir
+  counter = 1
+  while True:
+    try:
+      pack_dir.mkdir(parents=True, exist_ok=False)
+      return pack_dir
+    except FileExistsError:
+      pack_dir = base_pack_dir.with_name(f"{base_pack_dir.name}_{counter}")
+      counter += 1
+
+
+def _submit_job_packs(
+  job_packs: Dict[Tuple[str, str], List[Job]],
+  launched_jobs: List[Job],
+  pack_size: int,
+  pack_workers: Optional[int] = None,
+):
+  """
+  Submits the jobs prepared by `_prepare_grouped_jobs` packed into allocations of at most `pack_size`
+  jobs sharing the same configuration, which run the jobs with `pack_workers` workers (see `packing.py`).
+  Every job keeps its own experiment directory, run script and metadata, and its id is stored as
+  `<allocation_id>+<index>`.
+  """
+  for (cluster_name, config_name), config_jobs in job_packs.items():
+    for i in range(0, len(config_jobs), pack_size):
+      pack_jobs = config_jobs[i:i + pack_size]
+      # The scheduler only sees the allocation, which takes a single slot of the queue
+      wait_for_queue_slot()
+
+      # Jobs may start as soon as the allocation is submitted, so all metadata must be written before
+      for job in pack_jobs:
+        job.write_metadata()
+        register_job(job)
+
+      scheduler = pack_jobs[0].scheduler
+      try:
+        pack_dir = _make_pack_dir(cluster_name, config_name)
+        pack_script_path = pack_dir / "pack.sh"
+        with open(pack_jobs[0].get_job_script_path(), "r") as f:
+          run_script = f.read()
+        with open(pack_script_path, "w") as f:
+          f.write(pack_script(
+            scheduler,
+            run_script,
+            [job.get_job_script_path() for job in pack_jobs],
+            pack_dir,
+            workers=pack_workers,
+          ))
+        pack_script_path.chmod(0o755)
+
+        if scheduler == 'slurm':
+          allocation_id = slurm_submit(pack_script_path, pack_dir)
+        elif scheduler == 'pbs':
+          allocation_id = pbs_submit(pack_script_path, pack_dir)
+        elif scheduler == 'local':
+          config = load_local_config(config_name)
+          if config is None:
+            raise ConfigurationError(f'Couldn\'t find configuration `{config_name}`')
+          allocation_id = config.local_submit(pack_script_path, pack_dir)
+        else:
+          raise JobSubmitError(f"No submission class found for scheduler '{scheduler}'. Supported schedulers are: slurm, pbs, local.")
+      except (ValueError, OSError, SbatchManError) as e:
+        err_str = "Failed to submit job pack. Error: " + str(e)
+      except subprocess.CalledProcessError as e:
+        err_str = f"Job pack submission failed with error code {e.returncode}.\nOutput stream:\n" + e.output + "\nError stream:\n" + (e.stderr or "")
+      else:
+        for index, job in enumerate(pack_jobs):
+          job.job_id = packed_job_id(allocation_id, index)
+          job.write_metadata(override_status=False)
+        launched_jobs.extend(pack_jobs)
+        console.print(f"✅ Submitted job pack {allocation_id} with {len(pack_jobs)} jobs for config '{config_name}'")
+        continue
+
+      get_queue_throttle().release()
+      for job in pack_jobs:
+        _mark_failed_submission(job, err_str)
+      launched_jobs.extend(pack_jobs)
+      console.print(f"Failed to submit job pack: {err_str}")
+
+
+def _launch_job_combinations(
+  jobs_args: Iterable[Dict[str, Any]],
+  cluster_name: Optional[str],
+  launched_jobs: List[Job],
+  force: bool = False,
+  sequential: bool = False,
+  previous_job_id: Optional[int] = None,
+  dry_run: bool = False,
+  ignore_archived: bool = False,
+  ignore_conf_in_dup_check: bool = False,
+  ignore_commands_in_dup_check: bool = False,
+  max_workers: int = 1,
+  job_groups: Optional[Dict[Tuple[str, str], List[Job]]] = None,
+  pack: bool = False,
+  pending_keys: Optional[Set[tuple]] = None,
+) -> Optional[int]:
+    """
+    Launches the jobs of a job definition (see `_JobCombinations.iter_job_args`).
+ 
+    Args:
+      max_workers: Number of jobs submitted concurrently. Sequential jobs and dry runs are always launched one at a time.
+      job_groups: If provided, jobs using a SLURM configuration (or all jobs, if `pack` is True) are added to it (see `_prepare_grouped_jobs`) instead of being submitted one by one. Ignored for sequential jobs and dry runs.
+      pending_keys: Duplicate keys of the jobs in `job_groups`, see `_prepare_grouped_jobs`.
+ 
+    Returns: the id of the last submitted job
+    """
+    if job_groups is not None and not sequential and not dry_run:
+      last_job_id = _prepare_grouped_jobs(
+        jobs_args,
+        job_groups,
+        launched_jobs,
+        cluster_name=cluster_name,
+        force=force,
+        ignore_archived=ignore_archived,
+        ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+        ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+        pack=pack,
+        pending_keys=pending_keys,
+      )
+      return last_job_id if last_job_id is not None else previous_job_id
+
+    if max_workers > 1 and not sequential and not dry_run:
+      last_job_id = _launch_jobs_concurrently(
+        jobs_args,
+        launched_jobs,
+        max_workers,
+        cluster_name=cluster_name,
+        force=force,
+        ignore_archived=ignore_archived,
+        ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+        ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+      )
+      return last_job_id if last_job_id is not None else previous_job_id
+
+    for job_args in jobs_args:
+      job = _collect_launched_job(
+        lambda: launch_job(
+          **job_args,
+          force=force,
+          previous_job_id=(previous_job_id if sequential else None),
+          cluster_name=cluster_name,
+          dry_run=dry_run,
+          ignore_archived=ignore_archived,
+          ignore_conf_in_dup_check=ignore_conf_in_dup_check,
+          ignore_commands_in_dup_check=ignore_commands_in_dup_check,
+        ),
+        launched_jobs,
+      )
+      if job is not None:
+        previous_job_id = job.job_id
     
-    return previous_job_id
\ No newline at end of file
+    return previous_job_id
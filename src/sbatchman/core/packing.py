@@ -0,0 +1,132 @@
+"""
+Task farming: many short jobs packed into a single scheduler allocation.
+
+Every job of a pack keeps its own experiment directory, `run.sh` and metadata, exactly as if it was
+submitted on its own. Only the pack script (see `pack_script`) is submitted to the scheduler: it runs
+the `run.sh` scripts of its jobs with a pool of workers sized to the allocation, and each of them
+records its own status transitions in its state log as usual.
+
+The id of a packed job is `<allocation_id>+<index>`. The scheduler only knows the allocation, so the
+status of packed jobs is taken from their own state log while the allocation is queued or running,
+and from the allocation once it ended (see `packed_job_status`), e.g. jobs that were still running
+or waiting for a worker when the allocation timed out become TIMEOUT.
+"""
+import re
+import shlex
+from pathlib import Path
+from typing import Optional, Sequence, Union
+
+from sbatchman.core.status import TERMINAL_STATES, Status
+
+PACKED_JOB_ID_SEPARATOR = "+"
+
+# Variable through which the pack script passes its id to each job it runs
+PACKED_JOB_ID_VARIABLE = "SBATCHMAN_PACKED_JOB_ID"
+
+# Shell expressions of the id of the allocation, as stored in the jobs metadata
+_ALLOCATION_ID = {
+  "slurm": "$SLURM_JOB_ID",
+  "pbs": "${PBS_JOBID%%.*}",
+  "local": "$$",
+}
+
+# Shell expressions of the number of CPUs of the allocation on the node running the pack script
+_ALLOCATION_CPUS = {
+  "slurm": "${SLURM_CPUS_ON_NODE:-1}",
+  "pbs": "${NCPUS:-1}",
+  "local": "$(nproc 2>/dev/null || echo 1)",
+}
+
+# Scheduler directives of the run scripts, and the ones setting their log files
+_DIRECTIVE_PREFIX = {
+  "slurm": "#SBATCH",
+  "pbs": "#PBS",
+}
+_LOG_DIRECTIVES = {
+  "slurm": ("#SBATCH --output=", "#SBATCH --error="),
+  "pbs": ("#PBS -o ", "#PBS -e "),
+}
+
+# The job id recorded by the run scripts when they start (see `BaseConfig._generate_script`)
+_JOB_ID_RE = re.compile(r"job_id: (\$SLURM_JOB_ID|\$PBS_JOBID|\$\$)")
+
+
+def packed_job_id(allocation_id: Union[str, int], index: int) -> str:
+  return f"{allocation_id}{PACKED_JOB_ID_SEPARATOR}{index}"
+
+
+def get_allocation_id(job_id: Union[str, int]) -> Optional[str]:
+  """Returns the id of the allocation running a packed job, or None if the job was not packed."""
+  allocation_id, separator, _ = str(job_id).partition(PACKED_JOB_ID_SEPARATOR)
+  return allocation_id if separator else None
+
+
+def packed_job_status(job_status: str, allocation_status: Status) -> Optional[Status]:
+  """
+  Returns the status of an unfinished packed job, given the one of its allocation, or None if it
+  keeps the status it recorded itself.
+  """
+  if allocation_status.value in TERMINAL_STATES:
+    # The allocation ended before the job did: it was killed, or never got a worker
+    return Status.FAILED if allocation_status == Status.COMPLETED else allocation_status
+  if allocation_status in (Status.QUEUED, Status.RUNNING) and job_status == Status.SUBMITTING.value:
+    return Status.QUEUED
+  return None
+
+
+def pack_task_script(script: str) -> str:
+  """
+  Adapts a run script to be run by a pack script: the job id recorded in the job metadata becomes
+  the one of the packed job (see `packed_job_id`) instead of the one of the allocation.
+  """
+  return _JOB_ID_RE.sub(f"job_id: ${PACKED_JOB_ID_VARIABLE}", script)
+
+
+def pack_script(
+  scheduler: str,
+  run_script: str,
+  script_paths: Sequence[Path],
+  log_dir: Path,
+  workers: Optional[int] = None,
+) -> str:
+  """
+  Returns the script of an allocation running the given run scripts, at most `workers` at a time
+  (by default, one per CPU of the allocation on the node running the pack script). The logs of run
+  script `i` are written next to it, and it is given the id `<allocation_id>+<i>`.
+
+  All the packed jobs share the same configuration, so the scheduler directives of `run_script`
+  (the content of any of their run scripts) apply to the allocation, except for the log paths,
+  which point to `log_dir`.
+  """
+  directives = []
+  if prefix := _DIRECTIVE_PREFIX.get(scheduler):
+    output, error = _LOG_DIRECTIVES[scheduler]
+    directives = [
+      line for line in run_script.splitlines()
+      if line.startswith(prefix) and not line.startswith((output, error))
+    ]
+    log_dir = Path(log_dir).resolve()
+    directives += [f"{output}{log_dir / 'stdout.log'}", f"{error}{log_dir / 'stderr.log'}"]
+
+  workers_expr = str(workers) if workers else _ALLOCATION_CPUS.get(scheduler, "1")
+  return "\n".join([
+    "#!/bin/bash",
+    *directives,
+    "",
+    "# Packed SbatchMan jobs, run by a pool of workers",
+    f"PACK_ID={_ALLOCATION_ID.get(scheduler, '$$')}",
+    f"WORKERS={workers_expr}",
+    "RUN_SCRIPTS=(",
+    *[f"  {shlex.quote(str(Path(p).resolve()))}" for p in script_paths],
+    ")",
+    "",
+    'for i in "${!RUN_SCRIPTS[@]}"; do',
+    '  while [ "$(jobs -pr | wc -l)" -ge "$WORKERS" ]; do',
+    "    wait -n",
+    "  done",
+    '  RUN_SCRIPT="${RUN_SCRIPTS[$i]}"',
+    '  RUN_DIR="$(dirname "$RUN_SCRIPT")"',
+    f'  {PACKED_JOB_ID_VARIABLE}="${{PACK_ID}}{PACKED_JOB_ID_SEPARATOR}${{i}}" bash "$RUN_SCRIPT" > "$RUN_DIR/stdout.log" 2> "$RUN_DIR/stderr.log" &',
+    "done",
+    "wait",
+  ]) + "\n"
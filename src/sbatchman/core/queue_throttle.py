@@ -0,0 +1,139 @@
+"""
+Throttling of job submissions, to keep at most `max_queued_jobs` jobs queued or running.
+
+Checking the limit used to mean listing the whole scheduler queue before every submission, and
+sleeping a fixed interval whenever it was full. `QueueThrottle` instead keeps a local count of the
+active jobs: it is incremented by every job submitted through the throttle, so the queue only has
+to be listed again when the local count reaches the limit (or gets too old). While the queue is
+full, it is re-listed with an exponential backoff, and jobs are let through as soon as slots free up.
+"""
+import threading
+import time
+from typing import Callable, Optional
+
+from sbatchman.core.jobs_manager import count_active_jobs
+from sbatchman.exceptions import ConfigurationError
+
+MIN_REFRESH_INTERVAL = 1.0 # seconds between queue listings while the queue is full, doubled at every listing...
+MAX_REFRESH_INTERVAL = 30.0 # ...up to this value
+COUNT_TTL = 60.0 # seconds after which the local count is refreshed, even if it is below the limit
+
+class QueueThrottle:
+  """
+  Lets jobs through as long as there are free slots in the queue.
+  Thread safe, so that it can be shared by jobs submitted concurrently.
+  """
+
+  def __init__(self, count_jobs: Optional[Callable[[], int]] = None):
+    """
+    Args:
+      count_jobs: Returns the number of queued or running jobs. Defaults to `count_active_jobs`.
+    """
+    self._count_jobs = count_jobs or count_active_jobs
+    self._cond = threading.Condition()
+    self._active: Optional[int] = None
+    self._refreshed_at = 0.0
+    # Listings run without the lock: slots taken meanwhile are not in the listing, and are added back
+    self._refreshing = False
+    self._taken_while_refreshing = 0
+    # Incremented whenever slots may have freed up, so that waiting threads do not miss it
+    self._version = 0
+
+  def _refresh(self):
+    """Lists the queue with the lock released (it must be held by the caller, and no other listing running)."""
+    self._refreshing = True
+    self._taken_while_refreshing = 0
+    self._cond.release()
+    try:
+      count = self._count_jobs()
+    finally:
+      self._cond.acquire()
+      self._refreshing = False
+    self._active = count + self._taken_while_refreshing
+    self._refreshed_at = time.monotonic()
+    self._version += 1
+    self._cond.notify_all()
+
+  def refresh(self) -> int:
+    """Syncs the local count with the scheduler queue and returns it."""
+    with self._cond:
+      while self._refreshing:
+        self._cond.wait()
+      self._refresh()
+      return self._active
+
+  def acquire(
+    self,
+    max_jobs: int,
+    n: int = 1,
+    max_interval: float = MAX_REFRESH_INTERVAL,
+    on_wait: Optional[Callable[[int, int, float], None]] = None,
+  ):
+    """
+    Waits until there are `n` free slots in the queue and takes them.
+    Args:
+      max_jobs: Maximum number of queued or running jobs.
+      n: Number of slots to take (e.g. the size of a job array).
+      max_interval: Maximum number of seconds between two queue listings while waiting.
+      on_wait: Called before waiting with the number of active jobs, `max_jobs` and the seconds to wait.
+    Raises:
+      ConfigurationError: If `n` is greater than `max_jobs`, i.e. the slots could never be taken.
+    """
+    n = max(1, n)
+    if n > max_jobs:
+      raise ConfigurationError(
+        f"Cannot submit {n} jobs at once with a limit of {max_jobs} queued jobs. "
+        "Submit them in smaller groups, or raise the limit with 'sbatchman set-max-jobs'."
+      )
+    interval = min(MIN_REFRESH_INTERVAL, max_interval)
+    with self._cond:
+      while True:
+        if self._active is not None and time.monotonic() - self._refreshed_at <= COUNT_TTL:
+          if self._active + n <= max_jobs:
+            self._active += n
+            if self._refreshing:
+              self._taken_while_refreshing += n
+            return
+          # The local count only grows between listings, jobs may have left the queue since the last one
+          # (unless another thread has just listed it)
+          must_refresh = time.monotonic() - self._refreshed_at >= MIN_REFRESH_INTERVAL
+        else:
+          must_refresh = True
+
+        if self._refreshing:
+          # Woken up by the listing of another thread
+          self._cond.wait()
+          continue
+        if must_refresh:
+          self._refresh()
+          if self._active + n <= max_jobs:
+            continue
+
+        version = self._version
+        if on_wait is not None:
+          active = self._active
+          self._cond.release()
+          try:
+            on_wait(active, max_jobs, interval)
+          finally:
+            self._cond.acquire()
+        # Woken up early if slots are released by failed submissions or by a listing of another thread
+        if version == self._version:
+          self._cond.wait(interval)
+        interval = min(interval * 2, max_interval)
+
+  def release(self, n: int = 1):
+    """Gives back slots taken by jobs that were not submitted after all."""
+    with self._cond:
+      if self._active is not None:
+        self._active = max(0, self._active - n)
+        if self._refreshing:
+          self._taken_while_refreshing = max(0, self._taken_while_refreshing - n)
+        self._version += 1
+        self._cond.notify_all()
+
+_throttle = QueueThrottle()
+
+def get_queue_throttle() -> QueueThrottle:
+  """Returns the throttle shared by all the submissions of this process."""
+  return _throttle
@@ -1,3 +1,4 @@
+import functools
 import re
 from pathlib import Path
 from copy import deepcopy
@@ -110,6 +111,127 @@ def resolve_map_variable(map_var_dict, key_value):
     return resolved
 
 
+# {var_name} or {map_var[key_var]}, not preceded by $ (shell variables)
+_SUBSTITUTION_PATTERN = re.compile(r'(?<!\$)\{([^\s{}\[\]]+)(?:\[([^\s\[\]]+)\])?\}')
+
+# Values substituted as they are, by `str`
+_PLAIN_TYPES = frozenset((str, int, float, bool))
+
+
+class CompiledTemplate:
+  """
+  A template parsed by `compile_template`: its literal segments, interleaved with the variable
+  references to substitute, as (full match, var_name, key_var_name or None, is plain {var_name}) tuples.
+  """
+  __slots__ = ('template', 'parts', 'used_vars')
+
+  def __init__(self, template: str):
+    self.template = template
+    parts = []
+    used_vars = set()
+    last = 0
+    for match in _SUBSTITUTION_PATTERN.finditer(template):
+      if match.start() > last:
+        parts.append(template[last:match.start()])
+      plain = match.group(2) is None and not match.group(1).endswith("_filename")
+      parts.append((match.group(0), match.group(1), match.group(2), plain))
+      used_vars.add(match.group(1))
+      if match.group(2):
+        used_vars.add(match.group(2))
+      last = match.end()
+    if last < len(template):
+      parts.append(template[last:])
+    self.parts = tuple(parts)
+    self.used_vars = frozenset(used_vars)
+
+  def render(self, variables) -> str:
+    """Substitutes the variables into the template, see `substitute`."""
+    if not self.used_vars:
+      return self.template
+    rendered = []
+    for part in self.parts:
+      if part.__class__ is str:
+        rendered.append(part)
+        continue
+      full_match, var_name, key_var_name, plain = part
+      if plain:
+        value = variables.get(var_name)
+        if value.__class__ in _PLAIN_TYPES:
+          rendered.append(str(value))
+          continue
+      rendered.append(_resolve_reference(full_match, var_name, key_var_name, variables))
+    return ''.join(rendered)
+
+
+@functools.lru_cache(maxsize=4096)
+def compile_template(template: str) -> CompiledTemplate:
+  """Parses a template once: the result is cached, so that rendering it again is just a join."""
+  return CompiledTemplate(template)
+
+
+def _resolve_reference(full_match, var_name, key_var_name, variables):
+  # Handle {map_var[key_var]}
+  if key_var_name:
+    map_value = variables.get(var_name)
+    key_value = variables.get(key_var_name)
+
+    # Unwrap tuples (e.g. from file/dir-based variables) to use as a lookup key
+    if isinstance(key_value, tuple):
+      key_value = key_value[0]
+
+    if isinstance(map_value, dict) and '__map__' in map_value:
+      if key_value is None:
+        # key variable not resolved yet, leave for a later pass
+        return full_match
+      try:
+        resolved = resolve_map_variable(map_value, key_value)
+      except KeyError:
+        return full_match
+
+      if isinstance(resolved, tuple):
+        return str(resolved[0])
+      if isinstance(resolved, list):
+        if len(resolved) == 1:
+          return str(resolved[0])
+        # A map should resolve to a single scalar per job; if this happens,
+        # the YAML's map entry itself needs to be a scalar/1-item list.
+        return full_match
+      if resolved is not None:
+        return str(resolved)
+      return full_match
+
+    elif map_value is not None:
+      # var_name wasn't actually a map — just substitute it directly
+      return str(map_value)
+
+    return full_match
+
+  # Handle {var_name_filename}
+  if var_name.endswith("_filename"):
+    base_name = var_name[:-len("_filename")]
+    value = variables.get(base_name)
+
+    if isinstance(value, tuple) and len(value) > 1:
+      return str(value[1])
+
+  else:
+    # Handle regular {var_name}
+    value = variables.get(var_name)
+
+    if isinstance(value, tuple):
+      return str(value[0])
+
+    elif isinstance(value, dict):
+      # Don't substitute raw dicts directly
+      return full_match
+
+    elif value is not None:
+      return str(value)
+
+  # Leave unresolved variables unchanged
+  return full_match
+
+
 def substitute(template, variables):
   """
   Replace occurrences of:
@@ -126,93 +248,16 @@ def substitute(template, variables):
   """
   if not isinstance(template, str):
     return template
-
-  substitution_pattern = re.compile(
-    r'(?<!\$)\{([^\s{}\[\]]+)(?:\[([^\s\[\]]+)\])?\}'
-  )
-
-  def replacer(match):
-    full_match = match.group(0)
-    var_name = match.group(1)
-    key_var_name = match.group(2)
-
-    # Handle {map_var[key_var]}
-    if key_var_name:
-      map_value = variables.get(var_name)
-      key_value = variables.get(key_var_name)
-
-      # Unwrap tuples (e.g. from file/dir-based variables) to use as a lookup key
-      if isinstance(key_value, tuple):
-        key_value = key_value[0]
-
-      if isinstance(map_value, dict) and '__map__' in map_value:
-        if key_value is None:
-          # key variable not resolved yet, leave for a later pass
-          return full_match
-        try:
-          resolved = resolve_map_variable(map_value, key_value)
-        except KeyError:
-          return full_match
-
-        if isinstance(resolved, tuple):
-          return str(resolved[0])
-        if isinstance(resolved, list):
-          if len(resolved) == 1:
-            return str(resolved[0])
-          # A map should resolve to a single scalar per job; if this happens,
-          # the YAML's map entry itself needs to be a scalar/1-item list.
-          return full_match
-        if resolved is not None:
-          return str(resolved)
-        return full_match
-
-      elif map_value is not None:
-        # var_name wasn't actually a map — just substitute it directly
-        return str(map_value)
-
-      return full_match
-
-    # Handle {var_name_filename}
-    if var_name.endswith("_filename"):
-      base_name = var_name[:-len("_filename")]
-      value = variables.get(base_name)
-
-      if isinstance(value, tuple) and len(value) > 1:
-        return str(value[1])
-
-    else:
-      # Handle regular {var_name}
-      value = variables.get(var_name)
-
-      if isinstance(value, tuple):
-        return str(value[0])
-
-      elif isinstance(value, dict):
-        # Don't substitute raw dicts directly
-        return full_match
-
-      elif value is not None:
-        return str(value)
-
-    # Leave unresolved variables unchanged
-    return full_match
-
-  return substitution_pattern.sub(replacer, template)
+  return compile_template(template).render(variables)
 
 
 def extract_used_vars(*templates):
   """
-  Extract variable names used in {var} format or {map_var[key_var]} format from given templates.
-  Returns a set of variable names that are referenced.
+  Extract variable names used in {var} format or {map_var[key_var]} format from given templates
+  (the ones `substitute` would replace). Returns a set of variable names that are referenced.
   """
   var_names = set()
   for template in templates:
     if isinstance(template, str):
-      # Match both {var_name} and {map_var[key_var]} patterns
-      matches = re.findall(r"{(\w+)(?:\[(\w+)\])?}", template)
-      for match in matches:
-        # match is a tuple like ('var_name', 'key_var') or ('var_name', '')
-        var_names.add(match[0])  # Add the variable/map name
-        if match[1]:  # If there's a key variable
-          var_names.add(match[1])  # Add the key variable
+      var_names |= compile_template(template).used_vars
   return var_names
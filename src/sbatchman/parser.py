@@ -1,14 +1,76 @@
+import collections
+import collections.abc
+import concurrent.futures
+import datetime
+import hashlib
 import importlib.util
+import itertools
+import json
+import multiprocessing
+import os
+import queue
+import shutil
 import sqlite3
 import pandas as pd
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from urllib.parse import quote
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
 
+from sbatchman.core.extract_cache import job_signature
+from sbatchman.core.job import Job
 from sbatchman.core.jobs_manager import jobs_list
 
 
 ParseResult = Optional[Dict[str, Union[Dict[str, Any], List[Dict[str, Any]]]]]
 
+# Tables used to keep track of the parsed jobs, hidden from the users of the database
+INTERNAL_TABLE_PREFIX = "_sbm_"
+
+_BOOKKEEPING_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS {INTERNAL_TABLE_PREFIX}parsed_jobs (
+    archive_name TEXT NOT NULL,
+    exp_dir TEXT NOT NULL,
+    signature TEXT NOT NULL,
+    parser_version TEXT NOT NULL,
+    PRIMARY KEY (archive_name, exp_dir)
+);
+CREATE TABLE IF NOT EXISTS {INTERNAL_TABLE_PREFIX}parsed_rows (
+    archive_name TEXT NOT NULL,
+    exp_dir TEXT NOT NULL,
+    table_name TEXT NOT NULL,
+    first_rowid INTEGER NOT NULL,
+    last_rowid INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS {INTERNAL_TABLE_PREFIX}parsed_rows_job
+    ON {INTERNAL_TABLE_PREFIX}parsed_rows (archive_name, exp_dir);
+"""
+
+# (archive_name, exp_dir)
+JobKey = Tuple[str, str]
+
+# Rows written per transaction, which bounds the rows kept in memory by the writer
+WRITE_BATCH_SIZE = 10000
+
+# Rows sent at once by the processes running parse(), and chunks each job may have in flight
+WORKER_CHUNK_SIZE = 1000
+WORKER_CHUNKS_IN_FLIGHT = 2
+
+# Columns identifying the job a row comes from, indexed in every table that has them (along
+# with the columns named after job variables)
+JOB_COLUMNS = ("job_id", "exp_dir", "archive_name", "cluster_name", "config_name", "tag", "status")
+
+# Indexes created by the parser, dropped when they are not needed anymore
+INDEX_PREFIX = f"{INTERNAL_TABLE_PREFIX}index_"
+
+# Rows sampled per index by ANALYZE, so that its cost does not grow with the database
+ANALYSIS_LIMIT = 1000
+
+# table name -> column name -> declared type
+ColumnTypes = Dict[str, Dict[str, str]]
+
+# table name -> indexes, each a column name or a sequence of column names
+IndexDeclarations = Dict[str, Sequence[Union[str, Sequence[str]]]]
+
 
 def _load_parser_module(parser: Path):
     """Dynamically import the user-supplied parser script as a module."""
@@ -20,22 +82,568 @@ def _load_parser_module(parser: Path):
     return module
 
 
-def _normalize_rows(value: Union[Dict[str, Any], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
-    """Normalize a table's parse() output into a list of row dicts."""
+def _load_parse_function(parser: Path, parser_module=None) -> Callable[[Job], ParseResult]:
+    if parser_module is None:
+        parser_module = _load_parser_module(parser)
+    if not hasattr(parser_module, "parse"):
+        raise AttributeError(f"{parser} must define a `parse(job)` function")
+    return parser_module.parse
+
+
+def _parser_version(parser: Path, parser_module) -> str:
+    """
+    Identifies the version of a parser by its source code and its optional `PARSER_VERSION`
+    attribute, which users can bump when `parse` depends on other files.
+    """
+    h = hashlib.sha1(parser.read_bytes())
+    h.update(repr(getattr(parser_module, "PARSER_VERSION", None)).encode())
+    return h.hexdigest()
+
+
+def _column_types(parser_module) -> ColumnTypes:
+    """The optional `COLUMN_TYPES` of a parser: {table_name: {column_name: sqlite_type}}."""
+    column_types = getattr(parser_module, "COLUMN_TYPES", None) or {}
+    if not isinstance(column_types, dict) or not all(isinstance(columns, dict) for columns in column_types.values()):
+        raise TypeError("COLUMN_TYPES must be a dict of {table_name: {column_name: sqlite_type}}")
+    return {table_name: {column: str(column_type).upper() for column, column_type in columns.items()} for table_name, columns in column_types.items()}
+
+
+def _index_declarations(parser_module) -> Dict[str, List[Tuple[str, ...]]]:
+    """The optional `INDEXES` of a parser: {table_name: [column_name or (column_name, ...), ...]}."""
+    declarations = getattr(parser_module, "INDEXES", None) or {}
+    if not isinstance(declarations, dict):
+        raise TypeError("INDEXES must be a dict of {table_name: [column_name or (column_name, ...), ...]}")
+    indexes = {}
+    for table_name, table_indexes in declarations.items():
+        if isinstance(table_indexes, str):
+            table_indexes = [table_indexes]
+        indexes[table_name] = [(columns,) if isinstance(columns, str) else tuple(columns) for columns in table_indexes]
+    return indexes
+
+
+def _normalize_rows(value: Union[Dict[str, Any], Iterable[Dict[str, Any]]]) -> Iterable[Dict[str, Any]]:
+    """
+    Normalize a table's parse() output into an iterable of row dicts. Besides lists, any
+    iterable (e.g. a generator) of rows is accepted, and only consumed while writing them.
+    """
     if isinstance(value, dict):
         return [value]
-    if isinstance(value, list):
-        return list(value)
+    if isinstance(value, collections.abc.Iterable) and not isinstance(value, (str, bytes)):
+        return value
     raise TypeError(
         f"Expected a dict (single row) or list of dicts (multiple rows), got {type(value)!r}"
     )
 
 
-def parse_jobs_and_generate_sqlite_db(parser: Path, output_path: Path) -> None:
+def _normalize_result(result: ParseResult) -> Dict[str, Iterable[Dict[str, Any]]]:
+    """Normalize a parse() output into a dict of table_name -> iterable of row dicts."""
+    if not result:
+        return {}
+    if not isinstance(result, dict):
+        raise TypeError(
+            f"parse() must return a dict of {{table_name: rows}} or None, got {type(result)!r}"
+        )
+    tables = {}
+    for table_name, rows in result.items():
+        if not is_result_table(table_name):
+            raise ValueError(f"Invalid table name {table_name!r}: names starting with 'sqlite_' or '{INTERNAL_TABLE_PREFIX}' are reserved")
+        tables[table_name] = _normalize_rows(rows)
+    return tables
+
+
+def is_result_table(table_name: str) -> bool:
+    """Returns False for the tables used internally by SQLite and by the parser."""
+    return not table_name.startswith(("sqlite_", INTERNAL_TABLE_PREFIX))
+
+
+def list_result_tables(conn: sqlite3.Connection) -> List[str]:
+    """Returns the names of the tables of a results database, without the internal ones."""
+    rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
+    return [name for (name,) in rows if is_result_table(name)]
+
+
+# ---------------------------------------------------------------------------
+# Parse stage
+# ---------------------------------------------------------------------------
+
+_worker_parse: Optional[Callable[[Job], ParseResult]] = None
+
+
+def _init_parse_worker(parser: Path):
+    global _worker_parse
+    _worker_parse = _load_parse_function(parser)
+
+
+def _run_parse(parse: Callable[[Job], ParseResult], job: Job) -> Tuple[bool, Any]:
+    """Returns (True, normalized rows) or (False, error message)."""
+    try:
+        result: ParseResult = parse(job)
+    except Exception as exc:  # noqa: BLE001
+        return False, str(exc)
+    return True, _normalize_result(result)
+
+
+class _WorkerCancelled(Exception):
+    """Raised in a worker when the main process stops reading the rows of its job."""
+
+
+def _send(channel, cancelled, message: tuple):
+    """Sends a message to the main process, waiting while the channel of the job is full."""
+    while True:
+        try:
+            channel.put(message, timeout=0.1)
+            return
+        except queue.Full:
+            if cancelled.is_set():
+                raise _WorkerCancelled()
+
+
+def _run_parse_in_worker(job: Job, channel, cancelled):
+    """
+    Runs parse() in a worker, sending its rows back to the main process through `channel`, in
+    chunks of `WORKER_CHUNK_SIZE` rows: ("rows", table_name, rows)..., then ("done",), or
+    ("error", message) as soon as parse() or its rows fail.
+    """
+    try:
+        ok, result = _run_parse(_worker_parse, job)
+        if not ok:
+            _send(channel, cancelled, ("error", result))
+            return
+        for table_name, rows in result.items():
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) >= WORKER_CHUNK_SIZE:
+                    _send(channel, cancelled, ("rows", table_name, chunk))
+                    chunk = []
+            if chunk:
+                _send(channel, cancelled, ("rows", table_name, chunk))
+        _send(channel, cancelled, ("done",))
+    except _WorkerCancelled:
+        pass
+    except Exception as exc:  # noqa: BLE001
+        try:
+            _send(channel, cancelled, ("error", str(exc)))
+        except _WorkerCancelled:
+            pass
+
+
+def _receive(channel, future: concurrent.futures.Future) -> Iterable[tuple]:
+    """Yields the messages of a worker for one job, up to ("done",) or ("error", message)."""
+    while True:
+        try:
+            message = channel.get(timeout=0.1)
+        except queue.Empty:
+            if future.done():
+                # The worker sends the last message before returning, unless its process died
+                future.result()
+                raise RuntimeError("The parse worker stopped before sending all the rows")
+            continue
+        yield message
+        if message[0] != "rows":
+            return
+
+
+def _received_tables(messages: Iterable[tuple]) -> Iterable[Tuple[str, Iterable[Dict[str, Any]]]]:
+    """(table_name, rows) pairs of the messages of a job, with rows read as they are consumed."""
+    def _rows():
+        for message in messages:
+            if message[0] == "error":
+                raise _ParseFailed(message[1])
+            if message[0] == "rows":
+                for row in message[2]:
+                    yield message[1], row
+    for table_name, rows in itertools.groupby(_rows(), key=lambda item: item[0]):
+        yield table_name, (row for _, row in rows)
+
+
+def _parse_jobs(
+    parser: Path,
+    parse: Callable[[Job], ParseResult],
+    jobs: List[Job],
+    max_workers: Optional[int],
+) -> Iterable[Tuple[Job, Tuple[bool, Any]]]:
+    """
+    Runs parse() over the given jobs with a pool of processes (each loading `parser` again),
+    yielding, in order, (job, (True, (table_name, rows) pairs)) or (job, (False, error message)).
+    With a single worker (the default), `parse` is run by the calling process.
+
+    Workers send their rows in chunks, and wait while the chunks of a job are not read, so at
+    most a few chunks per job (and a few jobs per worker) are in memory at any time, however
+    many rows the jobs emit. The rows of each job must be read before moving to the next one.
+    """
+    max_workers = min(max_workers or 1, len(jobs))
+    if max_workers <= 1:
+        for job in jobs:
+            ok, result = _run_parse(parse, job)
+            yield job, (ok, result.items() if ok else result)
+        return
+
+    pending: Deque[Tuple[Job, Any, concurrent.futures.Future]] = collections.deque()
+
+    def _next_result():
+        job, channel, future = pending.popleft()
+        messages = iter(_receive(channel, future))
+        first = next(messages)
+        if first[0] == "error":
+            return job, (False, first[1])
+        return job, (True, _received_tables(itertools.chain([first], messages)))
+
+    with multiprocessing.Manager() as manager:
+        cancelled = manager.Event()
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_init_parse_worker,
+            initargs=(parser,),
+        )
+        try:
+            for job in jobs:
+                channel = manager.Queue(maxsize=WORKER_CHUNKS_IN_FLIGHT)
+                pending.append((job, channel, executor.submit(_run_parse_in_worker, job, channel, cancelled)))
+                while len(pending) > 2 * max_workers:
+                    yield _next_result()
+            while pending:
+                yield _next_result()
+        finally:
+            # Stops the workers still sending rows, e.g. if writing them failed
+            cancelled.set()
+            for _, _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+
+# ---------------------------------------------------------------------------
+# Write stage
+# ---------------------------------------------------------------------------
+
+def _quote(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _sqlite_type(value: Any) -> str:
+    """SQLite column type for a Python value, as pandas' `to_sql` would declare it."""
+    if hasattr(value, "item") and not isinstance(value, (str, bytes)):  # numpy scalars
+        value = value.item()
+    if isinstance(value, (bool, int)):
+        return "INTEGER"
+    if isinstance(value, float):
+        return "REAL"
+    if isinstance(value, (datetime.date, datetime.time)):
+        return "TIMESTAMP"
+    if isinstance(value, bytes):
+        return "BLOB"
+    return "TEXT"
+
+
+def _merge_types(declared: Optional[str], value_type: str) -> str:
+    """Declared type of a column holding values of both types: REAL for numbers, none (any value) otherwise."""
+    if declared is None or declared == value_type:
+        return value_type
+    if {declared, value_type} == {"INTEGER", "REAL"}:
+        return "REAL"
+    return ""
+
+
+def _sqlite_value(value: Any) -> Any:
+    if value is None or isinstance(value, (str, int, float, bytes)):
+        return value
+    if value is pd.NaT:
+        return None
+    if hasattr(value, "item"):  # numpy scalars
+        value = value.item()
+        if isinstance(value, (int, float)):
+            return value
+    if isinstance(value, (datetime.date, datetime.time)):
+        return str(value)
+    if isinstance(value, (dict, list, tuple)):
+        return json.dumps(value, default=str)
+    return str(value)
+
+
+class _ParseFailed(Exception):
+    """Raised when the rows returned by parse() fail to be generated while they are written."""
+
+
+class _ResultsDatabase:
+    """
+    The SQLite database written by `parse_jobs_and_generate_sqlite_db`.
+
+    Rows are buffered and inserted in batches of `WRITE_BATCH_SIZE` rows, one transaction per
+    batch, so that the memory used does not depend on the number of rows. Tables are created,
+    and columns added to them, as the rows that need them are written.
+
+    The rows of each job are recorded (as rowid ranges, so the tables keep the columns of the
+    parser only) along with the signature of the job files and the parser version they were
+    parsed with, so that only new or changed jobs need to be parsed again. A job is only
+    recorded as parsed in the batch that writes its last rows: the rows of jobs interrupted
+    halfway are deleted by the next run (see `remove_incomplete_jobs`).
+
+    Columns are declared with the type of their values (or the one given in `column_types`), and
+    `optimize` indexes the columns identifying jobs and the ones given in `indexes`.
+    """
+
+    def __init__(self, path: Path, column_types: Optional[ColumnTypes] = None):
+        # Transactions are handled explicitly (see `begin`), so that DDL statements are part of them
+        self.conn = sqlite3.connect(path, isolation_level=None)
+        # Readers (e.g. the visualize server) are not blocked while the database is written
+        try:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        except sqlite3.OperationalError:  # e.g. file systems without shared memory support
+            pass
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._column_types = column_types or {}
+        self._tables: Dict[str, Dict[str, str]] = {}  # table name -> column name -> declared type
+        self._next_rowids: Dict[str, int] = {}
+        existing = list_result_tables(self.conn)
+        self.has_bookkeeping = self._table_exists(f"{INTERNAL_TABLE_PREFIX}parsed_jobs")
+        self.conn.executescript(_BOOKKEEPING_SCHEMA)
+        for table_name in existing:
+            self._tables[table_name] = {row[1]: row[2] for row in self.conn.execute(f"PRAGMA table_info({_quote(table_name)})")}
+        # Tables written by other tools (or older versions of SbatchMan) are replaced, as they used to be
+        self._replace = set() if self.has_bookkeeping else set(existing)
+
+        # Written by the next `flush`
+        self._pending_rows: Dict[str, List[Tuple[int, Dict[str, Any]]]] = {}  # table name -> (rowid, row)
+        self._pending_count = 0
+        self._pending_ranges: Dict[Tuple[JobKey, str], List[int]] = {}  # (job, table name) -> [first rowid, last rowid]
+        self._pending_jobs: List[Tuple[str, str, str, str]] = []
+        # Rows changed since the database was opened, see `optimize`
+        self._initial_changes = self.conn.total_changes
+
+    def begin(self):
+        self.conn.execute("BEGIN")
+
+    def commit(self):
+        self.conn.execute("COMMIT")
+
+    def _table_exists(self, table_name: str) -> bool:
+        return self.conn.execute("SELECT 1 FROM sqlite_master WHERE type='table' AND name=?", (table_name,)).fetchone() is not None
+
+    def parsed_jobs(self) -> Dict[JobKey, Tuple[str, str]]:
+        """Returns the (signature, parser version) of the jobs whose rows are stored."""
+        rows = self.conn.execute(f"SELECT archive_name, exp_dir, signature, parser_version FROM {INTERNAL_TABLE_PREFIX}parsed_jobs")
+        return {(archive_name, exp_dir): (signature, version) for archive_name, exp_dir, signature, version in rows}
+
+    def clear(self):
+        """Removes all the rows written by previous runs, and the tables they were written to."""
+        tables = {name for (name,) in self.conn.execute(f"SELECT DISTINCT table_name FROM {INTERNAL_TABLE_PREFIX}parsed_rows")}
+        for table_name in tables:
+            self.conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+            self._tables.pop(table_name, None)
+            self._next_rowids.pop(table_name, None)
+        self.conn.execute(f"DELETE FROM {INTERNAL_TABLE_PREFIX}parsed_rows")
+        self.conn.execute(f"DELETE FROM {INTERNAL_TABLE_PREFIX}parsed_jobs")
+        self._replace = set(self._tables)
+
+    def remove_job(self, key: JobKey) -> List[str]:
+        """Deletes the (written) rows of a job. Returns the names of the tables they were deleted from."""
+        ranges = self.conn.execute(
+            f"SELECT table_name, first_rowid, last_rowid FROM {INTERNAL_TABLE_PREFIX}parsed_rows WHERE archive_name=? AND exp_dir=?",
+            key,
+        ).fetchall()
+        for table_name, first_rowid, last_rowid in ranges:
+            if table_name in self._tables:
+                self.conn.execute(f"DELETE FROM {_quote(table_name)} WHERE rowid BETWEEN ? AND ?", (first_rowid, last_rowid))
+        self.conn.execute(f"DELETE FROM {INTERNAL_TABLE_PREFIX}parsed_rows WHERE archive_name=? AND exp_dir=?", key)
+        self.conn.execute(f"DELETE FROM {INTERNAL_TABLE_PREFIX}parsed_jobs WHERE archive_name=? AND exp_dir=?", key)
+        return [table_name for table_name, _, _ in ranges]
+
+    def remove_incomplete_jobs(self) -> List[str]:
+        """Deletes the rows of the jobs that were not completely written by a previous run."""
+        keys = self.conn.execute(
+            f"SELECT archive_name, exp_dir FROM {INTERNAL_TABLE_PREFIX}parsed_rows "
+            f"EXCEPT SELECT archive_name, exp_dir FROM {INTERNAL_TABLE_PREFIX}parsed_jobs"
+        ).fetchall()
+        tables = []
+        for key in keys:
+            tables += self.remove_job(key)
+        return tables
+
+    def _next_rowid(self, table_name: str) -> int:
+        rowid = self._next_rowids.get(table_name)
+        if rowid is None:
+            rowid = 1
+            if table_name in self._tables and table_name not in self._replace:
+                rowid = self.conn.execute(f"SELECT COALESCE(MAX(rowid), 0) + 1 FROM {_quote(table_name)}").fetchone()[0]
+        self._next_rowids[table_name] = rowid + 1
+        return rowid
+
+    def add_rows(self, key: JobKey, table_name: str, rows: Iterable[Dict[str, Any]]):
+        """
+        Adds rows of a job to the next batch, writing the batch whenever it is full.
+        Raises _ParseFailed if `rows` fails to be iterated.
+        """
+        iterator = iter(rows)
+        while True:
+            try:
+                row = next(iterator)
+            except StopIteration:
+                break
+            except Exception as exc:  # noqa: BLE001
+                raise _ParseFailed(str(exc)) from exc
+            if not isinstance(row, dict):
+                raise TypeError(f"Rows must be dicts of {{column_name: value}}, got {type(row)!r}")
+
+            rowid = self._next_rowid(table_name)
+            self._pending_rows.setdefault(table_name, []).append((rowid, row))
+            # The rows of a table get consecutive rowids, and are added one job at a time
+            self._pending_ranges.setdefault((key, table_name), [rowid, rowid])[1] = rowid
+            self._pending_count += 1
+            if self._pending_count >= WRITE_BATCH_SIZE:
+                self.flush()
+
+    def finish_job(self, key: JobKey, signature: str, parser_version: str):
+        """Records a job as parsed, once all its rows were added."""
+        self._pending_jobs.append((*key, signature, parser_version))
+
+    def discard_job(self, key: JobKey):
+        """Deletes the rows added for a job that failed to be parsed, whether they were written or not."""
+        discarded = {table_name: rowid_range for (job_key, table_name), rowid_range in self._pending_ranges.items() if job_key == key}
+        for table_name, (first_rowid, last_rowid) in discarded.items():
+            del self._pending_ranges[(key, table_name)]
+            rows = self._pending_rows[table_name]
+            self._pending_rows[table_name] = [(rowid, row) for rowid, row in rows if not first_rowid <= rowid <= last_rowid]
+            self._pending_count -= len(rows) - len(self._pending_rows[table_name])
+        self.remove_job(key)
+
+    def _ensure_columns(self, table_name: str, rows: List[Tuple[int, Dict[str, Any]]]) -> List[str]:
+        """
+        Creates the table, or adds the columns it misses. Returns the columns of the rows.
+        New columns are declared with the type of their values in `rows`, with no type (i.e. they
+        store values as they are) if they hold values of different kinds or only NULLs.
+        """
+        if table_name in self._replace:
+            self.conn.execute(f"DROP TABLE IF EXISTS {_quote(table_name)}")
+            self._replace.discard(table_name)
+            self._tables.pop(table_name, None)
+        table_columns = self._tables.get(table_name, {})
+        declared_types = self._column_types.get(table_name, {})
+
+        columns: Dict[str, Optional[str]] = {}
+        for _, row in rows:
+            for column, value in row.items():
+                if value is None or column in table_columns or column in declared_types:
+                    columns.setdefault(column, None)
+                else:
+                    columns[column] = _merge_types(columns.get(column), _sqlite_type(value))
+        new_columns = {
+            column: declared_types.get(column, column_type or "")
+            for column, column_type in columns.items() if column not in table_columns
+        }
+
+        if table_name not in self._tables:
+            definitions = ", ".join(f"{_quote(column)} {column_type}".rstrip() for column, column_type in new_columns.items())
+            self.conn.execute(f"CREATE TABLE {_quote(table_name)} ({definitions})")
+            self._tables[table_name] = new_columns
+        else:
+            for column, column_type in new_columns.items():
+                self.conn.execute(f"ALTER TABLE {_quote(table_name)} ADD COLUMN {_quote(column)} {column_type}".rstrip())
+                table_columns[column] = column_type
+        return list(columns)
+
+    def flush(self):
+        """Writes the pending rows and jobs, and commits them."""
+        for table_name, rows in self._pending_rows.items():
+            if not rows:
+                continue
+            columns = self._ensure_columns(table_name, rows)
+            self.conn.executemany(
+                f"INSERT INTO {_quote(table_name)} (rowid, {', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * (len(columns) + 1))})",
+                ([rowid, *(_sqlite_value(row.get(column)) for column in columns)] for rowid, row in rows),
+            )
+        self.conn.executemany(
+            f"INSERT INTO {INTERNAL_TABLE_PREFIX}parsed_rows VALUES (?, ?, ?, ?, ?)",
+            ((*key, table_name, first_rowid, last_rowid) for (key, table_name), (first_rowid, last_rowid) in self._pending_ranges.items()),
+        )
+        self.conn.executemany(f"INSERT OR REPLACE INTO {INTERNAL_TABLE_PREFIX}parsed_jobs VALUES (?, ?, ?, ?)", self._pending_jobs)
+        self._pending_rows.clear()
+        self._pending_count = 0
+        self._pending_ranges.clear()
+        self._pending_jobs.clear()
+        self.commit()
+        self.begin()
+
+    def drop_empty_tables(self, table_names: Iterable[str]):
+        for table_name in set(table_names):
+            if table_name in self._tables and self.conn.execute(f"SELECT 1 FROM {_quote(table_name)} LIMIT 1").fetchone() is None:
+                self.conn.execute(f"DROP TABLE {_quote(table_name)}")
+                del self._tables[table_name]
+                self._next_rowids.pop(table_name, None)
+
+    def _create_indexes(self, indexes: Dict[str, List[Tuple[str, ...]]]) -> bool:
+        """Creates the given indexes, and drops the ones created before that are not given. Returns True if any was created."""
+        wanted = {}
+        for table_name, table_indexes in indexes.items():
+            for columns in table_indexes:
+                index_name = f"{INDEX_PREFIX}{table_name}__{'__'.join(columns)}"
+                wanted[index_name] = (table_name, columns)
+        existing = {
+            name for (name,) in self.conn.execute(
+                "SELECT name FROM sqlite_master WHERE type='index' AND substr(name, 1, ?) = ?",
+                (len(INDEX_PREFIX), INDEX_PREFIX),
+            )
+        }
+        for index_name in existing - set(wanted):
+            self.conn.execute(f"DROP INDEX {_quote(index_name)}")
+        for index_name in set(wanted) - existing:
+            table_name, columns = wanted[index_name]
+            self.conn.execute(f"CREATE INDEX {_quote(index_name)} ON {_quote(table_name)} ({', '.join(map(_quote, columns))})")
+        return bool(set(wanted) - existing)
+
+    def optimize(self, indexes: Dict[str, List[Tuple[str, ...]]], variable_names: Iterable[str] = ()):
+        """
+        Indexes the columns identifying jobs (`JOB_COLUMNS` and the ones named after job variables) of
+        every table, and the columns of `indexes` ({table name: [(column name, ...), ...]}), then
+        updates the statistics used by the query planner if the database changed.
+        """
+        job_columns = list(JOB_COLUMNS) + sorted(set(variable_names) - set(JOB_COLUMNS))
+        wanted: Dict[str, List[Tuple[str, ...]]] = {}
+        for table_name, table_columns in self._tables.items():
+            table_indexes = wanted.setdefault(table_name, [])
+            table_indexes += [(column,) for column in job_columns if column in table_columns]
+            for columns in indexes.get(table_name, []):
+                missing = [column for column in columns if column not in table_columns]
+                if missing:
+                    print(f"[parse_jobs_and_generate_sqlite_db] Cannot index {table_name}({', '.join(columns)}): no column {', '.join(missing)}")
+                elif columns not in table_indexes:
+                    table_indexes.append(columns)
+
+        created = self._create_indexes(wanted)
+        if created or self.conn.total_changes != self._initial_changes:
+            self.conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT}")
+            self.conn.execute("ANALYZE")
+
+    def close(self):
+        self.conn.close()
+
+
+def parse_jobs_and_generate_sqlite_db(
+    parser: Path,
+    output_path: Path,
+    incremental: bool = True,
+    max_workers: Optional[int] = None,
+) -> None:
     """
     Run the user-defined parse(job) function (found in `parser`) over every job
-    returned by jobs_list(), and write the accumulated results to a SQLite
-    database at `output_path`.
+    returned by jobs_list(), and write the results to a SQLite database at
+    `output_path`.
+
+    The database records which jobs were parsed, with the signature of their
+    metadata and logs and the version of the parser (its source code and its
+    optional `PARSER_VERSION` attribute). With `incremental=True` (default),
+    only the jobs that are new, or whose logs or parser changed, are parsed
+    again: their rows are replaced, and the rows of the jobs that are no
+    longer listed are deleted. If `max_workers` is greater than 1, `parse`
+    is run by a pool of that many processes, so it must not rely on state
+    shared between calls. By default, jobs are parsed one at a time by the
+    calling process.
+
+    Rows are written in batches of `WRITE_BATCH_SIZE` rows, so the memory
+    used does not depend on the size of the output. Tables and columns are
+    created as the rows that need them are written, and columns are declared
+    with the type of their values. The columns identifying jobs
+    (`JOB_COLUMNS`, and the ones named after job variables) are indexed in
+    every table, and the statistics of the query planner are updated.
 
     Parser API contract
     --------------------
@@ -48,13 +656,23 @@ def parse_jobs_and_generate_sqlite_db(parser: Path, output_path: Path) -> None:
       - None / {} if the job produced no rows, or
       - a dict mapping table_name -> row(s), where each value is either
           - a single row: a dict of {column_name: value}, or
-          - multiple rows: a list of such dicts.
+          - multiple rows: a list (or any iterable, e.g. a generator) of
+            such dicts. Generators are consumed while their rows are written
+            (in chunks, with `max_workers` > 1), so a job can emit more rows
+            than fit in memory.
 
     This lets the user:
       - choose table names freely (dict keys)
       - emit any number of rows per job (list values)
       - emit rows into multiple tables from one job (multiple dict keys)
 
+    The parser script may also define:
+
+        # Columns to index, besides the job-identifying ones (tuples for multi-column indexes)
+        INDEXES = {"runs": ["size", ("size", "threads")]}
+        # Declared types of columns, instead of the ones of their values
+        COLUMN_TYPES = {"runs": {"size": "INTEGER"}}
+
     Example
     -------
         def parse(job: sbm.Job) -> dict:
@@ -63,48 +681,266 @@ def parse_jobs_and_generate_sqlite_db(parser: Path, output_path: Path) -> None:
                 "job_tags": [{"job_id": job.id, "tag": t} for t in job.tags],
             }
     """
-    parser = Path(parser)
+    parser = Path(parser).resolve()
     output_path = Path(output_path)
 
     parser_module = _load_parser_module(parser)
-    if not hasattr(parser_module, "parse"):
-        raise AttributeError(f"{parser} must define a `parse(job)` function")
-    user_parse = parser_module.parse
+    parse = _load_parse_function(parser, parser_module)
+    parser_version = _parser_version(parser, parser_module)
+    indexes = _index_declarations(parser_module)
 
-    # Accumulate rows per table across all jobs before touching the DB.
-    tables: Dict[str, List[Dict[str, Any]]] = {}
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    db = _ResultsDatabase(output_path, _column_types(parser_module))
+    try:
+        db.begin()
+        if not incremental:
+            db.clear()
+        touched_tables = db.remove_incomplete_jobs()
+        parsed = db.parsed_jobs()
+        if any(version != parser_version for _, version in parsed.values()):
+            # All jobs are parsed again: the tables are rebuilt, with the columns (and types) of the new parser
+            db.clear()
+            parsed = {}
+
+        jobs_to_parse: List[Tuple[JobKey, str, Job]] = []
+        listed = set()
+        variable_names: Set[str] = set()
+        for job in jobs_list():
+            key = (job.archive_name or "", str(job.exp_dir))
+            listed.add(key)
+            variable_names.update(job.variables or {})
+            signature = job_signature(job)
+            if parsed.get(key) != (signature, parser_version):
+                jobs_to_parse.append((key, signature, job))
+
+        # Jobs that are not listed anymore (e.g. deleted or archived), or changed
+        for key in parsed:
+            if key not in listed:
+                touched_tables += db.remove_job(key)
+        for key, _, _ in jobs_to_parse:
+            if key in parsed:
+                touched_tables += db.remove_job(key)
+
+        jobs = [job for _, _, job in jobs_to_parse]
+        for (key, signature, _), (job, (ok, result)) in zip(jobs_to_parse, _parse_jobs(parser, parse, jobs, max_workers)):
+            try:
+                if not ok:
+                    raise _ParseFailed(result)
+                for table_name, rows in result:
+                    db.add_rows(key, table_name, rows)
+            except _ParseFailed as exc:
+                # Not recorded, so that it is parsed again next time
+                print(f"[parse_jobs_and_generate_sqlite_db] parse() failed for job {job!r}: {exc}")
+                db.discard_job(key)
+                continue
+            db.finish_job(key, signature, parser_version)
 
-    for job in jobs_list():
-        try:
-            result: ParseResult = user_parse(job)
-        except Exception as exc:  # noqa: BLE001
-            print(f"[parse_jobs_and_generate_sqlite_db] parse() failed for job {job!r}: {exc}")
-            continue
+        db.flush()
+        db.drop_empty_tables(touched_tables)
+        db.optimize(indexes, variable_names)
+        db.commit()
+    finally:
+        db.close()
 
-        if not result:
-            continue
 
-        if not isinstance(result, dict):
-            raise TypeError(
-                f"parse() must return a dict of {{table_name: rows}} or None, got {type(result)!r}"
-            )
+# ---------------------------------------------------------------------------
+# Parquet export
+# ---------------------------------------------------------------------------
 
-        for table_name, rows in result.items():
-            tables.setdefault(table_name, []).extend(_normalize_rows(rows))
+# Columns the Parquet datasets are partitioned by
+PARQUET_PARTITION_COLUMNS = ("cluster_name", "config_name", "tag")
 
-    # Build a DataFrame per table, then write everything to SQLite.
-    output_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(output_path)
+# Written last by every export: lists the partitions and the jobs they were written from
+PARQUET_MANIFEST = f"{INTERNAL_TABLE_PREFIX}manifest.json"
+
+
+def is_parquet_dataset(path: Union[str, Path]) -> bool:
+    return (Path(path) / PARQUET_MANIFEST).is_file()
+
+
+def _job_partition(exp_dir: str) -> Tuple[str, str, str]:
+    """(cluster_name, config_name, tag) of a job, from its `<cluster>/<config>/<tag>/<timestamp>` directory."""
+    parts = Path(exp_dir).parts
+    return parts[0], parts[1], "/".join(parts[2:-1])
+
+
+def _partition_path(partition: Tuple[str, ...]) -> str:
+    return "/".join(f"{column}={quote(value, safe='')}" for column, value in zip(PARQUET_PARTITION_COLUMNS, partition))
+
+
+class _TypeChanged(Exception):
+    """Raised when a column holds values that do not fit the Arrow type chosen for it."""
+
+
+def _arrow_type(sqlite_type: str):
+    import pyarrow as pa
+    return {"INTEGER": pa.int64(), "REAL": pa.float64(), "BLOB": pa.binary()}.get(sqlite_type, pa.string())
+
+
+def _arrow_array(values: List[Any], arrow_type):
+    import pyarrow as pa
+    if pa.types.is_string(arrow_type):
+        return pa.array([None if v is None else v if isinstance(v, str) else str(v) for v in values], arrow_type)
+    if pa.types.is_int64(arrow_type):
+        # pyarrow silently truncates floats converted to integers
+        if not all(v is None or isinstance(v, int) for v in values):
+            raise _TypeChanged
+    elif pa.types.is_float64(arrow_type):
+        if not all(v is None or isinstance(v, (int, float)) for v in values):
+            raise _TypeChanged
+    elif not all(v is None or isinstance(v, bytes) for v in values):
+        raise _TypeChanged
+    return pa.array(values, arrow_type)
+
+
+class _PartitionWriter:
+    """
+    Writes the rows of one table for one partition to Parquet files. Columns are typed after their
+    declared SQLite type; a column holding values that do not fit it (e.g. REAL values in an INTEGER
+    column) is widened (INTEGER, then REAL, then TEXT), and the next rows go to a new file.
+    Rows are written in row groups of `WRITE_BATCH_SIZE` rows.
+    """
+
+    def __init__(self, directory: Path, columns: Dict[str, str], partition_values: Dict[str, str]):
+        self.directory = directory
+        self.columns = list(columns)
+        self.types = {column: _arrow_type(column_type) for column, column_type in columns.items()}
+        self.partition_values = partition_values
+        self._writer = None
+        self._files = 0
+        self._rows: List[tuple] = []
+
+    def write(self, rows: List[tuple]):
+        self._rows.extend(rows)
+        if len(self._rows) >= WRITE_BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        rows, self._rows = self._rows, []
+        if not rows:
+            return
+        while True:
+            arrays, names = [], []
+            try:
+                for i, column in enumerate(self.columns):
+                    arrays.append(_arrow_array([row[i] for row in rows], self.types[column]))
+                    names.append(column)
+                break
+            except _TypeChanged:
+                self.types[column] = pa.float64() if pa.types.is_int64(self.types[column]) else pa.string()
+                self._close_file()
+        for column, value in self.partition_values.items():
+            arrays.append(pa.array([value] * len(rows), pa.string()))
+            names.append(column)
+        table = pa.Table.from_arrays(arrays, names=names)
+        if self._writer is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._writer = pq.ParquetWriter(self.directory / f"part-{self._files}.parquet", table.schema)
+            self._files += 1
+        self._writer.write_table(table)
+
+    def close(self):
+        self._flush()
+        self._close_file()
+
+    def _close_file(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def export_parquet_dataset(db_path: Path, output_dir: Path) -> None:
+    """
+    Exports the results database written by `parse_jobs_and_generate_sqlite_db` to a directory of
+    Parquet files (requires `pyarrow`), which columnar engines such as DuckDB query much faster than
+    SQLite for aggregations over wide tables, and which is much smaller on disk.
+
+    Every table is written to `<output_dir>/<table>/`, partitioned by the cluster, configuration and
+    tag of the jobs the rows come from, as `cluster_name=<...>/config_name=<...>/tag=<...>/` directories.
+    These values are also stored as columns, unless the table already has columns of the same name:
+    read the files with hive partitioning disabled, e.g. in DuckDB:
+
+        SELECT * FROM read_parquet('<output_dir>/<table>/**/*.parquet', union_by_name=true, hive_partitioning=false)
+
+    Only the partitions whose jobs were parsed again, added or removed since the previous export are
+    written again. The database remains the source the rows are exported from (and where the parser
+    keeps track of the parsed jobs).
+    """
     try:
-        for table_name, rows in tables.items():
-            if not rows:
+        import pyarrow  # noqa: F401
+    except ImportError as e:
+        raise ImportError("Exporting the results to Parquet requires pyarrow (`pip install pyarrow`)") from e
+
+    output_dir = Path(output_dir)
+    manifest_path = output_dir / PARQUET_MANIFEST
+    try:
+        previous = json.loads(manifest_path.read_text())["partitions"]
+    except (OSError, ValueError, KeyError):
+        previous = {}
+
+    conn = sqlite3.connect(db_path)
+    try:
+        table_columns = {
+            table_name: {row[1]: (row[2] or "").upper() for row in conn.execute(f"PRAGMA table_info({_quote(table_name)})")}
+            for table_name in list_result_tables(conn)
+        }
+        jobs: Dict[str, List[Tuple[str, str, str, str]]] = collections.defaultdict(list)
+        for archive_name, exp_dir, signature, version in conn.execute(
+            f"SELECT archive_name, exp_dir, signature, parser_version FROM {INTERNAL_TABLE_PREFIX}parsed_jobs ORDER BY archive_name, exp_dir"
+        ):
+            partition = _job_partition(exp_dir)
+            jobs[json.dumps(partition)].append((archive_name, exp_dir, signature, version))
+        partitions = {
+            key: hashlib.sha1(json.dumps([partition_jobs, sorted(table_columns.items())]).encode()).hexdigest()
+            for key, partition_jobs in jobs.items()
+        }
+
+        # Partitions that changed or do not exist anymore, and tables that do not exist anymore
+        for key in set(previous) | set(partitions):
+            if previous.get(key) != partitions.get(key):
+                for table_dir in output_dir.glob(f"*/{_partition_path(tuple(json.loads(key)))}"):
+                    shutil.rmtree(table_dir)
+        if output_dir.is_dir():
+            for table_dir in output_dir.iterdir():
+                if table_dir.is_dir() and table_dir.name not in table_columns:
+                    shutil.rmtree(table_dir)
+
+        for key, partition_hash in partitions.items():
+            if previous.get(key) == partition_hash:
                 continue
-            df = pd.DataFrame(rows)
-            df.to_sql(table_name, conn, index=False, if_exists="replace")
-        conn.commit()
+            partition = tuple(json.loads(key))
+            for table_name, columns in table_columns.items():
+                partition_values = {
+                    column: value for column, value in zip(PARQUET_PARTITION_COLUMNS, partition) if column not in columns
+                }
+                writer = _PartitionWriter(output_dir / table_name / _partition_path(partition), columns, partition_values)
+                select = f"SELECT {', '.join(map(_quote, columns))} FROM {_quote(table_name)} WHERE rowid BETWEEN ? AND ?"
+                try:
+                    for archive_name, exp_dir, _, _ in jobs[key]:
+                        ranges = conn.execute(
+                            f"SELECT first_rowid, last_rowid FROM {INTERNAL_TABLE_PREFIX}parsed_rows "
+                            "WHERE archive_name=? AND exp_dir=? AND table_name=?",
+                            (archive_name, exp_dir, table_name),
+                        ).fetchall()
+                        for first_rowid, last_rowid in ranges:
+                            cur = conn.execute(select, (first_rowid, last_rowid))
+                            while rows := cur.fetchmany(WRITE_BATCH_SIZE):
+                                writer.write(rows)
+                finally:
+                    writer.close()
     finally:
         conn.close()
 
+    if partitions == previous and manifest_path.exists():
+        return  # Unchanged: readers keep their caches
+    output_dir.mkdir(parents=True, exist_ok=True)
+    tmp_path = manifest_path.with_name(f".{manifest_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps({"partition_columns": PARQUET_PARTITION_COLUMNS, "partitions": partitions}))
+    os.replace(tmp_path, manifest_path)
+
 
 def print_sqlite_db(db_path: Path, verbose: bool = False, sample_rows: int = 5) -> None:
     """
@@ -129,8 +965,7 @@ def print_sqlite_db(db_path: Path, verbose: bool = False, sample_rows: int = 5)
     conn = sqlite3.connect(db_path)
     try:
         cursor = conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-        table_names = [row[0] for row in cursor.fetchall()]
+        table_names = list_result_tables(conn)
 
         if not table_names:
             print(f"No tables found in {db_path}")
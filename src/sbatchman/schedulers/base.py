@@ -1,13 +1,44 @@
 from abc import ABC, abstractmethod
+import os
 from pathlib import Path
-from dataclasses import asdict, dataclass
-from typing import List, Optional, Union
+from dataclasses import FrozenInstanceError, asdict, dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Union
 
 import yaml
+try:
+  from yaml import CSafeDumper as SafeDumper, CSafeLoader as SafeLoader
+except ImportError:
+  from yaml import SafeDumper, SafeLoader
 
 from sbatchman.core.status import Status
 from sbatchman.exceptions import ConfigurationError, SchedulerMismatchError
-from sbatchman.config.project_config import get_project_config_dir, get_project_configs_file_path
+from sbatchman.config.project_config import clear_configs_cache, get_config_template_path, get_project_configs_file_path
+
+# Maximum number of job ids passed to a single scheduler status command, to stay
+# well below the shell command-line length limit.
+STATUS_QUERY_BATCH_SIZE = 500
+
+def chunked(items: Sequence, size: int) -> Iterator[Sequence]:
+  """Yields consecutive slices of `items` with at most `size` elements each."""
+  for i in range(0, len(items), size):
+    yield items[i:i + size]
+
+def _read_main_config() -> dict:
+  try:
+    with open(get_project_configs_file_path(), 'r') as f:
+      return yaml.load(f, Loader=SafeLoader) or {}
+  except FileNotFoundError:
+    return {}
+
+def _write_main_config(data: dict):
+  """Replaces the central configurations.yaml file atomically, so that readers never see it half written."""
+  config_path = get_project_configs_file_path()
+  tmp_path = config_path.with_name(f".{config_path.name}.{os.getpid()}.tmp")
+  with open(tmp_path, 'w') as f:
+    yaml.dump(data, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
+  os.replace(tmp_path, config_path)
+  # The file may be rewritten within the mtime resolution, with the same size
+  clear_configs_cache()
 
 @dataclass
 class BaseConfig(ABC):
@@ -25,17 +56,27 @@ class BaseConfig(ABC):
   def __post_init__(self):
     self.template_path = self._get_config_template_path()
 
-  def _generate_jobid_update_line(self) -> str:
-    """Returns the shell command to update job_id in metadata.yaml for this scheduler."""
+  def __setattr__(self, name, value):
+    if getattr(self, '_frozen', False):
+      raise FrozenInstanceError(f"Cannot assign to field '{name}': this configuration is shared and read-only.")
+    super().__setattr__(name, value)
+
+  def freeze(self) -> 'BaseConfig':
+    """Makes the config read-only, so that it can be shared (see `config_manager.get_config`). Returns the config itself."""
+    object.__setattr__(self, '_frozen', True)
+    return self
+
+  def _generate_jobid_variable(self) -> Optional[str]:
+    """Returns the shell expression of the job id for this scheduler, or None if unknown."""
     scheduler = self.get_scheduler_name()
     if scheduler == "slurm":
-      return 'perl -i -pe"s/job_id: [0-9]*/job_id: $SLURM_JOB_ID/" "{EXP_DIR}/metadata.yaml"'
+      return '$SLURM_JOB_ID'
     elif scheduler == "pbs":
-      return 'perl -i -pe"s/job_id: [0-9]*/job_id: $PBS_JOBID/" "{EXP_DIR}/metadata.yaml"'
+      return '$PBS_JOBID'
     elif scheduler == "local":
-      return 'perl -i -pe"s/job_id: [0-9]*/job_id: $$/" "{EXP_DIR}/metadata.yaml"'
+      return '$$'
     else:
-      return "# No job_id update for unknown scheduler"
+      return None
 
 
   def _generate_script(self) -> str:
@@ -52,10 +93,10 @@ class BaseConfig(ABC):
     
     modules = []
     if self.modules:
-      self.modules = [m for m in self.modules if len(m) > 0]
-      if len(self.modules) > 0:
+      module_names = [m for m in self.modules if len(m) > 0]
+      if len(module_names) > 0:
         modules.append('\n# Load System Modules')
-        modules.append(f'module load {" ".join(self.modules)}')
+        modules.append(f'module load {" ".join(module_names)}')
 
     global_sbm_env = [
       '\n# Global SbatchMan env variables',
@@ -63,7 +104,29 @@ class BaseConfig(ABC):
       'export SBATCHMAN_WD={CWD}\n',
     ]
 
-    start_timestamp = ['echo "start_timestamp: \'$(date +%Y%m%d_%H%M%S.%N)\'" >> "{EXP_DIR}/metadata.yaml"\n']
+    # Job events are appended to state.log, which SbatchMan merges into metadata.yaml (see core/job_state.py).
+    # Usage: sbm_state <timestamp field> ["<field>: <value>"...]
+    state_setup = [
+      '\n# Record job events in the SbatchMan metadata',
+      'sbm_state() {',
+      '  local field="$1" ts="${EPOCHREALTIME/,/.}"',
+      '  shift',
+      '  if [ -n "$ts" ]; then',
+      '    printf -v ts \'%(%Y%m%d_%H%M%S)T.%s\' "${ts%.*}" "${ts#*.}"',
+      '  else',
+      '    ts="$(date +%Y%m%d_%H%M%S.%N)"',
+      '  fi',
+      '  printf \'%s\\n\' "$@" "$field: \'$ts\'" >> "{EXP_DIR}/state.log"',
+      '}',
+    ]
+
+    start_fields = '"status: RUNNING"'
+    if jobid_variable := self._generate_jobid_variable():
+      start_fields += f' "job_id: {jobid_variable}"'
+    start_state = [
+      '\n# Update job_id, status and start timestamp',
+      f'sbm_state start_timestamp {start_fields}',
+    ]
 
     # Get scheduler-specific lines from the subclass implementation.
     scheduler_directives = self._generate_scheduler_directives()
@@ -72,12 +135,6 @@ class BaseConfig(ABC):
     working_dir_setup = [
       "\n# Change to the submission directory",
       'cd "{CWD}"',
-      "\n# Update job_id in metadata.yaml",
-      self._generate_jobid_update_line(),
-      "\n# Update status to RUNNING",
-      #'if [ -f "{EXP_DIR}/metadata.yaml" ]; then',
-      'perl -i -pe\'s/status: .*/status: RUNNING/\' {EXP_DIR}/metadata.yaml',
-      #'fi',
     ]
 
     # Set environment variables
@@ -121,17 +178,12 @@ class BaseConfig(ABC):
       'fi',
 
       "\n# Update metadata",
-      # 'if [ -f "{EXP_DIR}/metadata.yaml" ]; then',
-      'perl -i -pe"s/status: .*/status: $STATUS/" {EXP_DIR}/metadata.yaml',
-      'perl -i -pe"s/exitcode: .*/exitcode: $EXIT_CODE/" {EXP_DIR}/metadata.yaml',
-      # 'fi',
-
-      '\necho "end_timestamp: \'$(date +%Y%m%d_%H%M%S.%N)\'" >> "{EXP_DIR}/metadata.yaml"\n',
+      'sbm_state end_timestamp "status: $STATUS" "exitcode: $EXIT_CODE"',
 
       '\nexit $EXIT_CODE',
     ]
 
-    all_lines = header + scheduler_directives + modules + global_sbm_env + start_timestamp + working_dir_setup + env_vars + footer
+    all_lines = header + scheduler_directives + modules + global_sbm_env + state_setup + start_state + working_dir_setup + env_vars + footer
     return "\n".join(all_lines)
 
   @abstractmethod
@@ -151,16 +203,8 @@ class BaseConfig(ABC):
     """
     pass
 
-  def _update_main_config(self, overwrite: bool = False):
-    """Reads, updates, and writes to the central configurations.yaml file."""
-    config_path = get_project_configs_file_path()
-
-    try:
-      with open(config_path, 'r') as f:
-        data = yaml.safe_load(f) or {}
-    except FileNotFoundError:
-      data = {}
-
+  def _merge_into_main_config(self, data: dict, overwrite: bool = False):
+    """Adds this configuration to `data`, the parsed content of the central configurations.yaml file."""
     scheduler_name = self.get_scheduler_name()
     
     # NOW YOU CAN HAVE SCHEDULER OVERRIDES INSIDE CONFIGS (usually for compilation jobs)
@@ -187,13 +231,16 @@ class BaseConfig(ABC):
     clean_config_params['scheduler'] = scheduler_name
     data[self.cluster_name]['configs'][self.name] = clean_config_params
 
-    with open(config_path, 'w') as f:
-      yaml.dump(data, f, default_flow_style=False, sort_keys=False)
+  def _update_main_config(self, overwrite: bool = False):
+    """Reads, updates, and writes to the central configurations.yaml file."""
+    data = _read_main_config()
+    self._merge_into_main_config(data, overwrite)
+    _write_main_config(data)
 
   def _get_config_template_path(self) -> Path:
-    config_dir = get_project_config_dir() / self.cluster_name
-    config_dir.mkdir(parents=True, exist_ok=True)
-    return config_dir / f"{self.name}.sh"
+    template_path = get_config_template_path(self.cluster_name, self.name)
+    template_path.parent.mkdir(parents=True, exist_ok=True)
+    return template_path
 
   def _write_script(self) -> Path:
     """Saves the configuration script to a file inside a scheduler-specific folder."""
@@ -204,6 +251,7 @@ class BaseConfig(ABC):
 
     with open(self.template_path, "w") as f:
       f.write(script_content)
+    clear_configs_cache()
     return self.template_path
   
   def save_config(self, overwrite: bool = False) -> Path:
@@ -215,6 +263,25 @@ class BaseConfig(ABC):
     """
     self._update_main_config(overwrite)
     return self._write_script()
+
+  @staticmethod
+  def save_configs(configs: Sequence['BaseConfig'], overwrite: bool = False) -> List[Path]:
+    """
+    Saves many configurations at once: the configuration file is read and written only once,
+    instead of once per configuration as `save_config` does. If any configuration cannot be
+    saved (e.g. it already exists and `overwrite` is False), nothing is written.
+
+    Returns:
+      The paths to the created configuration script files.
+    """
+    if not configs:
+      return []
+    data = _read_main_config()
+    for config in configs:
+      config._merge_into_main_config(data, overwrite)
+    paths = [config._write_script() for config in configs]
+    _write_main_config(data)
+    return paths
   
   @staticmethod
   @abstractmethod
@@ -223,4 +290,13 @@ class BaseConfig(ABC):
     Returns the status of a job for this scheduler.
     This must be implemented by subclasses.
     """
-    pass
\ No newline at end of file
+    pass
+
+  @classmethod
+  def get_jobs_status(cls, job_ids: Sequence[Union[str, int]]) -> Dict[str, Status]:
+    """
+    Returns the status of many jobs at once, as a dict keyed by `str(job_id)`.
+    Subclasses should override this to issue a single scheduler query per batch of ids;
+    the default implementation falls back to one `get_job_status` call per job.
+    """
+    return {str(job_id): cls.get_job_status(job_id) for job_id in job_ids}
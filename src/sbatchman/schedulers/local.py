@@ -1,19 +1,96 @@
 from dataclasses import dataclass
 from pathlib import Path
+import fcntl
+import json
+import os
 import subprocess
-import datetime
-from typing import List, Optional, Tuple, Union
+import sys
+import time
+from typing import Dict, List, Optional, Sequence, Union
 
+from sbatchman.config.project_config import get_local_jobs_dir, get_project_root
 from sbatchman.core.status import Status
 
 from .base import BaseConfig
 
+# Starts a job detached from the current process (so that it is reaped by init and keeps running
+# after SbatchMan exits) and prints its PID. Before running its script, the job waits on a FIFO
+# named after its PID until the dispatcher of its configuration lets it run (see local_dispatcher.py).
+# If the FIFO cannot be created, the job exits (and is marked as FAILED) instead of running unthrottled.
+# Args: <run script> <experiment dir> <waiting dir>
+_START_WAITING_JOB = (
+  'bash -c \'fifo="$2/$$"; '
+  'mkfifo "$fifo" || { echo "SbatchMan: cannot create $fifo, the job was not run." > "$1/stderr.log"; exit 1; }; '
+  'read -r _ < "$fifo"; '
+  'exec bash "$0" > "$1/stdout.log" 2> "$1/stderr.log"\' "$1" "$2" "$3" '
+  '< /dev/null > /dev/null 2>&1 & echo $!'
+)
+
+# Starts a detached process, appending its stderr to a log file. Args: <log file> <command...>
+_START_DETACHED = 'log="$1"; shift; "$@" < /dev/null > /dev/null 2>> "$log" &'
+
+def parse_time(t: str) -> int:
+  """Converts a walltime in the D-HH:mm:ss or HH:mm:ss format to seconds."""
+  if '-' in t:
+    days, rest = t.split('-')
+    h, m, s = map(int, rest.split(':'))
+    return int(days) * 86400 + h * 3600 + m * 60 + s
+  else:
+    h, m, s = map(int, t.split(':'))
+    return h * 3600 + m * 60 + s
+
+def get_waiting_jobs_dir() -> Path:
+  """Directory of the FIFOs of the local jobs waiting for a free slot, named after their PID."""
+  return get_local_jobs_dir() / "waiting"
+
+def get_final_status_dir() -> Path:
+  """Directory where the dispatchers record how each local job ended, in files named after their PID."""
+  return get_local_jobs_dir() / "status"
+
+def try_lock(f) -> bool:
+  """Tries to acquire an exclusive lock on an open file without blocking."""
+  try:
+    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return True
+  except BlockingIOError:
+    return False
+
+def get_processes_state(pids: Sequence[Union[str, int]]) -> Dict[str, str]:
+  """
+  Returns the `ps` state code (e.g. 'S', 'R', 'Z') of the given processes.
+  Processes that do not exist are not included in the returned dict.
+  """
+  pids = [str(p) for p in pids if str(p).isdigit() and int(p) > 0]
+  if not pids:
+    return {}
+  try:
+    result = subprocess.run(["ps", "-o", "pid=,stat=", "-p", ",".join(pids)], capture_output=True, text=True)
+  except FileNotFoundError:
+    # Fall back to signal 0, which cannot tell zombies apart
+    states = {}
+    for pid in pids:
+      try:
+        os.kill(int(pid), 0)
+        states[pid] = 'S'
+      except PermissionError:
+        states[pid] = 'S'
+      except OSError:
+        pass
+    return states
+  states = {}
+  for line in result.stdout.splitlines():
+    fields = line.split()
+    if len(fields) >= 2:
+      states[fields[0]] = fields[1]
+  return states
+
 @dataclass
 class LocalConfig(BaseConfig):
   """Scheduler for running on the local machine."""
-  
+
   scheduler: str = 'local'
   time: Optional[str] = None
+  slots: Optional[int] = None
 
   def _generate_scheduler_directives(self) -> List[str]:
     return ["# Local execution script"]
@@ -21,47 +98,100 @@ class LocalConfig(BaseConfig):
   @staticmethod
   def get_job_status(job_id: Union[str, int]) -> Status:
     """
-    For local jobs, status is not tracked post-submission.
+    Returns the status of a local job, given its PID.
     """
-    return Status.UNKNOWN
+    return LocalConfig.get_jobs_status([job_id]).get(str(job_id), Status.UNKNOWN)
+
+  @staticmethod
+  def get_jobs_status(job_ids: Sequence[Union[str, int]]) -> Dict[str, Status]:
+    """
+    Returns the status of many local jobs from the state of their processes, with a single `ps` call.
+    Jobs waiting for a free slot are QUEUED, running ones are RUNNING. For jobs that exited, the status
+    recorded by their dispatcher is returned, if any.
+    """
+    statuses: Dict[str, Status] = {}
+    states = get_processes_state(job_ids)
+    waiting_dir = get_waiting_jobs_dir()
+    final_status_dir = get_final_status_dir()
+    for job_id in (str(j) for j in job_ids):
+      state = states.get(job_id)
+      if state is None or state.startswith('Z'):
+        try:
+          statuses[job_id] = Status((final_status_dir / job_id).read_text().strip())
+        except (OSError, ValueError):
+          pass
+      elif (waiting_dir / job_id).exists():
+        statuses[job_id] = Status.QUEUED
+      else:
+        statuses[job_id] = Status.RUNNING
+    return statuses
 
   @staticmethod
   def get_scheduler_name() -> str:
     """Returns the name of the scheduler this parameters class is associated with."""
     return "local"
-  
-  def local_submit(self, script_path: Path, exp_dir: Path) -> Tuple[int, bool]:
+
+  def local_submit(self, script_path: Path, exp_dir: Path, previous_job_id: Optional[Union[str, int]] = None) -> int:
     """Runs the job in the background on the local machine, with optional time limit.
-    Returns (pid, timed_out: bool).
+    At most `slots` jobs of this configuration run at the same time (one if not set), the others
+    are queued until a slot frees up. If `previous_job_id` is the PID of another local job, this
+    job is only started once that one has ended (as `--dependency=afterany` does for SLURM).
+    Returns the PID of the job.
     """
-    stdout_log = exp_dir / "stdout.log"
-    stderr_log = exp_dir / "stderr.log"
-    command_list = ["bash", str(script_path)]
-    timed_out = False
-
-    # If self.time is set, prepend 'timeout' to the command
-    if self.time:
-      # Convert D-HH:mm:ss to seconds if needed
-      def parse_time(t: str) -> int:
-        if '-' in t:
-          days, rest = t.split('-')
-          h, m, s = map(int, rest.split(':'))
-          return int(days) * 86400 + h * 3600 + m * 60 + s
-        else:
-          h, m, s = map(int, t.split(':'))
-          return h * 3600 + m * 60 + s
-      timeout_seconds = parse_time(self.time)
-      command_list = ["timeout", str(timeout_seconds)] + command_list
-
-    with open(stdout_log, "w") as out, open(stderr_log, "w") as err:
-      process = subprocess.Popen(
-        command_list,
-        stdout=out,
-        stderr=err,
-      )
-      process.wait()
-      # If timeout was used, check if process exited with 124 (timeout exit code)
-      if self.time and process.returncode == 124:
-        timed_out = True
+    queue_dir = get_local_jobs_dir() / str(self.cluster_name) / str(self.name)
+    waiting_dir = get_waiting_jobs_dir()
+    queue_dir.mkdir(parents=True, exist_ok=True)
+    waiting_dir.mkdir(parents=True, exist_ok=True)
+
+    result = subprocess.run(
+      ["bash", "-c", _START_WAITING_JOB, "sbatchman", str(Path(script_path).resolve()), str(Path(exp_dir).resolve()), str(waiting_dir)],
+      capture_output=True,
+      text=True,
+      check=True,
+      start_new_session=True, # Own process group, so that the dispatcher can kill the whole job on timeout
+    )
+    pid = int(result.stdout.strip())
+    (get_final_status_dir() / str(pid)).unlink(missing_ok=True) # Left by an old job with the same PID
 
-    return process.pid, timed_out
\ No newline at end of file
+    # Wait for the FIFO to be created, so that the job is reported as QUEUED right away
+    deadline = time.monotonic() + 1
+    while not (waiting_dir / str(pid)).exists() and time.monotonic() < deadline:
+      time.sleep(0.01)
+
+    entry = {
+      "pid": pid,
+      "exp_dir": str(Path(exp_dir).resolve()),
+      "time_limit": parse_time(self.time) if self.time else None,
+      "start_time": None,
+      # Only local jobs (identified by their PID) can be waited for
+      "after": int(previous_job_id) if str(previous_job_id).isdigit() and int(previous_job_id) > 0 else None,
+    }
+    # Entries are named so that sorting them gives the submission order
+    entry_path = queue_dir / f"{time.time_ns()}_{pid}.json"
+    tmp_path = queue_dir / f".{entry_path.name}.tmp"
+    with open(tmp_path, "w") as f:
+      json.dump(entry, f)
+    os.replace(tmp_path, entry_path)
+
+    self._ensure_dispatcher(queue_dir)
+    return pid
+
+  def _ensure_dispatcher(self, queue_dir: Path):
+    """Starts the dispatcher of this configuration, unless it is already running."""
+    with open(queue_dir / "dispatcher.lock", "a") as lock:
+      if not try_lock(lock):
+        # The running dispatcher will pick up the new job
+        return
+      # The locked file is handed over to the new dispatcher, so that the lock is never released in
+      # between and the next submissions do not start other dispatchers while this one starts up
+      subprocess.run(
+        [
+          "bash", "-c", _START_DETACHED, "sbatchman", str(queue_dir / "dispatcher.log"),
+          sys.executable, "-m", "sbatchman.schedulers.local_dispatcher", str(queue_dir),
+          "--slots", str(self.slots or 1), "--lock-fd", str(lock.fileno()),
+        ],
+        check=True,
+        start_new_session=True,
+        cwd=get_project_root().parent,
+        pass_fds=(lock.fileno(),),
+      )
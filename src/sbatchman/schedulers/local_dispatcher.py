@@ -0,0 +1,170 @@
+"""
+Dispatcher of the jobs of a local configuration.
+
+Local jobs are started right away by `LocalConfig.local_submit`, so that their PID is known, but
+they wait on a FIFO in `local_jobs/waiting/` until the dispatcher of their configuration lets
+them run. The dispatcher keeps at most `slots` jobs running, enforces the time limit of the
+configuration and records how each job ended. Jobs submitted with a previous job (see
+`sequential` job files) are held until that job has ended, whichever queue it is in. The
+dispatcher exits as soon as its queue is empty, and is started again by the next submission.
+
+Usage: python -m sbatchman.schedulers.local_dispatcher <queue_dir> --slots <n> [--lock-fd <fd>]
+"""
+import argparse
+import datetime
+import errno
+import json
+import os
+import signal
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from sbatchman.core.status import TERMINAL_STATES, Status
+from sbatchman.schedulers.local import get_final_status_dir, get_processes_state, get_waiting_jobs_dir, try_lock
+
+POLL_INTERVAL = 0.5 # seconds
+
+Entry = Tuple[Path, dict]
+
+def _load_entries(queue_dir: Path) -> List[Entry]:
+  """Returns the queued and running jobs, in submission order."""
+  entries = []
+  for path in sorted(queue_dir.glob("*.json")):
+    try:
+      with open(path, "r") as f:
+        entries.append((path, json.load(f)))
+    except (OSError, ValueError):
+      continue
+  return entries
+
+def _save_entry(path: Path, entry: dict):
+  tmp_path = path.with_name(f".{path.name}.tmp")
+  with open(tmp_path, "w") as f:
+    json.dump(entry, f)
+  os.replace(tmp_path, path)
+
+def _release(pid: int) -> bool:
+  """Lets a waiting job run. Returns False if the job is not waiting on its FIFO yet."""
+  fifo = get_waiting_jobs_dir() / str(pid)
+  try:
+    fd = os.open(fifo, os.O_WRONLY | os.O_NONBLOCK)
+  except OSError as e:
+    if e.errno in (errno.ENOENT, errno.ENXIO): # Not created or not opened by the job yet
+      return False
+    raise
+  try:
+    os.write(fd, b"\n")
+  finally:
+    os.close(fd)
+  fifo.unlink(missing_ok=True)
+  return True
+
+def _kill(pid: int):
+  """Terminates a job together with all the processes it started."""
+  try:
+    os.killpg(os.getpgid(pid), signal.SIGTERM)
+  except OSError:
+    pass
+
+def _finish(entry: dict, timed_out: bool):
+  """
+  Records how a job ended. Jobs that exited without writing a terminal status in their metadata
+  (e.g. killed on timeout) are marked as TIMEOUT or FAILED.
+  """
+  # Imported here since sbatchman.core imports the schedulers
+  from sbatchman.core import job_state
+  from sbatchman.core.job import Job
+
+  pid = entry["pid"]
+  (get_waiting_jobs_dir() / str(pid)).unlink(missing_ok=True)
+  metadata_path = Path(entry["exp_dir"]) / "metadata.yaml"
+  status = Status.TIMEOUT.value if timed_out else Status.FAILED.value
+  try:
+    job_dict, _ = job_state.read_metadata(metadata_path)
+    if job_dict is None:
+      raise FileNotFoundError(metadata_path)
+    if job_dict.get("status") in TERMINAL_STATES:
+      status = job_dict["status"]
+    else:
+      job = Job(**job_dict)
+      job.status = status
+      job.end_timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S.%f")
+      job.write_metadata()
+  except Exception:
+    pass
+
+  final_status_dir = get_final_status_dir()
+  final_status_dir.mkdir(parents=True, exist_ok=True)
+  (final_status_dir / str(pid)).write_text(status)
+
+def _has_ended(pid: int, states: Dict[str, str]) -> bool:
+  """Returns True if the job with the given PID exited, or its dispatcher already recorded how it ended."""
+  state = states.get(str(pid))
+  return state is None or state.startswith('Z') or (get_final_status_dir() / str(pid)).exists()
+
+def dispatch(queue_dir: Path, slots: int, lock_fd: Optional[int] = None):
+  """
+  Runs the jobs queued in `queue_dir`, `slots` at a time, until the queue is empty.
+  Args:
+    lock_fd: Descriptor of the dispatcher lock file, already locked by the process that started this dispatcher.
+  """
+  lock = os.fdopen(lock_fd, "a") if lock_fd is not None else open(queue_dir / "dispatcher.lock", "a")
+  if not try_lock(lock):
+    return # Another dispatcher is already running
+
+  timed_out = set()
+  while True:
+    entries = _load_entries(queue_dir)
+    if not entries:
+      # Jobs may be queued right after the lock is released, while their submitter found it taken
+      lock.close()
+      lock = open(queue_dir / "dispatcher.lock", "a")
+      if _load_entries(queue_dir) and try_lock(lock):
+        continue
+      lock.close()
+      return
+
+    states = get_processes_state(
+      [entry["pid"] for _, entry in entries] + [entry["after"] for _, entry in entries if entry.get("after")]
+    )
+    waiting: List[Entry] = []
+    running = 0
+    for path, entry in entries:
+      pid = entry["pid"]
+      state = states.get(str(pid))
+      if state is None or state.startswith('Z'):
+        _finish(entry, pid in timed_out)
+        timed_out.discard(pid)
+        path.unlink(missing_ok=True)
+      elif entry["start_time"] is None:
+        waiting.append((path, entry))
+      else:
+        running += 1
+        if entry["time_limit"] is not None and pid not in timed_out and time.time() - entry["start_time"] > entry["time_limit"]:
+          _kill(pid)
+          timed_out.add(pid)
+
+    # Fill the free slots in submission order
+    for path, entry in waiting:
+      if running >= slots:
+        break
+      if entry.get("after") and not _has_ended(entry["after"], states):
+        continue
+      if _release(entry["pid"]):
+        entry["start_time"] = time.time()
+        _save_entry(path, entry)
+        running += 1
+
+    time.sleep(POLL_INTERVAL)
+
+def main(argv: Optional[List[str]] = None):
+  parser = argparse.ArgumentParser(description="Runs the queued jobs of a local SbatchMan configuration.")
+  parser.add_argument("queue_dir", type=Path)
+  parser.add_argument("--slots", type=int, default=1, help="Maximum number of jobs running at the same time.")
+  parser.add_argument("--lock-fd", type=int, default=None, help="Descriptor of the dispatcher lock file, if already locked.")
+  args = parser.parse_args(argv)
+  dispatch(args.queue_dir, max(1, args.slots), args.lock_fd)
+
+if __name__ == "__main__":
+  main()
@@ -1,11 +1,11 @@
 from pathlib import Path
 import subprocess
 from dataclasses import dataclass
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Sequence, Union
 
 from sbatchman.core.status import Status
 
-from .base import BaseConfig
+from .base import STATUS_QUERY_BATCH_SIZE, BaseConfig, chunked
 
 PBS_STATUS_MAP = {
   # Queued states
@@ -61,40 +61,81 @@ class PbsConfig(BaseConfig):
     """
     Returns the status of a PBS job.
     """
-    process = subprocess.run(
-      f"qstat -f {job_id}",
-      shell=True,
-      capture_output=True,
-      text=True
-    )
-    returncode = process.returncode
-    stdout = process.stdout.strip()
-    if returncode == 0 and stdout:
-      job_state = None
-      exit_status = None
-      for line in stdout.split('\n'):
-        line = line.strip()
-        if "job_state =" in line:
-          job_state = line.split("=")[1].strip()
-        elif "exit_status =" in line:
-          exit_status = int(line.split("=")[1].strip())
-
-      if job_state:
-        # If job is completed, check exit status to determine if it failed
-        if job_state == 'C':
-          if exit_status is not None and exit_status != 0:
-            return Status.FAILED
-          return Status.COMPLETED
-        
-        return PBS_STATUS_MAP.get(job_state, Status.UNKNOWN)
-
-    return Status.UNKNOWN
+    return PbsConfig.get_jobs_status([job_id]).get(str(job_id), Status.UNKNOWN)
+
+  @staticmethod
+  def get_jobs_status(job_ids: Sequence[Union[str, int]]) -> Dict[str, Status]:
+    """
+    Returns the status of many PBS jobs, issuing one `qstat -f` call per batch of ids.
+    Jobs missing from the qstat output are not included in the returned dict.
+    Ids may or may not include the server suffix: `pbs_submit` strips it, while running jobs
+    record the full `$PBS_JOBID`. The returned dict is keyed by the ids as given.
+    """
+    statuses: Dict[str, Status] = {}
+    job_ids = [str(j) for j in job_ids]
+    for batch in chunked(job_ids, STATUS_QUERY_BATCH_SIZE):
+      try:
+        process = subprocess.run(
+          ["qstat", "-f", *batch],
+          capture_output=True,
+          text=True
+        )
+      except FileNotFoundError:
+        # qstat is not available on this machine
+        break
+      # qstat exits with a non-zero code if *any* of the ids is unknown, but still
+      # prints the full record of all the other ones
+      statuses.update(_parse_qstat_full_output(process.stdout))
+    return {
+      job_id: statuses[_strip_server_suffix(job_id)]
+      for job_id in job_ids
+      if _strip_server_suffix(job_id) in statuses
+    }
 
   @staticmethod
   def get_scheduler_name() -> str:
     """Returns the name of the scheduler this parameters class is associated with."""
     return "pbs"
   
+def _strip_server_suffix(job_id: str) -> str:
+  """Returns the numeric part of a PBS job id, e.g. `1234` for `1234.server`."""
+  return job_id.split('.')[0]
+
+def _parse_qstat_full_output(stdout: str) -> Dict[str, Status]:
+  """Parses the output of `qstat -f <id> [<id> ...]` into a dict of job id (without server suffix) -> Status."""
+  statuses: Dict[str, Status] = {}
+  job_id = None
+  job_state = None
+  exit_status = None
+
+  def _flush():
+    if job_id is None or not job_state:
+      return
+    # If job is completed, check exit status to determine if it failed
+    if job_state == 'C':
+      statuses[job_id] = Status.FAILED if exit_status is not None and exit_status != 0 else Status.COMPLETED
+    else:
+      statuses[job_id] = PBS_STATUS_MAP.get(job_state, Status.UNKNOWN)
+
+  for line in stdout.split('\n'):
+    line = line.strip()
+    if line.startswith("Job Id:"):
+      _flush()
+      # Job ids are stored without the server suffix (see pbs_submit)
+      job_id = _strip_server_suffix(line.split(":", 1)[1].strip())
+      job_state = None
+      exit_status = None
+    elif "job_state =" in line:
+      job_state = line.split("=")[1].strip()
+    elif "exit_status =" in line:
+      try:
+        exit_status = int(line.split("=")[1].strip())
+      except ValueError:
+        exit_status = None
+  _flush()
+
+  return statuses
+
 def pbs_submit(script_path: Path, exp_dir: Path, previous_job_id: Optional[int] = None) -> int:
   """Submits the job to PBS."""
   if previous_job_id:
@@ -1,12 +1,14 @@
+import getpass
 from pathlib import Path
 import re
+import shlex
 import subprocess
 from dataclasses import dataclass
-from typing import List, Optional, Union
+from typing import Dict, List, Optional, Sequence, Union
 
 from sbatchman.core.status import Status
 
-from .base import BaseConfig
+from .base import STATUS_QUERY_BATCH_SIZE, BaseConfig, chunked
 
 SLURM_STATUS_MAP = {
   # Pending states
@@ -38,6 +40,26 @@ SLURM_STATUS_MAP = {
   "REVOKED": Status.CANCELLED,
 }
 
+# Largest job array submitted at once, SLURM's default MaxArraySize is 1001
+SLURM_MAX_ARRAY_SIZE = 1000
+
+# Job ids of pending array tasks are reported in a compact form, e.g. `1234_[3-5,8%2]`
+_PENDING_ARRAY_TASKS_RE = re.compile(r"(\d+)_\[([^\]]+)\]")
+
+def _expand_array_job_id(job_id: str) -> List[str]:
+  """Expands the compact job id of pending array tasks (e.g. `1234_[3-5]`) into the ids of each task."""
+  match = _PENDING_ARRAY_TASKS_RE.fullmatch(job_id)
+  if not match:
+    return [job_id]
+  array_id, ranges = match.group(1), match.group(2).split("%")[0]
+  job_ids = []
+  for task_range in ranges.split(","):
+    start, _, end = task_range.partition("-")
+    if not start.isdigit() or (end and not end.isdigit()):
+      continue
+    job_ids.extend(f"{array_id}_{i}" for i in range(int(start), int(end or start) + 1))
+  return job_ids
+
 @dataclass
 class SlurmConfig(BaseConfig):
   """Scheduler for SLURM."""
@@ -98,22 +120,45 @@ class SlurmConfig(BaseConfig):
     """
     Returns the status of a SLURM job.
     """
-    # TODO double check if this always works properly
-    process = subprocess.run(
-      f"sacct -j {job_id} -o State -D -n -u $(whoami)",
-      shell=True,
-      capture_output=True,
-      text=True
-    )
-    returncode = process.returncode
-    stdout = process.stdout.strip()
-    
-    if returncode == 0 and stdout:
-      return SLURM_STATUS_MAP.get(stdout.split('\n')[0].strip(), Status.UNKNOWN)
-    
-    # If the job is not in the queue, it might be completed or failed.
+    # If the job is not in the accounting database, it might be completed or failed.
     # The calling function will handle this logic.
-    return Status.UNKNOWN
+    return SlurmConfig.get_jobs_status([job_id]).get(str(job_id), Status.UNKNOWN)
+
+  @staticmethod
+  def get_jobs_status(job_ids: Sequence[Union[str, int]]) -> Dict[str, Status]:
+    """
+    Returns the status of many SLURM jobs, issuing one `sacct` call per batch of ids.
+    Jobs missing from the sacct output are not included in the returned dict.
+    """
+    statuses: Dict[str, Status] = {}
+    # Array tasks (`<array_id>_<index>`) are queried through their array, which also reports pending tasks
+    job_ids = list(dict.fromkeys(str(j).split("_")[0] for j in job_ids))
+    for batch in chunked(job_ids, STATUS_QUERY_BATCH_SIZE):
+      try:
+        process = subprocess.run(
+          ["sacct", "-j", ",".join(batch), "-o", "JobID,State", "-D", "-n", "-P", "-u", getpass.getuser()],
+          capture_output=True,
+          text=True
+        )
+      except FileNotFoundError:
+        # sacct is not available on this machine
+        break
+      if process.returncode != 0:
+        continue
+      for line in process.stdout.splitlines():
+        fields = line.strip().split("|")
+        if len(fields) < 2:
+          continue
+        # Skip job steps (e.g. `1234.batch`) and keep the first record of each job,
+        # like `sacct -j <id>` does when queried for a single job
+        job_id, state = fields[0], fields[1]
+        if "." in job_id:
+          continue
+        # `-P` does not truncate states, so e.g. "CANCELLED by 1000" must be reduced to its first word
+        state = state.split()[0] if state.split() else ""
+        for task_id in _expand_array_job_id(job_id):
+          statuses.setdefault(task_id, SLURM_STATUS_MAP.get(state, Status.UNKNOWN))
+    return statuses
 
   @staticmethod
   def get_scheduler_name() -> str:
@@ -140,3 +185,62 @@ def slurm_submit(script_path: Path, exp_dir: Path, previous_job_id: Optional[int
   if match:
     return int(match.group(1))
   raise ValueError(f"Could not parse job ID from sbatch output:\n{result.stdout}\n\n{result.stderr}")
+
+def slurm_array_task_script(script: str) -> str:
+  """
+  Adapts a run script to be run as a task of a job array (see `slurm_submit_array`): the job id
+  recorded in the job metadata becomes `<array_id>_<index>`, as accepted by `sacct` and `scancel`.
+  """
+  return script.replace(
+    '"job_id: $SLURM_JOB_ID"',
+    "\"job_id: '${SLURM_ARRAY_JOB_ID}_${SLURM_ARRAY_TASK_ID}'\"",
+  ).replace(
+    # Configurations created by older versions of SbatchMan edit metadata.yaml in place
+    's/job_id: [0-9]*/job_id: $SLURM_JOB_ID/',
+    "s/^job_id: .*/job_id: '${SLURM_ARRAY_JOB_ID}_${SLURM_ARRAY_TASK_ID}'/",
+  )
+
+def slurm_submit_array(script_paths: Sequence[Path], exp_dir: Path) -> int:
+  """
+  Submits many run scripts sharing the same configuration as a single SLURM job array.
+  Task `i` runs `script_paths[i]`, writing its logs next to it. Returns the id of the array.
+  """
+  if not 0 < len(script_paths) <= SLURM_MAX_ARRAY_SIZE:
+    raise ValueError(f"Job arrays must contain between 1 and {SLURM_MAX_ARRAY_SIZE} jobs, got {len(script_paths)}.")
+
+  # All tasks share the same configuration, so the directives of the first script apply to all of them,
+  # except for the log paths, which are set per task below
+  with open(script_paths[0], "r") as f:
+    directives = [
+      line for line in f.read().splitlines()
+      if line.startswith("#SBATCH") and not line.startswith(("#SBATCH --output=", "#SBATCH --error="))
+    ]
+
+  array_script = "\n".join([
+    "#!/bin/bash",
+    *directives,
+    "#SBATCH --output=/dev/null",
+    "#SBATCH --error=/dev/null",
+    "",
+    "RUN_SCRIPTS=(",
+    *[f"  {shlex.quote(str(Path(p).resolve()))}" for p in script_paths],
+    ")",
+    'RUN_SCRIPT="${RUN_SCRIPTS[$SLURM_ARRAY_TASK_ID]}"',
+    'RUN_DIR="$(dirname "$RUN_SCRIPT")"',
+    'exec bash "$RUN_SCRIPT" > "$RUN_DIR/stdout.log" 2> "$RUN_DIR/stderr.log"',
+  ]) + "\n"
+
+  # sbatch reads the script from stdin when no file is given
+  result = subprocess.run(
+    ["sbatch", f"--array=0-{len(script_paths) - 1}"],
+    input=array_script,
+    capture_output=True,
+    text=True,
+    check=True,
+    cwd=exp_dir,
+  )
+
+  match = re.search(r"Submitted batch job (\d+)", result.stdout)
+  if match:
+    return int(match.group(1))
+  raise ValueError(f"Could not parse job ID from sbatch output:\n{result.stdout}\n\n{result.stderr}")
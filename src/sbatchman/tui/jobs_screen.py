@@ -1,5 +1,4 @@
 from typing import List, Optional, Dict, Any
-import yaml
 from sbatchman import Job, jobs_list
 from textual.app import ComposeResult
 from textual.widgets import (
@@ -22,6 +21,7 @@ from pathlib import Path
 from datetime import datetime
 
 from sbatchman.config.project_config import get_archive_dir, get_experiments_dir
+from sbatchman.core import job_state, jobs_index
 from sbatchman.core.launcher import Status
 from sbatchman.tui.log_screen import LogScreen
 
@@ -837,12 +837,13 @@ class JobsScreen(Screen):
                 return
             try:
                 if job.job_id:
-                    delete_jobs(id=int(job.job_id), archived=True, not_archived=True)
+                    delete_jobs(id=job.job_id, archived=True, not_archived=True)
                 else:
                     import shutil
                     exp_path = self.experiments_root / job.exp_dir
                     if exp_path.exists():
                         shutil.rmtree(exp_path)
+                    jobs_index.remove_job(job.archive_name, job.exp_dir)
                 self.load_and_update_jobs()
             except Exception as exc:
                 self.notify(f"Delete failed: {exc}", severity="error")
@@ -1080,8 +1081,9 @@ class JobsScreen(Screen):
     def _get_job_by_exp_dir(self, exp_dir: str) -> Optional[Job]:
         try:
             metadata_path = self.experiments_root / exp_dir / "metadata.yaml"
-            if metadata_path.exists():
-                return Job(**yaml.safe_load(open(metadata_path, "r")))
+            job_dict, _ = job_state.read_metadata(metadata_path)
+            if job_dict is not None:
+                return Job(**job_dict)
         except Exception:
             pass
         return None
@@ -17,24 +17,57 @@ the server starts, it is loaded and offered to the front-end as the initial
 workspace (same format produced by "Export workspace").
 """
 
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
+from collections.abc import MutableMapping
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+import base64
+import gzip
+import hashlib
 import importlib.util
+import itertools
 import json
+import numbers
+import os
+import queue
 import sqlite3
 import sys
+import threading
 import traceback
 import shutil
+import zlib
 import typer
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from http.server import BaseHTTPRequestHandler, HTTPServer
 from pathlib import Path
 from urllib.parse import urlparse
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
 from rich.console import Console
+try:
+    import brotli
+except ImportError:
+    brotli = None
+# Tables cached for transform scripts are handed out as shallow copies, which
+# copy-on-write (always on from pandas 3) keeps from altering the cache
+PANDAS_COPY_ON_WRITE = int(pd.__version__.split(".")[0]) >= 3
+if not PANDAS_COPY_ON_WRITE:
+    try:
+        pd.set_option("mode.copy_on_write", True)
+        PANDAS_COPY_ON_WRITE = True
+    except KeyError:  # pandas < 1.5: deep copies
+        pass
+# Parquet results (see parser.export_parquet_dataset) are queried with DuckDB
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
 
 from sbatchman.config.project_config import get_project_root
-from sbatchman.parser import parse_jobs_and_generate_sqlite_db
+from sbatchman.parser import (
+    PARQUET_MANIFEST, export_parquet_dataset, is_parquet_dataset, list_result_tables, parse_jobs_and_generate_sqlite_db,
+)
 
 console = Console(width=shutil.get_terminal_size().columns)
 
@@ -55,6 +88,9 @@ DOCS_PATH = MODULE_DIR / "docs.html"
 # that was produced by parse_jobs_and_generate_sqlite_db at startup)
 REPARSE_SOURCES: dict = {}
 
+# Requests are served concurrently: only one re-parse may write a database at a time
+_REPARSE_LOCK = threading.Lock()
+
 
 def hook_reparse(db_name: str, db_path: str) -> dict:
     """
@@ -63,7 +99,7 @@ def hook_reparse(db_name: str, db_path: str) -> dict:
 
     Args:
         db_name:  The logical name registered in DB_REGISTRY.
-        db_path:  Absolute path to the SQLite file on disk.
+        db_path:  Absolute path to the SQLite file (or Parquet directory) on disk.
 
     Returns:
         dict with keys:
@@ -76,16 +112,18 @@ def hook_reparse(db_name: str, db_path: str) -> dict:
             # Actually regenerate the SQLite file from the job logs, so
             # columns/tables added by the parser since the server started
             # actually show up (previously this only re-read the stale file).
-            parse_jobs_and_generate_sqlite_db(parser=src["parser"], output_path=src["output_path"])
-        conn = sqlite3.connect(db_path)
-        cur = conn.cursor()
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table'")
-        tables = [r[0] for r in cur.fetchall()]
-        counts = {}
-        for t in tables:
-            cur.execute(f"SELECT COUNT(*) FROM {t}")
-            counts[t] = cur.fetchone()[0]
-        conn.close()
+            with _REPARSE_LOCK:
+                parse_jobs_and_generate_sqlite_db(parser=src["parser"], output_path=src["output_path"])
+                if src.get("parquet_dir"):
+                    export_parquet_dataset(src["output_path"], src["parquet_dir"])
+        with pooled_connection(db_path) as conn:
+            cur = conn.cursor()
+            tables = list_tables(conn)
+            counts = {}
+            for t in tables:
+                cur.execute(f"SELECT COUNT(*) FROM {t}")
+                counts[t] = cur.fetchone()[0]
+            cur.close()
         summary = ", ".join(f"{t}={n}" for t, n in counts.items())
         return {"ok": True, "message": f"Re-parsed '{db_name}': {summary}"}
     except Exception as e:
@@ -211,7 +249,128 @@ def _style_map(rows, col_idx, col: Optional[str], sequence: List[str]) -> dict:
     return {v: sequence[i % len(sequence)] for i, v in enumerate(values)}
 
 
-@register_plot("line", "Line Chart", "X vs Y with multi-column grouping, marker & linestyle mapping", {"mode": "lines+markers"})
+# ---------------------------------------------------------------------------
+# Downsampling — bounds the points sent to (and drawn by) the browser, while
+# preserving the visual shape of the traces. Downsampled or binned traces
+# carry a `meta.downsampled` entry, collected by `downsampling_report`.
+# ---------------------------------------------------------------------------
+
+MAX_POINTS_PER_TRACE = 5000     # default "max_points" of line/scatter/histogram
+MAX_HEATMAP_BINS = 200          # default "max_bins" per heatmap axis
+
+
+def _as_float_array(values) -> "np.ndarray":
+    """Numeric values as floats, anything else (None, strings) as NaN."""
+    return np.array([float(v) if isinstance(v, numbers.Real) else np.nan for v in values], dtype=float)
+
+
+def _is_numeric(values) -> bool:
+    return all(isinstance(v, numbers.Real) for v in values if v is not None)
+
+
+def _budget(cfg, key, default) -> int:
+    try:
+        return int(cfg.get(key, default) or 0)
+    except (TypeError, ValueError):
+        return default
+
+
+def lttb_indices(xs: "np.ndarray", ys: "np.ndarray", budget: int) -> "np.ndarray":
+    """Indices of the points kept by Largest-Triangle-Three-Buckets: the
+    first and last points, plus the point of each of `budget - 2` buckets
+    making the largest triangle with the previously kept point and the
+    average of the next bucket."""
+    n = len(xs)
+    if budget >= n or budget < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, budget - 1).astype(int)
+    kept = np.empty(budget, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(budget - 2):
+        start, end = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_start, next_end = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        avg_x, avg_y = xs[next_start:next_end].mean(), ys[next_start:next_end].mean()
+        areas = np.abs((xs[a] - avg_x) * (ys[start:end] - ys[a]) - (xs[a] - xs[start:end]) * (avg_y - ys[a]))
+        a = start + int(np.argmax(areas))
+        kept[i + 1] = a
+    return kept
+
+
+def minmax_indices(xs: "np.ndarray", ys: "np.ndarray", budget: int) -> "np.ndarray":
+    """Indices of the points with the lowest and highest y in each of
+    `budget / 2` equal-width x buckets, in their original order."""
+    n = len(xs)
+    if budget >= n or budget < 2:
+        return np.arange(n)
+    buckets = budget // 2
+    span = xs.max() - xs.min()
+    if span > 0:
+        bucket = np.minimum(((xs - xs.min()) / span * buckets).astype(int), buckets - 1)
+    else:
+        bucket = np.zeros(n, dtype=int)
+    order = np.lexsort((ys, bucket))
+    sorted_buckets = bucket[order]
+    change = sorted_buckets[1:] != sorted_buckets[:-1]
+    first = np.concatenate(([True], change))
+    last = np.concatenate((change, [True]))
+    return np.unique(np.concatenate((order[first], order[last])))
+
+
+def _select_points(value, n, indices):
+    """Keeps the `indices` of every per-point list (length `n`) of a trace."""
+    if isinstance(value, list) and len(value) == n:
+        return [value[i] for i in indices]
+    if isinstance(value, dict):
+        return {k: _select_points(v, n, indices) for k, v in value.items()}
+    return value
+
+
+def downsample_trace(trace: dict, budget: int, method: str = "lttb") -> dict:
+    """Reduces a scatter/line trace to at most `budget` points, with LTTB
+    (lines) or min/max bucketing (markers). Points whose y is not numeric
+    are dropped; x is the point position if it is not numeric."""
+    x, y = trace.get("x"), trace.get("y")
+    if not budget or not isinstance(y, list) or len(y) <= budget:
+        return trace
+    n = len(y)
+    xs = _as_float_array(x) if isinstance(x, list) and _is_numeric(x) else np.arange(n, dtype=float)
+    ys = _as_float_array(y)
+    valid = np.flatnonzero(np.isfinite(xs) & np.isfinite(ys))
+    select = minmax_indices if method == "minmax" else lttb_indices
+    indices = valid[select(xs[valid], ys[valid], budget)].tolist()
+    if len(indices) == n:
+        return trace
+    out = {k: _select_points(v, n, indices) for k, v in trace.items()}
+    out["meta"] = {**(trace.get("meta") or {}), "downsampled": {
+        "trace": trace.get("name"), "method": method, "points": n, "kept": len(indices)}}
+    return out
+
+
+def downsampling_report(traces: List[dict]) -> List[dict]:
+    """The downsampled or binned traces: [{"trace", "method", "points", "kept"}, ...]."""
+    return [t["meta"]["downsampled"] for t in traces
+            if isinstance(t.get("meta"), dict) and "downsampled" in t["meta"]]
+
+
+def _bin_edges(values: "np.ndarray", bins: int) -> "np.ndarray":
+    finite = values[np.isfinite(values)]
+    if not len(finite):
+        return np.array([0.0, 1.0])
+    lo, hi = finite.min(), finite.max()
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return np.linspace(lo, hi, bins + 1)
+
+
+def _bin_index(values: "np.ndarray", edges: "np.ndarray") -> "np.ndarray":
+    """Bin of each value (the last bin includes its upper edge), -1 if not finite."""
+    idx = np.clip(np.searchsorted(edges, values, side="right") - 1, 0, len(edges) - 2)
+    return np.where(np.isfinite(values), idx, -1)
+
+
+@register_plot("line", "Line Chart", "X vs Y with multi-column grouping, marker & linestyle mapping",
+               {"mode": "lines+markers", "max_points": MAX_POINTS_PER_TRACE, "downsample": "lttb"})
 def plot_line(df, cfg):
     ci = _col_idx(df["columns"]); rows = df["rows"]
     x, ys = cfg.get("x"), cfg.get("y", [])
@@ -275,7 +434,8 @@ def plot_bar(df, cfg):
     return traces
 
 
-@register_plot("scatter", "Scatter Plot", "X vs Y correlation with grouping and marker mapping", {})
+@register_plot("scatter", "Scatter Plot", "X vs Y correlation with grouping and marker mapping",
+               {"max_points": MAX_POINTS_PER_TRACE, "downsample": "minmax"})
 def plot_scatter(df, cfg):
     ci = _col_idx(df["columns"]); rows = df["rows"]
     x, ys = cfg.get("x"), cfg.get("y", [])
@@ -305,12 +465,24 @@ def plot_scatter(df, cfg):
     return traces
 
 
-@register_plot("histogram", "Histogram", "Distribution of a numeric column", {"nbinsx": 30})
+@register_plot("histogram", "Histogram", "Distribution of a numeric column",
+               {"nbinsx": 30, "max_points": MAX_POINTS_PER_TRACE})
 def plot_histogram(df, cfg):
     ci = _col_idx(df["columns"]); rows = df["rows"]
     x = cfg.get("x")
     if not x: raise ValueError("Histogram requires an x column.")
-    return [{"type":"histogram","name":x,"x":[r[ci[x]] for r in rows],"nbinsx":int(cfg.get("nbinsx",30))}]
+    values = [r[ci[x]] for r in rows]
+    nbins = int(cfg.get("nbinsx", 30))
+    budget = _budget(cfg, "max_points", MAX_POINTS_PER_TRACE)
+    if not budget or len(values) <= budget or not _is_numeric(values):
+        return [{"type":"histogram","name":x,"x":values,"nbinsx":nbins}]
+    # Binned server-side: only the bin counts are sent
+    xs = _as_float_array(values)
+    edges = _bin_edges(xs, nbins)
+    counts, _ = np.histogram(xs[np.isfinite(xs)], bins=edges)
+    return [{"type":"bar","name":x,"x":((edges[:-1] + edges[1:]) / 2).tolist(),"y":counts.tolist(),
+             "width":np.diff(edges).tolist(),
+             "meta":{"downsampled":{"trace":x,"method":"bins","points":len(values),"kept":nbins}}}]
 
 
 @register_plot("box", "Box Plot", "Distribution summary per category", {})
@@ -327,19 +499,42 @@ def plot_box(df, cfg):
     return traces
 
 
-@register_plot("heatmap", "Heatmap", "2D density / matrix view", {})
+def _heatmap_axis(values, max_bins):
+    """(labels, cell index of each value, binned) for one heatmap axis:
+    numeric axes with more than `max_bins` distinct values are binned."""
+    distinct = sorted(set(values))
+    if not max_bins or len(distinct) <= max_bins or not _is_numeric(values):
+        index = {v: i for i, v in enumerate(distinct)}
+        return distinct, np.array([index[v] for v in values]), False
+    numeric = _as_float_array(values)
+    edges = _bin_edges(numeric, max_bins)
+    return ((edges[:-1] + edges[1:]) / 2).tolist(), _bin_index(numeric, edges), True
+
+
+@register_plot("heatmap", "Heatmap", "2D density / matrix view", {"max_bins": MAX_HEATMAP_BINS})
 def plot_heatmap(df, cfg):
     ci = _col_idx(df["columns"]); rows = df["rows"]
     x, yc, z = cfg.get("x"), cfg.get("y", []), cfg.get("z")
     if isinstance(yc, list): yc = yc[0] if yc else None
     if not x or not yc or not z: raise ValueError("Heatmap requires x, y, and z columns.")
-    xs = sorted(set(r[ci[x]] for r in rows))
-    ys = sorted(set(r[ci[yc]] for r in rows))
-    xi = {v: i for i, v in enumerate(xs)}
-    yi = {v: i for i, v in enumerate(ys)}
-    mat = [[None]*len(xs) for _ in range(len(ys))]
-    for row in rows: mat[yi[row[ci[yc]]]][xi[row[ci[x]]]] = row[ci[z]]
-    return [{"type":"heatmap","x":xs,"y":ys,"z":mat,"colorscale":"Viridis"}]
+    max_bins = _budget(cfg, "max_bins", MAX_HEATMAP_BINS)
+    xs, xi, x_binned = _heatmap_axis([r[ci[x]] for r in rows], max_bins)
+    ys, yi, y_binned = _heatmap_axis([r[ci[yc]] for r in rows], max_bins)
+    if not (x_binned or y_binned):
+        mat = [[None]*len(xs) for _ in range(len(ys))]
+        for row, i, j in zip(rows, yi, xi): mat[i][j] = row[ci[z]]
+        return [{"type":"heatmap","x":xs,"y":ys,"z":mat,"colorscale":"Viridis"}]
+    # Binned server-side: each cell is the mean z of the rows falling in it
+    zs = _as_float_array([r[ci[z]] for r in rows])
+    ok = (xi >= 0) & (yi >= 0) & np.isfinite(zs)
+    sums = np.zeros((len(ys), len(xs))); counts = np.zeros((len(ys), len(xs)))
+    np.add.at(sums, (yi[ok], xi[ok]), zs[ok])
+    np.add.at(counts, (yi[ok], xi[ok]), 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+    mat = [[None if np.isnan(v) else float(v) for v in line] for line in means]
+    return [{"type":"heatmap","x":xs,"y":ys,"z":mat,"colorscale":"Viridis",
+             "meta":{"downsampled":{"trace":z,"method":"bins","points":len(rows),"kept":len(xs)*len(ys)}}}]
 
 
 @register_plot("violin", "Violin Plot", "Distribution shape per category", {})
@@ -397,6 +592,187 @@ def load_plugins(plugin_dirs):
                 print(f"[warn] Failed to load plugin {pyfile}: {e}", file=sys.stderr)
 
 
+# ---------------------------------------------------------------------------
+# Connection pool and query cache
+#
+# A database is either a SQLite file, or a directory of Parquet files written
+# by `export_parquet_dataset`, queried with DuckDB through one view per table.
+#
+# Databases are read through a few long-lived connections per file, and the
+# results of queries and schema lookups are kept in an LRU cache keyed by
+# (db path, db signature, SQL). The signature is the inode, mtime and size of
+# the file and of its WAL (the parser writes in WAL mode, so the main file
+# alone can stay untouched for a while): any write to the database, e.g. a
+# re-parse, makes the cached entries unreachable.
+# ---------------------------------------------------------------------------
+
+POOL_SIZE = 4                       # idle connections kept per database
+QUERY_CACHE_SIZE = 128              # cached query results and schemas
+QUERY_CACHE_MAX_CELLS = 5_000_000   # rows x columns of all the cached results
+TABLE_CACHE_SIZE = 32               # tables loaded for transform scripts
+TABLE_CACHE_MAX_CELLS = 50_000_000
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache, bounded by its number of entries and by the
+    total weight of its values (entries heavier than that are not cached)."""
+
+    def __init__(self, max_entries: int, max_weight: int):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self._entries: "OrderedDict[Hashable, Tuple[Any, int]]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, value: Any, weight: int = 1):
+        if weight > self.max_weight:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._weight -= old[1]
+            self._entries[key] = (value, weight)
+            self._weight += weight
+            while len(self._entries) > self.max_entries or self._weight > self.max_weight:
+                _, (_, evicted_weight) = self._entries.popitem(last=False)
+                self._weight -= evicted_weight
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+
+QUERY_CACHE = LRUCache(QUERY_CACHE_SIZE, QUERY_CACHE_MAX_CELLS)
+TABLE_CACHE = LRUCache(TABLE_CACHE_SIZE, TABLE_CACHE_MAX_CELLS)
+
+
+def db_signature(path: str) -> tuple:
+    """Changes whenever the database at `path` is written or replaced."""
+    signature = []
+    # Parquet datasets: the manifest is replaced by every export that changes them
+    for p in ((os.path.join(path, PARQUET_MANIFEST),) if os.path.isdir(path) else (path, path + "-wal")):
+        try:
+            st = os.stat(p)
+            signature.append((st.st_ino, st.st_mtime_ns, st.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+def _connect(path: str):
+    if not is_parquet_dataset(path):
+        return sqlite3.connect(path, check_same_thread=False)
+    if duckdb is None:
+        raise ImportError("Querying Parquet results requires duckdb (`pip install duckdb`)")
+    conn = duckdb.connect(":memory:")
+    for table_dir in sorted(Path(path).iterdir()):
+        if table_dir.is_dir() and next(table_dir.rglob("*.parquet"), None) is not None:
+            files = str(table_dir / "**" / "*.parquet").replace("'", "''")
+            # Partition values are stored in the files, the directory names may be ambiguous
+            conn.execute(f"CREATE VIEW {_quote_identifier(table_dir.name)} AS SELECT * FROM "
+                         f"read_parquet('{files}', union_by_name=true, hive_partitioning=false)")
+    return conn
+
+
+def list_tables(conn) -> List[str]:
+    """The result tables of a SQLite or DuckDB connection."""
+    if isinstance(conn, sqlite3.Connection):
+        return list_result_tables(conn)
+    return [name for (name,) in conn.execute("SELECT table_name FROM information_schema.tables ORDER BY table_name").fetchall()]
+
+
+def _table_columns(conn, table) -> List[Tuple[str, str]]:
+    if isinstance(conn, sqlite3.Connection):
+        return [(row[1], row[2]) for row in conn.execute(f"PRAGMA table_info({_quote_identifier(table)})")]
+    return conn.execute("SELECT column_name, data_type FROM information_schema.columns "
+                        "WHERE table_name = ? ORDER BY ordinal_position", [table]).fetchall()
+
+
+def _read_dataframe(conn, sql) -> "pd.DataFrame":
+    if isinstance(conn, sqlite3.Connection):
+        return pd.read_sql_query(sql, conn)
+    return conn.execute(sql).df()
+
+
+class ConnectionPool:
+    """Keeps up to `size` idle connections to one database file, to be
+    shared by the request handler threads (one connection per thread at a
+    time)."""
+
+    def __init__(self, path: str, size: int = POOL_SIZE):
+        self.path = path
+        self.size = size
+        self.inode = db_signature(path)[0]
+        self._idle: "queue.LifoQueue[sqlite3.Connection]" = queue.LifoQueue()
+        self._closed = False
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = _connect(self.path)
+        try:
+            yield conn
+        finally:
+            if not self._closed and self._idle.qsize() < self.size:
+                self._idle.put(conn)
+            else:
+                conn.close()
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+@contextmanager
+def pooled_connection(path: str):
+    """A connection to the database at `path`, taken from (and then given
+    back to) its pool. The pool is replaced if the file was replaced."""
+    inode = db_signature(path)[0]
+    with _POOLS_LOCK:
+        pool = _POOLS.get(path)
+        if pool is None or pool.inode != inode:
+            if pool is not None:
+                pool.close()
+            pool = _POOLS[path] = ConnectionPool(path)
+    with pool.connection() as conn:
+        yield conn
+
+
+def cached(path: str, key: Hashable, compute: Callable[[], Any], weight: Callable[[Any], int] = lambda value: 1,
+           cache: LRUCache = QUERY_CACHE):
+    """Returns the value of `compute()` for the current content of the
+    database at `path`, from `cache` if it was computed before."""
+    # Taken before computing: if the database changes meanwhile, the value
+    # is stored under a signature that will not match again
+    full_key = (path, db_signature(path), key)
+    value = cache.get(full_key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.put(full_key, value, weight(value))
+    return value
+
+
 # ---------------------------------------------------------------------------
 # Database helpers
 # ---------------------------------------------------------------------------
@@ -425,59 +801,209 @@ def only_db_name() -> Optional[str]:
     return next(iter(DB_REGISTRY)) if is_single_db() else None
 
 
+def _read_schema(path):
+    with pooled_connection(path) as conn:
+        return {tname: [{"name": name, "type": column_type} for name, column_type in _table_columns(conn, tname)]
+                for tname in list_tables(conn)}
+
+
 def get_db_schema(db_name):
     path = DB_REGISTRY.get(db_name)
     if not path: return None
-    conn = sqlite3.connect(path)
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-    tables = {}
-    for (tname,) in cur.fetchall():
-        cur.execute(f"PRAGMA table_info({tname})")
-        tables[tname] = [{"name": row[1], "type": row[2]} for row in cur.fetchall()]
-    conn.close()
-    return tables
+    return cached(path, "schema", lambda: _read_schema(path))
 
 
 def get_all_table_names(db_name: str) -> List[str]:
-    path = DB_REGISTRY.get(db_name)
-    if not path: raise ValueError(f"Unknown database: {db_name}")
-    conn = sqlite3.connect(path)
-    cur = conn.cursor()
-    cur.execute("SELECT name FROM sqlite_master WHERE type='table' ORDER BY name")
-    tables = [r[0] for r in cur.fetchall()]
-    conn.close()
-    return tables
+    schema = get_db_schema(db_name)
+    if schema is None: raise ValueError(f"Unknown database: {db_name}")
+    return list(schema)
 
 
 def get_all_tables_as_dataframes(db_name: str) -> Dict[str, "pd.DataFrame"]:
     path = DB_REGISTRY.get(db_name)
     if not path: raise ValueError(f"Unknown database: {db_name}")
-    conn = sqlite3.connect(path)
     dfs = {}
-    try:
+    with pooled_connection(path) as conn:
         for t in get_all_table_names(db_name):
-            dfs[t] = pd.read_sql_query(f"SELECT * FROM {t}", conn)
-    finally:
-        conn.close()
+            dfs[t] = _read_dataframe(conn, f"SELECT * FROM {_quote_identifier(t)}")
     return dfs
 
 
-def run_query(db_name, sql, limit=10000):
+def _read_table(path, table):
+    with pooled_connection(path) as conn:
+        return _read_dataframe(conn, f"SELECT * FROM {_quote_identifier(table)}")
+
+
+class LazyTables(MutableMapping):
+    """The `data` mapping of transform scripts: {table name: DataFrame} for
+    every table of a database, where a table is only read when the script
+    first accesses it. Loaded tables are kept in TABLE_CACHE until the
+    database changes; scripts get a copy-on-write view of them, so that
+    changing it does not alter the one of later requests. Keys can be set
+    and deleted as in a dict (e.g. the query result is stored under
+    "result"), and `copy()` is shallow as `dict.copy()`."""
+
+    def __init__(self, db_name: str):
+        self.path = DB_REGISTRY.get(db_name)
+        if not self.path: raise ValueError(f"Unknown database: {db_name}")
+        self._tables = set(get_all_table_names(db_name))
+        self._frames: Dict[str, Any] = {}   # accessed tables and set keys
+
+    def __getitem__(self, key):
+        if key not in self._frames:
+            if key not in self._tables:
+                raise KeyError(key)
+            df = cached(self.path, ("table", key), lambda: _read_table(self.path, key),
+                        weight=lambda frame: frame.size, cache=TABLE_CACHE)
+            self._frames[key] = df.copy(deep=not PANDAS_COPY_ON_WRITE)
+        return self._frames[key]
+
+    def __setitem__(self, key, value):
+        self._frames[key] = value
+
+    def __delitem__(self, key):
+        if key not in self._frames and key not in self._tables:
+            raise KeyError(key)
+        self._frames.pop(key, None)
+        self._tables.discard(key)
+
+    def __iter__(self):
+        yield from self._frames
+        yield from (t for t in sorted(self._tables) if t not in self._frames)
+
+    def __len__(self):
+        return len(self._tables | set(self._frames))
+
+    def __contains__(self, key):
+        return key in self._frames or key in self._tables
+
+    def copy(self) -> "LazyTables":
+        other = LazyTables.__new__(LazyTables)
+        other.path, other._tables, other._frames = self.path, set(self._tables), dict(self._frames)
+        return other
+
+    def __repr__(self):
+        loaded = [k for k in self if k in self._frames]
+        return f"LazyTables({list(self)!r}, loaded={loaded!r})"
+
+
+STREAM_BATCH_SIZE = 1000   # rows fetched at a time by /api/query_stream
+
+
+def _check_query(db_name, sql) -> str:
+    """Returns the path of the database, if `sql` is a query that can be run on it."""
     path = DB_REGISTRY.get(db_name)
     if not path: raise ValueError(f"Unknown database: {db_name}")
     s = sql.strip().upper()
     if not (s.startswith("SELECT") or s.startswith("WITH")):
         raise ValueError("Only SELECT / WITH queries are allowed.")
-    conn = sqlite3.connect(path)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-    cur.execute(sql)
-    rows_raw = cur.fetchmany(limit)
-    columns = [d[0] for d in cur.description]
-    rows = [list(r) for r in rows_raw]
-    conn.close()
-    return {"columns": columns, "rows": rows, "truncated": len(rows) == limit}
+    return path
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _query_id(sql: str) -> str:
+    return hashlib.sha1(sql.encode()).hexdigest()[:16]
+
+
+def encode_page_token(sql: str, **position) -> str:
+    """Opaque token of the position of a page in the results of `sql`:
+    `offset=n`, or `key=column, after=value` (keyset pagination)."""
+    data = json.dumps({"query": _query_id(sql), **position}).encode()
+    return base64.urlsafe_b64encode(data).decode()
+
+
+def decode_page_token(sql: str, token: str) -> dict:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page token.")
+    if not isinstance(position, dict) or position.pop("query", None) != _query_id(sql):
+        raise ValueError("The page token belongs to another query.")
+    return position
+
+
+def _page_query(sql: str, limit: int, position: dict, keyset: Optional[str]) -> Tuple[str, tuple]:
+    """Wraps `sql` to select one page (of `limit` rows, plus one to detect
+    whether there are more) starting at `position`."""
+    # On its own line, so that a trailing comment does not swallow the ")"
+    inner = sql.strip().rstrip(";")
+    if keyset:
+        key = _quote_identifier(keyset)
+        if "after" in position:
+            return f"SELECT * FROM (\n{inner}\n) WHERE {key} > ? ORDER BY {key} LIMIT ?", (position["after"], limit + 1)
+        return f"SELECT * FROM (\n{inner}\n) ORDER BY {key} LIMIT ?", (limit + 1,)
+    offset = int(position.get("offset", 0))
+    if not offset:
+        return sql, ()
+    return f"SELECT * FROM (\n{inner}\n) LIMIT ? OFFSET ?", (limit + 1, offset)
+
+
+def _execute_query(path, sql, params, limit):
+    with pooled_connection(path) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params)
+            rows = cur.fetchmany(limit)
+            columns = [d[0] for d in cur.description]
+        finally:
+            # Ends the read transaction of the (possibly unfinished) statement
+            cur.close()
+    return columns, rows
+
+
+def run_query(db_name, sql, limit=10000, page_token: Optional[str] = None, keyset: Optional[str] = None):
+    """
+    Runs a SELECT / WITH query and returns one page of its results, of at
+    most `limit` rows: {"columns", "rows", "truncated", "next_page_token"}.
+
+    Pass `next_page_token` back as `page_token` to get the following page
+    (`truncated` is True if there is one). Pages are selected by offset, or
+    with `keyset=<column>` by the values of that column, which must be unique
+    and not NULL: the results are then sorted by it, and each page is read
+    directly from the index of the column, if any, instead of skipping the
+    rows of all the previous pages.
+    """
+    path = _check_query(db_name, sql)
+    position = decode_page_token(sql, page_token) if page_token else {}
+    keyset = position.get("key") or keyset
+    paged_sql, params = _page_query(sql, limit, position, keyset)
+    columns, rows = cached(path, ("query", paged_sql, params, limit), lambda: _execute_query(path, paged_sql, params, limit + 1),
+                           weight=lambda result: len(result[0]) * len(result[1]))
+    more = len(rows) > limit
+    rows = rows[:limit]
+    next_page_token = None
+    if more and keyset:
+        key_idx = columns.index(keyset) if keyset in columns else None
+        if key_idx is None or rows[-1][key_idx] is None:
+            raise ValueError(f"Keyset column '{keyset}' must be a non-NULL column of the results.")
+        next_page_token = encode_page_token(sql, key=keyset, after=rows[-1][key_idx])
+    elif more:
+        next_page_token = encode_page_token(sql, offset=int(position.get("offset", 0)) + limit)
+    # Fresh lists, so that plot and transform scripts cannot alter the cached rows
+    return {"columns": list(columns), "rows": [list(r) for r in rows], "truncated": more,
+            "next_page_token": next_page_token}
+
+
+def stream_query(db_name, sql):
+    """Yields the results of a query as NDJSON lines: {"columns": [...]}
+    first, then one JSON array per row. Rows are fetched in batches of
+    STREAM_BATCH_SIZE, so they are never all in memory."""
+    path = _check_query(db_name, sql)
+    with pooled_connection(path) as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            yield json.dumps({"columns": [d[0] for d in cur.description]}).encode() + b"\n"
+            while True:
+                rows = cur.fetchmany(STREAM_BATCH_SIZE)
+                if not rows:
+                    break
+                yield b"".join(json.dumps(row, default=str).encode() + b"\n" for row in rows)
+        finally:
+            cur.close()
 
 
 def df_data_to_dataframe(df_data: dict) -> "pd.DataFrame":
@@ -507,7 +1033,8 @@ def run_custom_plot_script(source, df_data, config):
 def run_transform_script(source: str, data: Dict[str, "pd.DataFrame"], log_fn):
     """
     Runs a user-supplied Python snippet that can inspect/modify `data`, a
-    dict[str, pandas.DataFrame]. The SQL query result lives under the key
+    dict-like {table name: pandas.DataFrame} (see `LazyTables`, tables are
+    only loaded when accessed). The SQL query result lives under the key
     "result"; whatever ends up in data["result"] after the script runs is
     what gets shown/plotted. `log_fn(msg)` is exposed as `log(...)`.
     """
@@ -634,7 +1161,7 @@ def run_pipeline(database: str, sql: str, transform_script: str = ""):
     df_data = run_query(database, sql)
     log_entries = []
     if transform_script and transform_script.strip():
-        data = get_all_tables_as_dataframes(database)
+        data = LazyTables(database)
         data["result"] = df_data_to_dataframe(df_data)
         script_log, entries = make_script_logger("transform")
         data = run_transform_script(transform_script, data, script_log)
@@ -655,7 +1182,15 @@ def compute_traces(df_data: dict, plot_type: str, custom_script: str, config: di
         return PLUGIN_PLOTS[plot_type]["fn"](df_data, config)
     if plot_type in BUILTIN_PLOTS:
         traces = BUILTIN_PLOTS[plot_type]["fn"](df_data, config)
+        if plot_type in ("line", "scatter"):
+            defaults = BUILTIN_PLOTS[plot_type]["defaults"]
+            budget = _budget(config, "max_points", defaults["max_points"])
+            method = config.get("downsample") or defaults["downsample"]
+            if method != "none":
+                traces = [downsample_trace(t, budget, method) for t in traces]
         log(f"Plot '{plot_type}': {len(traces)} trace(s)")
+        for d in downsampling_report(traces):
+            log(f"Plot '{plot_type}': '{d['trace']}' reduced from {d['points']} to {d['kept']} point(s) ({d['method']})")
         return traces
     raise ValueError(f"Unknown plot type: {plot_type}")
 
@@ -717,24 +1252,101 @@ def load_initial_workspace():
 # HTTP handler
 # ---------------------------------------------------------------------------
 
+SERVER_WORKERS = 8             # requests served concurrently
+COMPRESS_MIN_SIZE = 1024       # bytes; smaller responses are sent as they are
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 5
+
+
+def _accepted_encodings(header: str) -> set:
+    """Content codings accepted by the client (ignoring the ones with q=0)."""
+    encodings = set()
+    for part in (header or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "").lower() in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        encodings.add(coding.strip().lower())
+    return encodings
+
+
+def compress_body(body: bytes, accept_encoding: str) -> Tuple[bytes, Optional[str]]:
+    """Compresses a response body with the best coding accepted by the
+    client (brotli if installed, then gzip). Returns (body, coding or None)."""
+    if len(body) < COMPRESS_MIN_SIZE:
+        return body, None
+    encodings = _accepted_encodings(accept_encoding)
+    if brotli is not None and "br" in encodings:
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    if "gzip" in encodings or "*" in encodings:
+        return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+    return body, None
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    tags = [t.strip() for t in if_none_match.split(",")]
+    # Weak comparison (RFC 9110, 13.1.2)
+    return "*" in tags or etag.removeprefix("W/") in (t.removeprefix("W/") for t in tags)
+
+
 class Handler(BaseHTTPRequestHandler):
     def log_message(self, fmt, *args): pass
 
-    def send_json(self, data, status=200):
-        body = json.dumps(data).encode()
+    def send_body(self, body: bytes, content_type: str, status=200, etag=False):
+        """Sends a response, compressed if the client accepts it. With
+        `etag=True`, the response is tagged with the hash of its content, and
+        an empty 304 is sent instead if the client already has it."""
+        tag = None
+        if etag:
+            # Weak, since the same content is sent with different codings
+            tag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+            if status == 200 and _etag_matches(self.headers.get("If-None-Match"), tag):
+                self.send_response(304)
+                self.send_header("ETag", tag)
+                self.send_header("Cache-Control", "no-cache")
+                self.end_headers()
+                return
+        body, coding = compress_body(body, self.headers.get("Accept-Encoding", ""))
         self.send_response(status)
-        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Type", content_type)
         self.send_header("Content-Length", str(len(body)))
+        self.send_header("Vary", "Accept-Encoding")
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        if tag:
+            self.send_header("ETag", tag)
+            # Lets the browser cache the response, but revalidate it every time
+            self.send_header("Cache-Control", "no-cache")
         self.end_headers()
         self.wfile.write(body)
 
-    def send_html(self, html):
-        body = html.encode()
+    def send_stream(self, chunks, content_type: str):
+        """Sends a response of unknown length, chunk by chunk (gzipped if the
+        client accepts it); the end of the body is the end of the connection."""
+        coding = "gzip" if "gzip" in _accepted_encodings(self.headers.get("Accept-Encoding", "")) else None
         self.send_response(200)
-        self.send_header("Content-Type", "text/html; charset=utf-8")
-        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Content-Type", content_type)
+        self.send_header("Vary", "Accept-Encoding")
+        if coding:
+            self.send_header("Content-Encoding", coding)
+        self.send_header("Connection", "close")
         self.end_headers()
-        self.wfile.write(body)
+        self.close_connection = True
+        compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31) if coding else None
+        for chunk in chunks:
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                self.wfile.write(chunk)
+        if compressor:
+            self.wfile.write(compressor.flush())
+
+    def send_json(self, data, status=200, etag=False):
+        self.send_body(json.dumps(data).encode(), "application/json", status, etag)
+
+    def send_html(self, html):
+        self.send_body(html.encode(), "text/html; charset=utf-8", etag=True)
 
     def read_body(self):
         length = int(self.headers.get("Content-Length", 0))
@@ -760,7 +1372,7 @@ class Handler(BaseHTTPRequestHandler):
                 "databases": schema,
                 "single_db": is_single_db(),
                 "default_database": only_db_name(),
-            })
+            }, etag=True)
         elif path == "/api/plot_types":
             out = {}
             for k, v in BUILTIN_PLOTS.items():
@@ -769,13 +1381,13 @@ class Handler(BaseHTTPRequestHandler):
                 out[k] = {x: v[x] for x in ("name","label","description","defaults")}
                 out[k]["is_plugin"] = True
                 out[k]["source"] = v.get("source","")
-            self.send_json({"plot_types": out})
+            self.send_json({"plot_types": out}, etag=True)
         elif path == "/api/remote_systems":
             self.send_json({"systems": {s: paths for s, paths in get_remotes().items()}})
         elif path == "/api/logs":
             self.send_json({"logs": SERVER_LOG[-200:]})
         elif path == "/api/initial_workspace":
-            self.send_json({"workspace": INITIAL_WORKSPACE})
+            self.send_json({"workspace": INITIAL_WORKSPACE}, etag=True)
         else:
             self.send_json({"error": "Not found"}, 404)
 
@@ -787,7 +1399,35 @@ class Handler(BaseHTTPRequestHandler):
         except Exception:
             self.send_json({"error": "Invalid JSON"}, 400); return
 
-        if path == "/api/preview":
+        if path == "/api/query":
+            # One page of the results of a query, see run_query
+            try:
+                result = run_query(payload["database"], payload["sql"],
+                                   limit=int(payload.get("limit", 10000)),
+                                   page_token=payload.get("page_token"),
+                                   keyset=payload.get("keyset"))
+                self.send_json({"ok": True, **result})
+            except Exception as e:
+                self.send_json({"ok": False, "error": str(e)}, 400)
+
+        elif path == "/api/query_stream":
+            # All the results of a query, as NDJSON
+            try:
+                chunks = stream_query(payload["database"], payload["sql"])
+                first = next(chunks)  # Errors in the query are reported before streaming
+            except Exception as e:
+                self.send_json({"ok": False, "error": str(e)}, 400); return
+            try:
+                self.send_stream(itertools.chain([first], chunks), "application/x-ndjson")
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # The client went away
+            except Exception as e:
+                # Too late for an error response: the client gets a truncated stream
+                log(f"Query stream failed: {e}", "error")
+            finally:
+                chunks.close()
+
+        elif path == "/api/preview":
             # Runs SQL + (optional) pandas transform and returns the
             # resulting table — this powers the single "Run & Show" button.
             try:
@@ -796,7 +1436,11 @@ class Handler(BaseHTTPRequestHandler):
                 transform_script = payload.get("transform_script", "")
                 df_data, log_entries = run_pipeline(db, sql, transform_script)
                 log(f"Preview on '{db}': {len(df_data['rows'])} row(s)")
-                self.send_json({"ok": True, "preview": preview_of(df_data),
+                preview = preview_of(df_data)
+                if preview["truncated"] and not transform_script.strip():
+                    # The rest of the rows are paged through /api/query
+                    preview["next_page_token"] = encode_page_token(sql, offset=len(preview["rows"]))
+                self.send_json({"ok": True, "preview": preview,
                                  "columns": df_data["columns"], "log_entries": log_entries})
             except Exception as e:
                 entry = log(str(e), "error")
@@ -825,6 +1469,7 @@ class Handler(BaseHTTPRequestHandler):
                 self.send_json({"traces": traces, "layout": layout,
                                 "columns": df_data["columns"],
                                 "truncated": df_data.get("truncated", False),
+                                "downsampled": downsampling_report(traces),
                                 "preview": preview_of(df_data),
                                 "log_entries": log_entries})
             except Exception as e:
@@ -897,6 +1542,7 @@ class Handler(BaseHTTPRequestHandler):
                     previews.append(preview_of(df_data, limit=200))
 
                 self.send_json({"traces": all_traces, "layout": layout,
+                                 "downsampled": downsampling_report(all_traces),
                                  "previews": previews, "log_entries": log_entries})
             except Exception as e:
                 log(str(e), "error")
@@ -959,11 +1605,38 @@ class Handler(BaseHTTPRequestHandler):
             self.send_json({"error": "Not found"}, 404)
 
 
+class PooledHTTPServer(HTTPServer):
+    """HTTP server handling requests concurrently on a bounded pool of
+    threads, so that a slow query does not block the other requests (e.g.
+    other browser tabs, or the /api/logs poll). Further connections wait in
+    the pool queue."""
+
+    def __init__(self, server_address, handler_class, workers: int = SERVER_WORKERS):
+        super().__init__(server_address, handler_class)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="visualize")
+
+    def process_request(self, request, client_address):
+        self._executor.submit(self._process_request, request, client_address)
+
+    def _process_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self._executor.shutdown(wait=False)
+
+
 # ---------------------------------------------------------------------------
 # Entrypoint
 # ---------------------------------------------------------------------------
 
-def launch_visualize_web_server(parser: Path, presets: Path, port: int = 8765, plugins: List[Path] = []):
+def launch_visualize_web_server(parser: Path, presets: Path, port: int = 8765, plugins: List[Path] = [], workers: int = SERVER_WORKERS,
+                                backend: str = "sqlite", parse_workers: Optional[int] = None):
   # Plugin API (any .py file in the plugins dir):
   # PLOT_NAME        = "my_plot"          # unique key
   # PLOT_LABEL       = "My Custom Plot"   # display name
@@ -976,9 +1649,21 @@ def launch_visualize_web_server(parser: Path, presets: Path, port: int = 8765, p
   #     # return: list of Plotly trace dicts
   #     ...
 
+    if backend not in ("sqlite", "parquet"):
+        console.print(f"[bold red]Unknown results backend '{backend}' (expected 'sqlite' or 'parquet').[/bold red]")
+        raise typer.Exit(1)
+
+    # The SQLite database is always written: it keeps track of the parsed
+    # jobs, and the Parquet files are exported from it
     db_path = get_project_root() / "data.sqlite"
-    parse_jobs_and_generate_sqlite_db(parser=parser, output_path=db_path)
-    databases = [db_path]
+    # Re-parses requested from the UI run in the threads of the server, which must not fork: only
+    # this first parse, done before the server starts, may use a pool of processes
+    parse_jobs_and_generate_sqlite_db(parser=parser, output_path=db_path, max_workers=parse_workers)
+    parquet_dir = None
+    if backend == "parquet":
+        parquet_dir = get_project_root() / "data.parquet"
+        export_parquet_dataset(db_path, parquet_dir)
+    databases = [parquet_dir or db_path]
 
     if not databases:
         console.print(f"[bold red]At least one SQLite database file is required.[/bold red]")
@@ -992,9 +1677,9 @@ def launch_visualize_web_server(parser: Path, presets: Path, port: int = 8765, p
 
     # Remember how this database was produced so "Re-parse" in the UI can
     # actually regenerate it from the job logs, not just re-read stale data.
-    db_name = Path(db_path).stem
+    db_name = Path(databases[0]).stem
     if db_name in DB_REGISTRY:
-        REPARSE_SOURCES[db_name] = {"parser": parser, "output_path": db_path}
+        REPARSE_SOURCES[db_name] = {"parser": parser, "output_path": db_path, "parquet_dir": parquet_dir}
 
     if plugins:
         load_plugins(plugins)
@@ -1006,7 +1691,7 @@ def launch_visualize_web_server(parser: Path, presets: Path, port: int = 8765, p
         raise typer.Exit(1)
 
     HOST = "127.0.0.1"
-    server = HTTPServer((HOST, port), Handler)
+    server = PooledHTTPServer((HOST, port), Handler, workers)
     url = f"http://{HOST}:{port}"
     print("\n  Plot Builder")
     print("  ─────────────────────────")
@@ -1024,4 +1709,5 @@ def launch_visualize_web_server(parser: Path, presets: Path, port: int = 8765, p
         server.serve_forever()
     except KeyboardInterrupt:
         print("\n[stopped]")
+    finally:
         server.server_close()
\ No newline at end of file
@@ -0,0 +1,34 @@
+import time
+from pathlib import Path
+
+import pytest
+
+from sbatchman import init_project, jobs_list, reset_cached_sbatchman_home
+from sbatchman.config.global_config import set_cluster_name
+from sbatchman.core.status import TERMINAL_STATES
+
+
+@pytest.fixture
+def project(tmp_path, monkeypatch) -> Path:
+  """A new SbatchMan project in a temporary directory, with its own global configuration."""
+  monkeypatch.setenv("HOME", str(tmp_path))
+  monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+  work_dir = tmp_path / "work"
+  work_dir.mkdir()
+  monkeypatch.chdir(work_dir)
+  reset_cached_sbatchman_home()
+  init_project(work_dir, no_logo=True)
+  set_cluster_name("local_test")
+  yield work_dir
+  reset_cached_sbatchman_home()
+
+
+def wait_for_jobs(timeout: float = 60):
+  """Waits until all the jobs of the project ended, and returns them."""
+  deadline = time.monotonic() + timeout
+  while time.monotonic() < deadline:
+    jobs = jobs_list(update_jobs=True)
+    if jobs and all(job.status in TERMINAL_STATES for job in jobs):
+      return jobs
+    time.sleep(0.2)
+  pytest.fail("The local jobs did not finish in time")
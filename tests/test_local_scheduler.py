@@ -0,0 +1,33 @@
+from pathlib import Path
+
+from sbatchman import create_local_config, launch_jobs_from_file
+
+from conftest import wait_for_jobs
+
+
+def test_sequential_local_jobs_never_overlap(project: Path):
+  create_local_config("wide", slots=4)
+  create_local_config("other", slots=4)
+  log_dir = project / "intervals"
+  log_dir.mkdir()
+  jobs_file = project / "jobs.yaml"
+  jobs_file.write_text(f"""
+sequential: true
+variables:
+  i: [0, 1, 2]
+jobs:
+  - config: wide
+    tag: first
+    command: 'date +%s.%N > {log_dir}/wide_{{i}}; sleep 0.5; date +%s.%N >> {log_dir}/wide_{{i}}'
+  - config: other
+    tag: second
+    command: 'date +%s.%N > {log_dir}/other_{{i}}; sleep 0.5; date +%s.%N >> {log_dir}/other_{{i}}'
+""")
+
+  assert len(launch_jobs_from_file(jobs_file)) == 6
+  jobs = wait_for_jobs()
+  assert all(job.status == "COMPLETED" for job in jobs)
+
+  intervals = sorted(tuple(map(float, path.read_text().split())) for path in log_dir.iterdir())
+  for (_, previous_end), (next_start, _) in zip(intervals, intervals[1:]):
+    assert next_start >= previous_end
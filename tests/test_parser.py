@@ -0,0 +1,54 @@
+import sqlite3
+import tracemalloc
+from pathlib import Path
+
+from sbatchman import create_local_config, launch_jobs_from_file
+from sbatchman.parser import parse_jobs_and_generate_sqlite_db
+
+from conftest import wait_for_jobs
+
+ROWS_PER_JOB = 50000
+ROW_PADDING = 1000 # bytes per row, so that each job emits ~50 MB
+
+
+def _launch_jobs(project: Path, n: int):
+  create_local_config("parse", slots=n)
+  jobs_file = project / "jobs.yaml"
+  jobs_file.write_text(f"""
+variables:
+  i: {list(range(n))}
+command: 'true {{i}}'
+jobs:
+  - config: parse
+    tag: rows
+""")
+  assert len(launch_jobs_from_file(jobs_file)) == n
+  wait_for_jobs()
+
+
+def test_parallel_parse_streams_rows(project: Path):
+  _launch_jobs(project, 4)
+  parser = project / "parser.py"
+  parser.write_text(f"""
+def parse(job):
+  def rows():
+    for step in range({ROWS_PER_JOB}):
+      yield {{"job": job.variables["i"], "step": step, "padding": "x" * {ROW_PADDING}}}
+  return {{"steps": rows(), "jobs": {{"job": job.variables["i"]}}}}
+""")
+
+  db_path = project / "data.sqlite"
+  tracemalloc.start()
+  try:
+    parse_jobs_and_generate_sqlite_db(parser, db_path, max_workers=2)
+    _, peak = tracemalloc.get_traced_memory()
+  finally:
+    tracemalloc.stop()
+
+  conn = sqlite3.connect(db_path)
+  assert conn.execute("SELECT COUNT(*) FROM steps").fetchone()[0] == 4 * ROWS_PER_JOB
+  assert conn.execute("SELECT COUNT(DISTINCT job), MAX(step) FROM steps").fetchone() == (4, ROWS_PER_JOB - 1)
+  assert conn.execute("SELECT COUNT(*) FROM jobs").fetchone()[0] == 4
+  conn.close()
+  # The rows of a job are never all in memory at once
+  assert peak < ROWS_PER_JOB * ROW_PADDING / 2